@@ -18,7 +18,7 @@ const FileManager = ({ token, user }) => {
         headers: { 'Authorization': `Bearer ${token}` }
       })
       const data = await response.json()
-      setFiles(data)
+      setFiles(data.files || [])
     } catch (error) {
       console.error('Error fetching files:', error)
     } finally {
@@ -1,11 +1,31 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from models.user import db
 from models.auth import AdminUser
+from models.employee import Employee
+from db_engine import use_replica
+from admission import route_class
+from response_cache import cached, invalidate, invalidate_on_write, cache_stats
+from request_metrics import render_metrics
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import or_
+from werkzeug.security import check_password_hash
+from password_hashing import hash_password, hash_passwords, HashingBusy
+from change_feed import record_changes
+from job_queue import enqueue
 
 admin_bp = Blueprint('admin', __name__)
 
+# Employees are written outside this blueprint, so their commits invalidate the stats that count them.
+invalidate_on_write(Employee, 'employees')
+
+USER_REQUIRED_FIELDS = ('username', 'email', 'password', 'role')
+MAX_BULK_USERS = 1000
+
+def hashing_busy():
+    response = jsonify({'error': 'Password hashing is busy, please retry'})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
 @admin_bp.route('/admin/users', methods=['GET'])
 def get_users():
     """Get all users"""
@@ -40,7 +60,7 @@ def create_user():
         if AdminUser.query.filter_by(email=data['email']).first():
             return jsonify({'error': 'Email already exists'}), 400
         
-        password_hash = generate_password_hash(data['password'])
+        password_hash = hash_password(data['password'])
         
         user = AdminUser(
             username=data['username'],
@@ -52,6 +72,7 @@ def create_user():
         
         db.session.add(user)
         db.session.commit()
+        invalidate('users')
         
         return jsonify({
             'id': user.id,
@@ -61,6 +82,95 @@ def create_user():
             'is_active': user.is_active,
             'created_at': user.created_at.isoformat()
         }), 201
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/users/bulk', methods=['POST'])
+@route_class('heavy_write')
+def bulk_create_users():
+    """Create many users in one transaction; nothing is created if any row is invalid"""
+    try:
+        data = request.get_json()
+        rows = data.get('users') if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'users must be a non-empty list'}), 400
+        if len(rows) > MAX_BULK_USERS:
+            return jsonify({'error': f'Too many users (max {MAX_BULK_USERS})'}), 413
+        
+        errors = {}
+        usernames = {}
+        emails = {}
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[index] = 'Each user must be an object'
+                continue
+            missing = [field for field in USER_REQUIRED_FIELDS if not row.get(field)]
+            if missing:
+                errors[index] = f'Missing required field: {missing[0]}'
+            elif row['username'] in usernames:
+                errors[index] = f"Duplicate username in batch (row {usernames[row['username']]})"
+            elif row['email'] in emails:
+                errors[index] = f"Duplicate email in batch (row {emails[row['email']]})"
+            else:
+                usernames[row['username']] = index
+                emails[row['email']] = index
+        
+        # One query for every username or email that is already taken.
+        taken = db.session.query(AdminUser.username, AdminUser.email).filter(or_(
+            AdminUser.username.in_(list(usernames)),
+            AdminUser.email.in_(list(emails))
+        )).all()
+        for username, email in taken:
+            if username in usernames:
+                errors.setdefault(usernames[username], 'Username already exists')
+            if email in emails:
+                errors.setdefault(emails[email], 'Email already exists')
+        
+        if errors:
+            return jsonify({
+                'error': 'No users were created',
+                'errors': [{'index': index, 'error': errors[index]} for index in sorted(errors)]
+            }), 400
+        
+        password_hashes = hash_passwords([row['password'] for row in rows])
+        now = datetime.utcnow()
+        table = AdminUser.__table__
+        created = db.session.execute(
+            table.insert().returning(table.c.id, table.c.username, table.c.email, table.c.role,
+                                     table.c.is_active, table.c.created_at),
+            [{
+                'username': row['username'],
+                'email': row['email'],
+                'password_hash': password_hash,
+                'role': row['role'],
+                'is_active': row.get('is_active', True),
+                'created_at': now
+            } for row, password_hash in zip(rows, password_hashes)]
+        ).all()
+        record_changes('user', [user.id for user in created], 'insert')
+        db.session.commit()
+        invalidate('users')
+        
+        # RETURNING order is not guaranteed for multi-row inserts, so report users in request order.
+        created = sorted(created, key=lambda user: usernames[user.username])
+        return jsonify({
+            'created': len(created),
+            'users': [{
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'role': user.role,
+                'is_active': user.is_active,
+                'created_at': user.created_at.isoformat()
+            } for user in created]
+        }), 201
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -91,10 +201,11 @@ def update_user(user_id):
             user.is_active = data['is_active']
             
         if 'password' in data and data['password']:
-            password_hash = generate_password_hash(data['password'])
+            password_hash = hash_password(data['password'])
             user.password_hash = password_hash
         
         db.session.commit()
+        invalidate('users')
         
         return jsonify({
             'id': user.id,
@@ -105,6 +216,9 @@ def update_user(user_id):
             'created_at': user.created_at.isoformat() if user.created_at else None,
             'last_login': user.last_login.isoformat() if user.last_login else None
         })
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -122,6 +236,7 @@ def delete_user(user_id):
         
         db.session.delete(user)
         db.session.commit()
+        invalidate('users')
         
         return jsonify({'message': 'User deleted successfully'})
     except Exception as e:
@@ -129,27 +244,47 @@ def delete_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 @admin_bp.route('/admin/database/stats', methods=['GET'])
+@route_class('stats')
+@cached('candidates', 'users', 'employees')
+@use_replica
 def get_database_stats():
-    """Get database statistics"""
+    """Get database statistics (?fresh=1 counts candidates directly instead of reading the counters)"""
     try:
-        from models.candidate import Candidate
-        from models.employee import Employee
-        
-        stats = {
-            'total_candidates': Candidate.query.count(),
-            'total_employees': Employee.query.count(),
-            'total_users': AdminUser.query.count(),
-            'active_users': AdminUser.query.filter_by(is_active=True).count(),
-            'candidate_pipeline_stats': {
-                'applied': Candidate.query.filter_by(pipeline_status='Applied').count(),
-                'interviewing': Candidate.query.filter_by(pipeline_status='Interviewing').count(),
-                'offered': Candidate.query.filter_by(pipeline_status='Offered').count(),
-                'approved': Candidate.query.filter_by(admin_approval='Approved').count(),
-                'pending': Candidate.query.filter_by(admin_approval='Pending').count(),
-                'denied': Candidate.query.filter_by(admin_approval='Denied').count()
-            }
-        }
+        from stats import candidate_counts, database_stats, is_fresh_requested
+        
+        stats = database_stats(candidate_counts(fresh=is_fresh_requested(request.args)))
         
         return jsonify(stats)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/stats/recount', methods=['POST'])
+def recount_stats():
+    """Queue a rebuild of the candidate counters from the candidates table"""
+    try:
+        from stats import RECOUNT_JOB
+        job, created = enqueue(RECOUNT_JOB, dedup_key=RECOUNT_JOB)
+        db.session.commit()
+        response = jsonify({'job': job.to_dict(), 'created': created})
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response, 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get response cache hit/miss counters and occupancy"""
+    try:
+        return jsonify(cache_stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_bp.route('/admin/metrics', methods=['GET'])
+def get_metrics():
+    """Get per-route request, DB time and query count metrics in Prometheus text format"""
+    try:
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,217 @@
+"""Per-route rate limiting and admission control.
+
+Every request is checked before its view runs:
+
+1. A token bucket keyed by route and client. Each client gets BURST
+   requests up front per route, refilled at PER_MINUTE. A client past its
+   budget gets a 429 with a Retry-After saying when the next token is due.
+2. A concurrency cap for the route's class. Views opt into a class with
+   @route_class('heavy_write' | 'stats' | 'files' | 'export'). When every slot
+   in the class is taken, the request is shed at once with a 503 and a
+   Retry-After instead of queueing for a DB connection. That keeps
+   /api/health, logins and ordinary reads responsive during a burst of
+   syncs or a client stuck polling pipeline-stats.
+
+Limits are read from the environment per class (e.g.
+ADMISSION_STATS_CONCURRENCY, RATE_LIMIT_STATS_PER_MINUTE,
+RATE_LIMIT_STATS_BURST); a concurrency of 0 means uncapped. Concurrency caps
+guard this process's connection pool, so they are always per process. Rate
+buckets live in an in-process MemoryRateLimitBackend by default. With
+several workers, install a shared backend implementing RateLimitBackend
+(e.g. over Redis) via configure() so a client's budget is shared by all of
+them.
+
+Every decision is counted in request_metrics and served with the other
+metrics at /api/admin/metrics.
+"""
+
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from flask import g, jsonify, request
+from request_metrics import registry
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', 10000))
+# Behind a proxy every request shares the proxy's address; trust X-Forwarded-For only when one is in front.
+RATE_LIMIT_TRUST_FORWARDED = os.getenv('RATE_LIMIT_TRUST_FORWARDED', 'true' if os.getenv('VERCEL') else 'false') \
+    .lower() in ('1', 'true', 'yes')
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 2))
+
+DEFAULT_CLASS = 'default'
+# Health checks and metrics scrapes must answer even when everything else is saturated.
+EXEMPT_ENDPOINTS = {'health_check', 'admin.get_metrics', 'static'}
+
+
+def _class_settings(name, concurrency, per_minute, burst):
+    prefix = name.upper()
+    return {
+        'concurrency': int(os.getenv(f'ADMISSION_{prefix}_CONCURRENCY', concurrency)),
+        'per_minute': float(os.getenv(f'RATE_LIMIT_{prefix}_PER_MINUTE', per_minute)),
+        'burst': int(os.getenv(f'RATE_LIMIT_{prefix}_BURST', burst)),
+    }
+
+
+# The capped classes together stay within the server profile's pool_size (5) plus overflow.
+ROUTE_CLASSES = {
+    'heavy_write': _class_settings('heavy_write', concurrency=2, per_minute=12, burst=3),
+    'stats': _class_settings('stats', concurrency=2, per_minute=120, burst=20),
+    'files': _class_settings('files', concurrency=4, per_minute=300, burst=60),
+    'export': _class_settings('export', concurrency=1, per_minute=6, burst=2),
+    DEFAULT_CLASS: _class_settings(DEFAULT_CLASS, concurrency=0, per_minute=600, burst=120),
+}
+
+
+class RateLimitBackend(ABC):
+    """Storage interface for token buckets"""
+
+    @abstractmethod
+    def take(self, key, rate, burst, cost=1):
+        """Spend cost tokens from the bucket at key; returns (allowed, seconds until enough tokens)"""
+
+    def stats(self):
+        return {}
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Thread-safe token buckets, least recently used evicted past max_keys"""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+            # An evicted bucket comes back full, so eviction only ever errs towards admitting.
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def stats(self):
+        with self.lock:
+            return {'buckets': len(self.buckets), 'max_keys': self.max_keys}
+
+
+class ConcurrencyLimiter:
+    """Non-blocking per-class slot counts"""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.in_flight = {name: 0 for name in limits}
+        self.lock = threading.Lock()
+
+    def try_acquire(self, name):
+        limit = self.limits.get(name, 0)
+        with self.lock:
+            if limit and self.in_flight[name] >= limit:
+                return False
+            self.in_flight[name] += 1
+            in_flight = self.in_flight[name]
+        registry.set_in_flight(name, in_flight)
+        return True
+
+    def release(self, name):
+        with self.lock:
+            self.in_flight[name] -= 1
+            in_flight = self.in_flight[name]
+        registry.set_in_flight(name, in_flight)
+
+
+rate_limiter = MemoryRateLimitBackend()
+concurrency = ConcurrencyLimiter({name: settings['concurrency'] for name, settings in ROUTE_CLASSES.items()})
+
+
+def configure(backend):
+    """Swap in a different rate limit backend, e.g. a shared one for multi-worker deployments"""
+    global rate_limiter
+    rate_limiter = backend
+
+
+def route_class(name):
+    """Put a view in an admission class, which sets its concurrency cap and rate limit"""
+    if name not in ROUTE_CLASSES:
+        raise ValueError(f"Unknown route class '{name}'")
+
+    def decorator(view):
+        view.route_class = name
+        return view
+    return decorator
+
+
+def client_address(remote_addr, forwarded_for=None):
+    """Rate limit key for a client: the first X-Forwarded-For hop when trusted, else the peer address"""
+    if RATE_LIMIT_TRUST_FORWARDED and forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    return remote_addr or 'unknown'
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+def applies(method, endpoint):
+    return RATE_LIMIT_ENABLED and method != 'OPTIONS' and endpoint is not None and endpoint not in EXEMPT_ENDPOINTS
+
+
+def admit(name, method, endpoint, route, client):
+    """Spend a rate limit token and take a slot in the route class.
+
+    Returns None when admitted (the caller must release(name) once the
+    response is finished), else (status, message, retry_after seconds).
+    """
+    settings = ROUTE_CLASSES[name]
+    allowed, retry_after = rate_limiter.take(f'{method}:{endpoint}:{client}', settings['per_minute'] / 60,
+                                             settings['burst'])
+    if not allowed:
+        registry.observe_admission(name, method, route, 'rate_limited')
+        return 429, 'Too many requests, please retry later', retry_after
+
+    if not concurrency.try_acquire(name):
+        registry.observe_admission(name, method, route, 'shed')
+        return 503, 'Server busy, please retry later', ADMISSION_RETRY_AFTER
+
+    registry.observe_admission(name, method, route, 'admitted')
+    return None
+
+
+def release(name):
+    concurrency.release(name)
+
+
+def _admit(app):
+    if request.url_rule is None or not applies(request.method, request.endpoint):
+        return None
+    name = getattr(app.view_functions.get(request.endpoint), 'route_class', DEFAULT_CLASS)
+    rejection = admit(name, request.method, request.endpoint, request.url_rule.rule,
+                      client_address(request.remote_addr, request.headers.get('X-Forwarded-For')))
+    if rejection is not None:
+        status, message, retry_after = rejection
+        response = jsonify({'error': message})
+        response.headers['Retry-After'] = retry_after_header(retry_after)
+        return response, status
+    g.admission_class = name
+    return None
+
+
+def _release(error=None):
+    # Streamed responses keep the request context, and so the slot, until the stream ends.
+    name = g.pop('admission_class', None)
+    if name is not None:
+        release(name)
+
+
+def install_admission(app):
+    """Check rate limits and concurrency caps before each of the app's views"""
+    app.before_request(lambda: _admit(app))
+    app.teardown_request(_release)
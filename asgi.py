@@ -0,0 +1,399 @@
+"""ASGI entry point: async handlers for the I/O-bound routes, Flask for the rest.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 2
+
+The routes in ASYNC_ROUTES mostly wait on the database, the Indeed API or
+the disk. Here they are served by async handlers, so a single worker can
+overlap many of them instead of tying up a thread per request. The handlers
+use an AsyncSession (async_db), httpx for the Indeed feed, and async file
+I/O for uploads and downloads. Each handler is the async version of one
+Flask endpoint. It only answers requests that Flask would route to that
+endpoint, with the same admission class and rate limit. Anything it does
+not cover (e.g. ?async=1 syncs, ?fresh=1 stats, X-Accel-Redirect downloads)
+is passed to Flask untouched. Catalog and sync writes reuse the existing
+code, run in a worker thread inside an app context.
+
+Every other route is served by the Flask app itself through a2wsgi's thread
+pool, so this deployment answers exactly the same API as gunicorn does.
+Native handlers read the database directly, not through the response cache,
+and are not covered by the per-request SQL metrics, which hook Flask's
+request lifecycle.
+
+Locally, SQLite works through aiosqlite:
+
+    DATABASE_URL=sqlite:///local.db uvicorn asgi:app
+"""
+
+import os
+from contextlib import asynccontextmanager
+import aiofiles.os
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select, tuple_
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+from werkzeug.http import parse_date, parse_etags
+from werkzeug.utils import secure_filename
+import admission
+import async_db
+from index import create_app
+from models.user import db
+from models.candidate import Candidate
+from models.candidate_stats import CandidateStatusCount
+from models.file_record import FileRecord
+from candidate import (sparse_fields, serializer, decode_cursor, encode_cursor,
+                       DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_BATCH_SIZE)
+from stats import pipeline_summary, is_fresh_requested
+from files import (blob_store, allowed_file, catalog_path, normalize_path, upload_result,
+                   UPLOAD_FOLDER, MAX_FILE_SIZE)
+from file_catalog import add_record
+from document_index import queue_extraction
+from indeed import INDEED_API_BASE, INDEED_CLIENT_ID, INDEED_CLIENT_SECRET
+from indeed_sync import AsyncHttpFeedClient, run_sync_async
+from async_uploads import read_upload_form
+
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 10))
+
+flask_app = create_app()
+wsgi = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+_feed_client = None
+
+
+def json_response(obj, status=200, headers=None):
+    # The Flask app's provider, so both entry points format JSON (and dates) identically.
+    return Response(flask_app.json.dumps(obj), status_code=status, media_type='application/json', headers=headers)
+
+
+def _allow_origin(request, response):
+    # Matches the app's CORS(supports_credentials=True): any origin, reflected, with credentials.
+    origin = request.headers.get('origin')
+    if origin:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers.append('Vary', 'Origin')
+    return response
+
+
+def _call_in_app_context(fn, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+async def in_app_context(fn, *args):
+    """Run blocking database code in a worker thread inside a Flask app context"""
+    return await run_in_threadpool(_call_in_app_context, fn, *args)
+
+
+class AsyncEndpoint:
+    """ASGI endpoint serving one Flask endpoint with an async handler.
+
+    Requests that Flask would route to a different endpoint, or that
+    fallback(request) says the handler does not cover, are passed to Flask.
+    CORS preflights never reach here: OPTIONS is not in the route's methods.
+    """
+
+    def __init__(self, endpoint, handler, fallback=None):
+        self.endpoint = endpoint
+        self.handler = handler
+        self.fallback = fallback
+        self.rule = next(flask_app.url_map.iter_rules(endpoint)).rule
+        self.route_class = getattr(flask_app.view_functions[endpoint], 'route_class', admission.DEFAULT_CLASS)
+        self.urls = flask_app.url_map.bind('localhost')
+
+    def routes_here(self, scope):
+        try:
+            endpoint, _ = self.urls.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return endpoint == self.endpoint
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        if not self.routes_here(scope) or (self.fallback is not None and self.fallback(request)):
+            await wsgi(scope, receive, send)
+            return
+
+        admitted = None
+        if admission.applies(request.method, self.endpoint):
+            client = request.client.host if request.client else None
+            rejection = admission.admit(self.route_class, request.method, self.endpoint, self.rule,
+                                        admission.client_address(client, request.headers.get('x-forwarded-for')))
+            if rejection is not None:
+                status, message, retry_after = rejection
+                response = json_response({'error': message}, status,
+                                         {'Retry-After': admission.retry_after_header(retry_after)})
+                await _allow_origin(request, response)(scope, receive, send)
+                return
+            admitted = self.route_class
+
+        try:
+            response = _allow_origin(request, await self.handler(request))
+            # Streamed bodies keep the slot until the last chunk is sent.
+            await response(scope, receive, send)
+        finally:
+            if admitted is not None:
+                admission.release(admitted)
+
+
+async def health_check(request):
+    return json_response({'ok': True})
+
+
+def _candidate_select(args, fields, extra=()):
+    """select() twin of candidate.filtered_candidates plus project()"""
+    if fields is None:
+        stmt = select(Candidate)
+    else:
+        stmt = select(*[getattr(Candidate, name) for name in dict.fromkeys([*fields, *extra])])
+    for name in ('pipeline_status', 'admin_approval'):
+        if args.get(name):
+            stmt = stmt.where(getattr(Candidate, name) == args.get(name))
+    return stmt
+
+
+async def _stream_candidates(stmt, full_rows, fmt, serialize):
+    """Yield candidates as NDJSON lines or as a chunked JSON array, read through a server-side cursor"""
+    dumps = flask_app.json.dumps
+    async with async_db.session(replica=True) as db_session:
+        result = await db_session.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        rows = result.scalars() if full_rows else result
+
+        if fmt == 'ndjson':
+            async for row in rows:
+                yield dumps(serialize(row)) + '\n'
+            return
+
+        yield '['
+        first = True
+        async for row in rows:
+            yield ('' if first else ',') + dumps(serialize(row))
+            first = False
+        yield ']'
+
+
+async def get_candidates(request):
+    args = request.query_params
+    try:
+        try:
+            fields = sparse_fields(args)
+        except ValueError as e:
+            return json_response({'error': str(e)}, 400)
+        # The cursor is built from (updated_at, id), so those are always selected.
+        stmt = _candidate_select(args, fields, extra=('updated_at',))
+
+        after = args.get('after')
+        if after:
+            try:
+                after_updated_at, after_id = decode_cursor(after)
+            except (ValueError, UnicodeDecodeError):
+                return json_response({'error': 'Invalid cursor'}, 400)
+            stmt = stmt.where(tuple_(Candidate.updated_at, Candidate.id) < tuple_(after_updated_at, after_id))
+
+        stmt = stmt.order_by(Candidate.updated_at.desc(), Candidate.id.desc())
+        serialize = serializer(fields)
+
+        stream = args.get('stream')
+        if stream:
+            if stream not in ('ndjson', 'json'):
+                return json_response({'error': 'stream must be ndjson or json'}, 400)
+            mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+            return StreamingResponse(_stream_candidates(stmt, fields is None, stream, serialize), media_type=mimetype)
+
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return json_response({'error': 'limit must be an integer'}, 400)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Fetch one extra row to learn whether another page exists.
+        async with async_db.session(replica=True) as db_session:
+            result = await db_session.execute(stmt.limit(limit + 1))
+            candidates = (result.scalars() if fields is None else result).all()
+        has_more = len(candidates) > limit
+        candidates = candidates[:limit]
+
+        return json_response({
+            'candidates': [serialize(candidate) for candidate in candidates],
+            'next_cursor': encode_cursor(candidates[-1]) if has_more else None
+        })
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+async def get_candidate(request):
+    candidate_id = request.path_params['candidate_id']
+    try:
+        try:
+            fields = sparse_fields(request.query_params)
+        except ValueError as e:
+            return json_response({'error': str(e)}, 400)
+
+        async with async_db.session(replica=True) as db_session:
+            if fields is not None:
+                result = await db_session.execute(_candidate_select({}, fields).where(Candidate.id == candidate_id))
+                row = result.first()
+                candidate = serializer(fields)(row) if row is not None else None
+            else:
+                candidate = await db_session.get(Candidate, candidate_id)
+                candidate = candidate.to_dict() if candidate is not None else None
+
+        if candidate is None:
+            return json_response({'error': 'Candidate not found'}, 404)
+        return json_response(candidate)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+async def get_pipeline_stats(request):
+    try:
+        async with async_db.session(replica=True) as db_session:
+            rows = (await db_session.execute(select(CandidateStatusCount))).scalars().all()
+            counts = {(row.pipeline_status, row.admin_approval): row.count for row in rows}
+        return json_response(pipeline_summary(counts))
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+def _catalog_upload(upload, rel_path, entity_type, person_id, category):
+    try:
+        blob_store.store(upload.path, upload.sha256, upload.size)
+        record = add_record(rel_path, upload.sha256, upload.size, entity_type, person_id, category)
+        queue_extraction(record)
+        db.session.commit()
+        return upload_result(record)
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+async def upload_file(request):
+    upload = None
+    try:
+        fields, upload = await read_upload_form(request, blob_store.staging_folder, MAX_FILE_SIZE)
+        if upload is None or upload.filename == '':
+            return json_response({'error': 'No file selected'}, 400)
+        if not allowed_file(upload.filename):
+            return json_response({'error': 'File type not allowed'}, 400)
+
+        entity_type = fields.get('entity_type', 'general')
+        rel_path = catalog_path(entity_type, fields.get('category', 'other'), secure_filename(upload.filename))
+        result = await in_app_context(_catalog_upload, upload, rel_path, entity_type,
+                                      fields.get('person_id', 'unknown'), fields.get('category', 'other'))
+        return json_response(result, 200)
+    except RequestEntityTooLarge:
+        return json_response({'error': 'File too large (max 16MB)'}, 413)
+    except HTTPException as e:
+        return json_response({'error': e.description}, e.code)
+    except Exception as e:
+        return json_response({'error': f'Upload failed: {str(e)}'}, 500)
+    finally:
+        if upload is not None:
+            await upload.discard()
+
+
+def not_modified(request, etag, last_modified):
+    """True when the client's validators show its cached copy is current"""
+    if request.headers.get('if-none-match'):
+        return parse_etags(request.headers['if-none-match']).contains(etag)
+    if_modified_since = parse_date(request.headers.get('if-modified-since'))
+    if if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _served_by_proxy(request):
+    return bool(flask_app.config.get('X_ACCEL_REDIRECT_PREFIX') or flask_app.config.get('USE_X_SENDFILE'))
+
+
+async def download_file(request):
+    try:
+        rel_path = normalize_path(request.path_params['filename'])
+        if rel_path is None:
+            return json_response({'error': 'File not found'}, 404)
+
+        async with async_db.session() as db_session:
+            result = await db_session.execute(select(FileRecord).where(FileRecord.path == rel_path).limit(1))
+            record = result.scalars().first()
+        if record is None:
+            return json_response({'error': 'File not found'}, 404)
+
+        download_name = record.name
+        as_attachment = request.query_params.get('download', '').lower() in ('1', 'true', 'yes')
+        headers = {'Cache-Control': 'no-cache, private'}
+
+        if record.sha256:
+            headers['ETag'] = f'"{record.sha256}"'
+            if not_modified(request, record.sha256, record.modified_at):
+                return Response(status_code=304, headers=headers)
+            file_path = blob_store.blob_path(record.sha256)
+            if file_path is None:
+                return RedirectResponse(blob_store.download_url(record.sha256, download_name, as_attachment), 302)
+        else:
+            file_path = os.path.join(UPLOAD_FOLDER, rel_path)
+
+        if not await aiofiles.os.path.isfile(file_path):
+            return json_response({'error': 'File not found'}, 404)
+        # FileResponse reads the file in a worker thread and honours Range requests.
+        return FileResponse(file_path, headers=headers, filename=download_name,
+                            content_disposition_type='attachment' if as_attachment else 'inline')
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+def _sync_handled_by_flask(request):
+    # Queued syncs, and deployments without a live API (mock data or an injected client), stay on Flask.
+    return (request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+            or not INDEED_CLIENT_ID or flask_app.config.get('INDEED_FEED_CLIENT') is not None)
+
+
+def get_feed_client():
+    global _feed_client
+    if _feed_client is None:
+        _feed_client = AsyncHttpFeedClient(INDEED_API_BASE, INDEED_CLIENT_ID, INDEED_CLIENT_SECRET)
+    return _feed_client
+
+
+async def sync_candidates(request):
+    try:
+        full = request.query_params.get('full', '').lower() in ('1', 'true', 'yes')
+        report = await run_sync_async(get_feed_client(), in_app_context, full=full)
+        return json_response({
+            'message': f"Successfully synced {report['created'] + report['updated']} candidates from Indeed",
+            'run': report
+        }, 200)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+
+# (path, methods, Flask endpoint, handler, fallback)
+ASYNC_ROUTES = [
+    ('/api/health', ['GET'], 'health_check', health_check, None),
+    ('/api/candidates', ['GET'], 'candidate.get_candidates', get_candidates, None),
+    ('/api/candidates/pipeline-stats', ['GET'], 'candidate.get_pipeline_stats', get_pipeline_stats,
+     lambda request: is_fresh_requested(request.query_params)),
+    ('/api/candidates/{candidate_id:int}', ['GET'], 'candidate.get_candidate', get_candidate, None),
+    ('/api/files/upload', ['POST'], 'files.upload_file', upload_file, None),
+    ('/api/files/{filename:path}', ['GET'], 'files.download_file', download_file, _served_by_proxy),
+    ('/api/indeed/sync-candidates', ['POST'], 'indeed.sync_candidates', sync_candidates, _sync_handled_by_flask),
+]
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if _feed_client is not None:
+        await _feed_client.aclose()
+    await async_db.dispose_engines()
+
+
+app = Starlette(
+    routes=[
+        *[Route(path, AsyncEndpoint(endpoint, handler, fallback), methods=methods)
+          for path, methods, endpoint, handler, fallback in ASYNC_ROUTES],
+        Mount('', app=wsgi),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,105 @@
+"""Async engines and sessions for the ASGI entry point (asgi.py).
+
+The same database URLs and DB_ENGINE_PROFILE settings as db_engine, with the
+driver swapped for an async one: asyncpg for Postgres, aiosqlite for SQLite.
+The models are the usual Flask-SQLAlchemy classes, which AsyncSession maps
+without any changes. session(replica=True) reads from DATABASE_REPLICA_URL
+when it is set, like @use_replica does for the Flask views.
+"""
+
+import os
+from contextlib import asynccontextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from db_engine import ENGINE_PROFILES, POOL_SETTINGS, REPLICA_BIND, default_profile
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'postgres': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+# libpq connection parameters that asyncpg does not accept as URL query arguments.
+LIBPQ_ONLY_PARAMS = ('sslmode', 'channel_binding')
+
+_sessionmakers = {}
+
+
+def async_url(url):
+    """Rewrite a DATABASE_URL for its async driver; returns (url, connect_args)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+
+    connect_args = {}
+    if ASYNC_DRIVERS[backend].endswith('asyncpg'):
+        query = dict(url.query)
+        # Neon URLs carry ?sslmode=require; asyncpg takes the same modes as its ssl argument.
+        sslmode = query.get('sslmode')
+        if sslmode:
+            connect_args['ssl'] = sslmode
+        url = url.set(query={name: value for name, value in query.items() if name not in LIBPQ_ONLY_PARAMS})
+    return url.set(drivername=ASYNC_DRIVERS[backend]), connect_args
+
+
+def async_engine_options(url, profile, statement_timeout_ms=None, connect_timeout=None):
+    """create_async_engine options mirroring db_engine.engine_options"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE '{profile}' (expected one of {', '.join(ENGINE_PROFILES)})")
+
+    url, connect_args = async_url(url)
+    if url.get_backend_name() == 'sqlite':
+        return url, {}
+
+    options = dict(ENGINE_PROFILES[profile])
+    if options.get('poolclass') is not NullPool:
+        for env_name, option in POOL_SETTINGS.items():
+            if os.getenv(env_name):
+                options[option] = int(os.getenv(env_name))
+
+    if connect_timeout:
+        connect_args['timeout'] = connect_timeout
+    if profile == 'pgbouncer':
+        # Transaction-mode poolers can hand each transaction a different server, so no prepared statements.
+        connect_args['statement_cache_size'] = 0
+        url = url.update_query_dict({'prepared_statement_cache_size': '0'})
+    elif statement_timeout_ms:
+        connect_args['server_settings'] = {'statement_timeout': str(int(statement_timeout_ms))}
+    if connect_args:
+        options['connect_args'] = connect_args
+    return url, options
+
+
+def _create_engine(url):
+    profile = os.getenv('DB_ENGINE_PROFILE', default_profile())
+    statement_timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    url, options = async_engine_options(url, profile, statement_timeout_ms, int(os.getenv('DB_CONNECT_TIMEOUT', 10)))
+    engine = create_async_engine(url, **options)
+
+    if profile == 'pgbouncer' and statement_timeout_ms and url.get_backend_name() == 'postgresql':
+        @event.listens_for(engine.sync_engine, 'begin')
+        def set_statement_timeout(conn):
+            conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(statement_timeout_ms)}')
+    return engine
+
+
+def get_sessionmaker(replica=False):
+    name = REPLICA_BIND if replica and os.getenv('DATABASE_REPLICA_URL') else 'primary'
+    factory = _sessionmakers.get(name)
+    if factory is None:
+        url = os.getenv('DATABASE_REPLICA_URL') if name == REPLICA_BIND else os.getenv('DATABASE_URL')
+        factory = _sessionmakers[name] = async_sessionmaker(
+            _create_engine(url), class_=AsyncSession, expire_on_commit=False
+        )
+    return factory
+
+
+@asynccontextmanager
+async def session(replica=False):
+    """An AsyncSession on the primary, or on the replica for read-only work"""
+    async with get_sessionmaker(replica)() as db_session:
+        yield db_session
+
+
+async def dispose_engines():
+    for factory in _sessionmakers.values():
+        await factory.kw['bind'].dispose()
+    _sessionmakers.clear()
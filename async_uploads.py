@@ -0,0 +1,149 @@
+"""Streaming multipart uploads for the ASGI entry point.
+
+The async counterpart of blob_store.StreamingUploadRequest. The request body
+is fed through a push parser as it arrives. The 'file' part is written
+straight to a staging file with async file I/O, hashed and size-checked
+chunk by chunk, so an upload is written to disk once and rejected as soon
+as it passes the limit. Other parts are collected as small form fields.
+"""
+
+import hashlib
+import os
+import tempfile
+import aiofiles
+from python_multipart.multipart import MultipartParser, parse_options_header
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class StagedUpload:
+    """Staging file written with async I/O, hashed and size-checked like HashingWriter"""
+
+    def __init__(self, filename, staging_folder, max_size=None):
+        self.filename = filename
+        self.staging_folder = staging_folder
+        self.max_size = max_size
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.path = None
+        self.file = None
+
+    async def open(self):
+        os.makedirs(self.staging_folder, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=self.staging_folder, suffix='.part')
+        os.close(fd)
+        self.file = await aiofiles.open(self.path, 'wb')
+
+    async def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise RequestEntityTooLarge()
+        self.hash.update(data)
+        await self.file.write(data)
+
+    @property
+    def sha256(self):
+        return self.hash.hexdigest()
+
+    async def close(self):
+        if self.file is not None:
+            await self.file.close()
+            self.file = None
+
+    async def discard(self):
+        # Anything not moved into the blob store by now was abandoned.
+        await self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _PartEvents:
+    """Parser callbacks that queue (kind, value) events for the async side to act on"""
+
+    def __init__(self):
+        self.events = []
+        self.header_field = b''
+        self.header_value = b''
+        self.disposition = None
+
+    def on_part_begin(self):
+        self.disposition = None
+
+    def on_header_field(self, data, start, end):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.header_field.lower() == b'content-disposition':
+            self.disposition = parse_options_header(self.header_value)[1]
+        self.header_field = self.header_value = b''
+
+    def on_headers_finished(self):
+        self.events.append(('part', self.disposition or {}))
+
+    def on_part_data(self, data, start, end):
+        self.events.append(('data', data[start:end]))
+
+    def on_part_end(self):
+        self.events.append(('end', None))
+
+    def callbacks(self):
+        return {name: getattr(self, name) for name in (
+            'on_part_begin', 'on_header_field', 'on_header_value', 'on_header_end',
+            'on_headers_finished', 'on_part_data', 'on_part_end'
+        )}
+
+    def drain(self):
+        events, self.events = self.events, []
+        return events
+
+
+async def read_upload_form(request, staging_folder, max_size=None, file_field='file'):
+    """Parse a multipart request; returns (fields, StagedUpload or None).
+
+    The caller owns the returned upload and must discard() it once its file
+    has been stored (or abandoned).
+    """
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise BadRequest('Expected a multipart/form-data body')
+
+    events = _PartEvents()
+    parser = MultipartParser(boundary, events.callbacks())
+    fields = {}
+    upload = None
+    current = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in events.drain():
+                if kind == 'part':
+                    name = value.get(b'name', b'').decode('utf-8', 'replace')
+                    filename = value.get(b'filename')
+                    if name == file_field and filename is not None and upload is None:
+                        upload = current = StagedUpload(filename.decode('utf-8', 'replace'), staging_folder, max_size)
+                        await upload.open()
+                    else:
+                        current = (name, bytearray()) if filename is None else None
+                elif kind == 'data' and isinstance(current, StagedUpload):
+                    await current.write(value)
+                elif kind == 'data' and current is not None:
+                    current[1].extend(value)
+                    if len(current[1]) > MAX_FIELD_SIZE:
+                        raise RequestEntityTooLarge()
+                elif kind == 'end':
+                    if isinstance(current, StagedUpload):
+                        await current.close()
+                    elif current is not None:
+                        fields.setdefault(current[0], current[1].decode('utf-8', 'replace'))
+                    current = None
+        parser.finalize()
+    except BaseException:
+        if upload is not None:
+            await upload.discard()
+        raise
+    return fields, upload
@@ -0,0 +1,189 @@
+"""Compare concurrent throughput of the WSGI (gunicorn) and ASGI (uvicorn) deployments.
+
+Seeds a database, then starts each server as a subprocess with the same
+worker count and drives the native async routes with --concurrency
+simultaneous clients per route. A health check, a candidate by id, a page
+of candidates, and a file download are run for --duration seconds each.
+It prints requests per second and p50/p95 latency for both servers and
+optionally writes them as JSON.
+
+Admission control is switched off in both servers so the numbers show raw
+capacity rather than configured limits. DATABASE_URL defaults to a
+temporary SQLite database. The async advantage grows with round-trip
+latency, so point DATABASE_URL at a scratch Postgres (e.g. a Neon branch)
+to see the difference a networked database makes:
+
+    python bench_asgi.py --candidates 20000 --concurrency 1 16 64 --output asgi.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SEED_BATCH = 5000
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, int(round(pct / 100 * len(ordered))) - 1)] if ordered else 0.0
+
+
+def seed(candidates):
+    """Create the schema and data both servers read; returns the paths the scenarios request"""
+    from importlib import import_module
+    from index import BLUEPRINTS, create_app, db
+
+    app = create_app()
+    for module, _, _ in BLUEPRINTS.values():
+        import_module(module)
+    import_module('models.employee')
+    from models.candidate import Candidate
+    from file_catalog import add_record
+    from files import blob_store
+    from stats import recount_candidates
+
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        existing = db.session.query(db.func.count(Candidate.id)).scalar()
+        for start in range(existing, candidates, SEED_BATCH):
+            db.session.execute(Candidate.__table__.insert(), [{
+                'first_name': 'Async', 'last_name': 'Bench', 'email': f'asgi{i}@bench.example',
+                'pipeline_status': 'Applied', 'admin_approval': 'Pending', 'created_at': now, 'updated_at': now
+            } for i in range(start, min(start + SEED_BATCH, candidates))])
+            db.session.commit()
+        recount_candidates()
+        candidate_id = db.session.query(Candidate.id).first()[0]
+
+        sha256, size = blob_store.ingest(io.BytesIO(os.urandom(64 * 1024)))
+        record = add_record(f'candidate/resume/{int(time.time())}_bench.pdf', sha256, size,
+                            'candidate', 'bench', 'resume')
+        db.session.commit()
+        file_path = record.path
+
+    return {
+        'health': '/api/health',
+        'candidate': f'/api/candidates/{candidate_id}',
+        'candidate_page': '/api/candidates?limit=50',
+        'download': f'/api/files/{file_path}',
+    }
+
+
+def start_server(kind, port, workers, threads, env):
+    if kind == 'wsgi':
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+                   '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'index:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers),
+                   '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    return subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_ready(client, base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with status {process.returncode}')
+        try:
+            if (await client.get(base_url + '/api/health')).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('Server did not become ready')
+
+
+async def drive(client, url, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+    }
+
+
+async def run_server(kind, args, paths, env):
+    import httpx
+
+    port = args.port + (0 if kind == 'wsgi' else 1)
+    base_url = f'http://127.0.0.1:{port}'
+    process = start_server(kind, port, args.workers, args.threads, env)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    results = {}
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            await wait_ready(client, base_url, process)
+            for name, path in paths.items():
+                for concurrency in args.concurrency:
+                    results[f'{name}@{concurrency}'] = await drive(client, base_url + path, concurrency, args.duration)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=5, help='seconds per route and concurrency level')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--port', type=int, default=8700)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    # The app reads these at import time, so set them before importing it.
+    scratch = tempfile.mkdtemp()
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(scratch, 'bench.db'))
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(scratch, 'uploads'))
+    os.environ['APP_STARTUP'] = 'eager'
+    os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+    paths = seed(args.candidates)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.environ.get('PYTHONPATH'), os.getcwd()])))
+
+    results = {kind: asyncio.run(run_server(kind, args, paths, env)) for kind in ('wsgi', 'asgi')}
+
+    print(f"{'route@concurrency':<24}{'wsgi req/s':>12}{'asgi req/s':>12}{'wsgi p95':>10}{'asgi p95':>10}"
+          f"{'errors':>8}")
+    for key in results['wsgi']:
+        wsgi, asgi = results['wsgi'][key], results['asgi'][key]
+        print(f"{key:<24}{wsgi['requests_per_second']:>12.1f}{asgi['requests_per_second']:>12.1f}"
+              f"{wsgi['p95_ms']:>10.1f}{asgi['p95_ms']:>10.1f}{wsgi['errors'] + asgi['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
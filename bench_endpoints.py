@@ -0,0 +1,345 @@
+"""Load-test every API route against a seeded local database.
+
+Seeds candidates, users and uploaded files, then drives each route through the
+Flask test client: one request at a time, counting SQL statements per request.
+With --server it also drives a threaded local WSGI server with --concurrency
+clients. It reports p50/p95/p99 latency, throughput and queries per request,
+and writes them as JSON. Passing an earlier results file with --compare prints
+the differences and exits non-zero on a p95 regression.
+
+Everything runs locally. DATABASE_URL defaults to a temporary SQLite database
+and UPLOAD_FOLDER to a temporary directory; point DATABASE_URL at a scratch
+Postgres database to benchmark that instead.
+
+    python bench_endpoints.py --candidates 50000 --server --output results.json
+    python bench_endpoints.py --candidates 50000 --compare results.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+SEED_BATCH = 5000
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, int(round(pct / 100 * len(ordered))) - 1)]
+
+
+def summarize(latencies, elapsed, errors, queries=None):
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+    }
+    if queries is not None:
+        result['queries_per_request'] = round(sum(queries) / len(queries), 2)
+    return result
+
+
+def seed(db, candidates, users, files):
+    """Bring the database up to the requested volumes; returns ids/paths the scenarios need"""
+    from werkzeug.security import generate_password_hash
+    from models.candidate import Candidate
+    from models.auth import AdminUser
+    from models.file_record import FileRecord
+    from file_catalog import add_record
+    from files import blob_store
+    from stats import recount_candidates
+
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    existing = db.session.query(db.func.count(Candidate.id)).scalar()
+    for start in range(existing, candidates, SEED_BATCH):
+        db.session.execute(Candidate.__table__.insert(), [{
+            'first_name': rng.choice(['Michael', 'Emily', 'James', 'Olivia', 'Robert', 'Sophia']),
+            'last_name': rng.choice(['Brown', 'Davis', 'Smith', 'Johnson', 'Garcia', 'Miller']),
+            'email': f'seed{i}@bench.example',
+            'phone': f'555-{i % 10000:04d}',
+            'indeed_registration_id': f'SEED{i}',
+            'pipeline_status': rng.choice(['Applied', 'Interviewing', 'Offered']),
+            'admin_approval': 'Pending',
+            'created_at': now,
+            'updated_at': now
+        } for i in range(start, min(start + SEED_BATCH, candidates))])
+        db.session.commit()
+    recount_candidates()
+
+    # One real hash shared by every seeded user keeps seeding fast.
+    password_hash = generate_password_hash('bench-password')
+    existing = db.session.query(db.func.count(AdminUser.id)).scalar()
+    if existing < users:
+        db.session.execute(AdminUser.__table__.insert(), [{
+            'username': f'seed_user_{i}',
+            'email': f'seed_user_{i}@bench.example',
+            'password_hash': password_hash,
+            'role': 'user',
+            'is_active': True,
+            'created_at': now
+        } for i in range(existing, users)])
+        db.session.commit()
+
+    existing = db.session.query(db.func.count(FileRecord.id)).scalar()
+    for i in range(existing, files):
+        body = f'seeded resume {i}\n'.encode() * 64
+        sha256, size = blob_store.ingest(io.BytesIO(body))
+        add_record(f'candidate/resume/seed_{i}.txt', sha256, size, 'candidate', str(i), 'Resume')
+        if i % 500 == 499:
+            db.session.commit()
+    db.session.commit()
+
+    return {
+        'candidate_ids': [row[0] for row in db.session.query(Candidate.id).order_by(Candidate.id).all()],
+        'user_ids': [row[0] for row in db.session.query(AdminUser.id).order_by(AdminUser.id).all()],
+        'file_paths': [row[0] for row in db.session.query(FileRecord.path).order_by(FileRecord.id).limit(1000).all()],
+    }
+
+
+def scenarios(data, run_id):
+    """(name, method, build(i) -> (path, request kwargs)) for every route"""
+    candidate_ids = data['candidate_ids']
+    user_ids = data['user_ids']
+    file_paths = data['file_paths']
+    # Deletes take ids from the tail so they do not collide with reads and updates.
+    doomed_candidates = candidate_ids[len(candidate_ids) // 2:][::-1]
+    doomed_users = user_ids[len(user_ids) // 2:][::-1]
+
+    def pick(ids, i):
+        return ids[i % len(ids)]
+
+    def upload(i):
+        return '/api/files/upload', {'data': {
+            'file': (io.BytesIO(f'bench upload {run_id} {i}'.encode()), f'bench_{i}.txt'),
+            'entity_type': 'candidate', 'person_id': str(i), 'category': 'Resume'
+        }, 'content_type': 'multipart/form-data'}
+
+    return [
+        ('health', 'GET', lambda i: ('/api/health', {})),
+        ('list users', 'GET', lambda i: ('/api/admin/users', {})),
+        ('create user', 'POST', lambda i: ('/api/admin/users', {'json': {
+            'username': f'bench_{run_id}_{i}', 'email': f'bench_{run_id}_{i}@bench.example',
+            'password': 'bench-password', 'role': 'user'}})),
+        ('update user', 'PUT', lambda i: (f'/api/admin/users/{pick(user_ids, i)}', {'json': {'role': 'user'}})),
+        ('delete user', 'DELETE', lambda i: (f'/api/admin/users/{doomed_users[i]}', {})),
+        ('database stats', 'GET', lambda i: ('/api/admin/database/stats', {})),
+        ('cache stats', 'GET', lambda i: ('/api/admin/cache/stats', {})),
+        ('list candidates', 'GET', lambda i: ('/api/candidates', {})),
+        ('list candidates (500)', 'GET', lambda i: ('/api/candidates?limit=500', {})),
+        ('list candidates (filtered)', 'GET', lambda i: ('/api/candidates?pipeline_status=Interviewing', {})),
+        ('stream candidates', 'GET', lambda i: ('/api/candidates?stream=ndjson&pipeline_status=Offered', {})),
+        ('search candidates', 'GET', lambda i: (f"/api/candidates/search?q={['mich', 'davis', 'ol', '555-0'][i % 4]}", {})),
+        ('get candidate', 'GET', lambda i: (f'/api/candidates/{pick(candidate_ids, i)}', {})),
+        ('create candidate', 'POST', lambda i: ('/api/candidates', {'json': {
+            'first_name': 'Bench', 'last_name': 'Run', 'email': f'bench_{run_id}_{i}@bench.example'}})),
+        ('bulk import (100)', 'POST', lambda i: ('/api/candidates/bulk', {'json': [{
+            'first_name': 'Bulk', 'last_name': 'Row', 'email': f'bulk_{run_id}_{i}_{j}@bench.example'
+        } for j in range(100)]})),
+        ('update candidate', 'PUT', lambda i: (f'/api/candidates/{pick(candidate_ids, i)}', {'json': {'phone': '555-9999'}})),
+        ('approve candidate', 'POST', lambda i: (f'/api/candidates/{pick(candidate_ids, i)}/approve', {})),
+        ('deny candidate', 'POST', lambda i: (f'/api/candidates/{pick(candidate_ids, i + 1)}/deny', {})),
+        ('transition (50)', 'POST', lambda i: ('/api/candidates/transitions', {'json': {
+            'to': 'Interviewing', 'ids': candidate_ids[(i * 50) % len(candidate_ids):][:50]}})),
+        ('pipeline stats', 'GET', lambda i: ('/api/candidates/pipeline-stats', {})),
+        ('delete candidate', 'DELETE', lambda i: (f'/api/candidates/{doomed_candidates[i]}', {})),
+        ('list files', 'GET', lambda i: ('/api/files', {})),
+        ('download file', 'GET', lambda i: (f'/api/files/{pick(file_paths, i)}', {})),
+        ('upload file', 'POST', upload),
+        ('indeed sync', 'POST', lambda i: ('/api/indeed/sync-candidates', {})),
+        ('indeed push', 'POST', lambda i: ('/api/indeed/push-candidate-status', {'json': {
+            'candidate_id': pick(candidate_ids, i)}})),
+        ('indeed push batch (50)', 'POST', lambda i: ('/api/indeed/push-candidate-status/batch', {'json': {
+            'candidate_ids': candidate_ids[(i * 50) % len(candidate_ids):][:50]}})),
+        ('indeed sync status', 'GET', lambda i: ('/api/indeed/sync-status', {})),
+    ]
+
+
+class QueryCounter:
+    """Counts SQL statements sent by every engine in the process"""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        self.count = 0
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, *args):
+        self.count += 1
+
+
+def run_test_client(app, counter, specs, requests_per_endpoint):
+    client = app.test_client()
+    results = {}
+    for name, method, build in specs:
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for i in range(requests_per_endpoint):
+            path, kwargs = build(i)
+            before = counter.count
+            request_started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            queries.append(counter.count - before)
+            errors += response.status_code >= 400
+        results[name] = summarize(latencies, time.perf_counter() - started, errors, queries)
+    return results
+
+
+def run_server(app, specs, requests_per_endpoint, concurrency):
+    import requests
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    local = threading.local()
+
+    def send(method, path, kwargs):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        if 'data' in kwargs and 'file' in kwargs['data']:
+            data = dict(kwargs['data'])
+            stream, filename = data.pop('file')
+            kwargs = {'data': data, 'files': {'file': (filename, stream)}}
+        started = time.perf_counter()
+        response = session.request(method, base_url + path, timeout=120, **kwargs)
+        return (time.perf_counter() - started) * 1000, response.status_code >= 400
+
+    results = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for name, method, build in specs:
+                # Offset indexes past the test-client pass so writes hit fresh rows.
+                calls = [build(requests_per_endpoint + i) for i in range(requests_per_endpoint)]
+                started = time.perf_counter()
+                outcomes = list(pool.map(lambda call: send(method, call[0], call[1]), calls))
+                results[name] = summarize([o[0] for o in outcomes], time.perf_counter() - started,
+                                          sum(o[1] for o in outcomes))
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(previous, current, threshold):
+    """Print p95 changes per endpoint; returns the names that regressed past threshold"""
+    regressed = []
+    for mode, endpoints in current['results'].items():
+        for name, now in endpoints.items():
+            before = previous.get('results', {}).get(mode, {}).get(name)
+            if not before:
+                continue
+            change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressed.append(f'{mode}: {name}')
+            print(f"  [{mode}] {name:<28} p95 {before['p95_ms']:>9.2f} -> {now['p95_ms']:>9.2f} ms "
+                  f"({change:+.0%}){flag}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=50, help='requests per endpoint and mode')
+    parser.add_argument('--server', action='store_true', help='also drive a threaded local WSGI server')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--no-cache', action='store_true', help='disable the response cache')
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--compare', help='earlier JSON results to diff against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p95 regression ratio that fails --compare')
+    args = parser.parse_args()
+
+    # The app reads these at import time, so set them before importing it.
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    os.environ.setdefault('UPLOAD_FOLDER', tempfile.mkdtemp())
+    os.environ['APP_STARTUP'] = 'eager'
+
+    from importlib import import_module
+    from index import BLUEPRINTS, create_app, db
+    import response_cache
+    from candidate_search import ensure_search_index
+
+    app = create_app()
+    # create_all only sees imported models; admin imports Employee lazily.
+    for module, _, _ in BLUEPRINTS.values():
+        import_module(module)
+    import_module('models.employee')
+    if args.no_cache:
+        response_cache.configure(response_cache.MemoryBackend(max_entries=0))
+
+    with app.app_context():
+        db.create_all()
+        ensure_search_index()
+        started = time.perf_counter()
+        data = seed(db, args.candidates, args.users, args.files)
+        dialect = db.engine.dialect.name
+        print(f"Seeded {len(data['candidate_ids'])} candidates, {len(data['user_ids'])} users, "
+              f"{args.files} files in {time.perf_counter() - started:.1f}s")
+
+    # Enough rows in the tails for every delete in both modes.
+    if min(len(data['candidate_ids']), len(data['user_ids'])) // 2 < args.requests * (2 if args.server else 1):
+        sys.exit('Not enough seeded candidates/users for the delete scenarios; raise --candidates/--users')
+
+    run_id = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    specs = scenarios(data, run_id)
+    counter = QueryCounter()
+    results = {'test_client': run_test_client(app, counter, specs, args.requests)}
+    if args.server:
+        results['server'] = run_server(app, specs, args.requests, args.concurrency)
+
+    for mode, endpoints in results.items():
+        print(f"\n{mode}")
+        print(f"  {'endpoint':<28}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}{'queries':>9}{'errors':>8}")
+        for name, row in endpoints.items():
+            print(f"  {name:<28}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+                  f"{row['requests_per_second'] or 0:>9.1f}{row.get('queries_per_request', ''):>9}{row['errors']:>8}")
+
+    report = {
+        'meta': {
+            'run_id': run_id,
+            'database': dialect,
+            'candidates': len(data['candidate_ids']),
+            'users': len(data['user_ids']),
+            'files': args.files,
+            'requests_per_endpoint': args.requests,
+            'concurrency': args.concurrency if args.server else None,
+            'response_cache': not args.no_cache,
+            'python': platform.python_version(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print(f"\nCompared with {args.compare} (run {previous.get('meta', {}).get('run_id')})")
+        regressed = compare(previous, report, args.threshold)
+        if regressed:
+            sys.exit(f"p95 regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
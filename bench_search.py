@@ -0,0 +1,113 @@
+"""Benchmark candidate search against a plain LIKE scan.
+
+Seeds the configured DATABASE_URL with synthetic candidates (100k by default)
+if it holds fewer than requested, builds the search indexes, then times
+indexed search and an unindexed LIKE '%term%' scan over the same queries.
+The LIKE scan returns the first matches it meets, unranked, so it is fastest
+for common terms and slowest for rare ones; search always ranks.
+Point DATABASE_URL at a scratch database; seeded rows are not removed.
+
+    python bench_search.py --rows 100000 --repeat 20
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+from sqlalchemy import or_, func
+
+from index import create_app, db
+from candidate_search import ensure_search_index, search_candidates
+
+FIRST_NAMES = ['Michael', 'Emily', 'James', 'Olivia', 'Robert', 'Sophia', 'David', 'Ava', 'Daniel', 'Mia',
+               'Joseph', 'Isabella', 'Thomas', 'Charlotte', 'Andrew', 'Amelia', 'Joshua', 'Harper', 'Ryan', 'Ella']
+LAST_NAMES = ['Brown', 'Davis', 'Smith', 'Johnson', 'Williams', 'Jones', 'Garcia', 'Miller', 'Wilson', 'Moore',
+              'Taylor', 'Anderson', 'Thomas', 'Jackson', 'White', 'Harris', 'Martin', 'Thompson', 'Lopez', 'Clark']
+QUERIES = ['mich', 'emily davis', 'smi', 'olivia.g', '555-01', 'thompson', 'ava cl', 'jos', 'harr', 'wil', 'clark 4242']
+SEED_BATCH = 5000
+
+
+def seed(count):
+    from models.candidate import Candidate
+
+    existing = db.session.query(func.count(Candidate.id)).scalar()
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    for start in range(existing, count, SEED_BATCH):
+        rows = []
+        for i in range(start, min(start + SEED_BATCH, count)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append({
+                'first_name': first,
+                'last_name': last,
+                'email': f'{first.lower()}.{last.lower()}.{i}@bench.example',
+                'phone': f'555-{i % 10000:04d}',
+                'pipeline_status': 'Applied',
+                'admin_approval': 'Pending',
+                'created_at': now,
+                'updated_at': now
+            })
+        db.session.execute(Candidate.__table__.insert(), rows)
+        db.session.commit()
+    return max(existing, count)
+
+
+def like_scan(q, limit):
+    from models.candidate import Candidate
+
+    query = Candidate.query
+    for term in q.split():
+        pattern = f'%{term}%'
+        query = query.filter(or_(
+            Candidate.first_name.ilike(pattern),
+            Candidate.last_name.ilike(pattern),
+            Candidate.email.ilike(pattern),
+            Candidate.phone.ilike(pattern)
+        ))
+    return query.order_by(Candidate.id).limit(limit).all()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        for q in QUERIES:
+            started = time.perf_counter()
+            fn(q)
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'p50_ms': round(statistics.median(samples), 2),
+        'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 2),
+        'mean_ms': round(statistics.fmean(samples), 2)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        rows = seed(args.rows)
+        print(f"Seeded to {rows} candidates in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        ensure_search_index()
+        print(f"Search indexes ready in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':<12}{'matches':>8}")
+        for q in QUERIES:
+            print(f"{q:<12}{len(search_candidates(q, args.limit)):>8}")
+
+        print("indexed search:", timed(lambda q: search_candidates(q, args.limit), args.repeat))
+        print("LIKE scan:     ", timed(lambda q: like_scan(q, args.limit), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark candidate serialization cost per 10k rows.
+
+Compares full ORM rows through to_dict() against ?fields= style column
+projections, each serialized with Flask's default provider, the stdlib
+provider and orjson (when installed). Load time (query plus hydration) and
+encode time are reported separately, as the median over --repeat runs.
+Uses DATABASE_URL if set, otherwise a temporary SQLite database.
+
+    python bench_serialization.py --rows 10000 --repeat 7
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+LIST_FIELDS = ['id', 'first_name', 'last_name', 'pipeline_status', 'admin_approval']
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'serialization.db'))
+
+    from flask.json.provider import DefaultJSONProvider
+    from index import create_app, db
+    from models.candidate import Candidate
+    from candidate import project, serializer
+    from json_provider import PROVIDERS, orjson
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(db.func.count(Candidate.id)).scalar()
+        now = datetime.utcnow()
+        if existing < args.rows:
+            db.session.execute(Candidate.__table__.insert(), [{
+                'first_name': f'First{i}', 'last_name': f'Last{i}', 'email': f'serial{i}@bench.example',
+                'phone': '555-0100', 'pipeline_status': 'Applied', 'admin_approval': 'Pending',
+                'indeed_registration_id': f'REG{i}', 'last_sync_timestamp': now,
+                'created_at': now, 'updated_at': now
+            } for i in range(existing, args.rows)])
+            db.session.commit()
+
+        providers = {'flask default': DefaultJSONProvider(app), 'stdlib': PROVIDERS['json'](app)}
+        if orjson is not None:
+            providers['orjson'] = PROVIDERS['orjson'](app)
+
+        scale = 10000 / args.rows
+        print(f"{'shape':<22}{'provider':<15}{'load ms/10k':>13}{'encode ms/10k':>15}{'bytes/row':>11}")
+        for shape, fields in (('full to_dict()', None), ('fields (5 columns)', LIST_FIELDS)):
+            serialize = serializer(fields)
+            for name, provider in providers.items():
+                loads, encodes = [], []
+                for _ in range(args.repeat):
+                    db.session.expunge_all()
+                    started = time.perf_counter()
+                    rows = [serialize(row) for row in project(Candidate.query, fields).limit(args.rows)]
+                    loads.append(time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    with app.test_request_context():
+                        body = provider.response({'candidates': rows}).get_data()
+                    encodes.append(time.perf_counter() - started)
+                print(f"{shape:<22}{name:<15}{statistics.median(loads) * 1000 * scale:>13.1f}"
+                      f"{statistics.median(encodes) * 1000 * scale:>15.1f}{len(body) / len(rows):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark cold start in eager and lazy startup modes.
+
+Each sample runs in a fresh interpreter. It times `import index`, then the
+first /api/health response, then the first response from each blueprint, and
+records whether SQLAlchemy had been imported before the health check
+answered. Uses DATABASE_URL if set, otherwise a temporary SQLite database.
+
+    python bench_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PATHS = ['/api/health', '/api/admin/users', '/api/candidates', '/api/files', '/api/indeed/sync-status']
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import index
+result = {'import_ms': (time.perf_counter() - started) * 1000, 'sqlalchemy_at_health': None}
+from werkzeug.test import Client
+client = Client(index.app)
+for path in %r:
+    started = time.perf_counter()
+    response = client.get(path)
+    result[path] = (time.perf_counter() - started) * 1000
+    result[path + ' status'] = response.status_code
+    if path == '/api/health':
+        result['sqlalchemy_at_health'] = 'sqlalchemy' in sys.modules
+print(json.dumps(result))
+""" % (PATHS,)
+
+SETUP = """
+import index
+from importlib import import_module
+for module, _, _ in index.BLUEPRINTS.values():
+    import_module(module)
+with index.app.app_context():
+    index.db.create_all()
+"""
+
+
+def run_child(code, env):
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return output.stdout.strip().splitlines()[-1] if output.stdout.strip() else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not env.get('DATABASE_URL'):
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'startup.db')
+    env['UPLOAD_FOLDER'] = env.get('UPLOAD_FOLDER') or tempfile.mkdtemp()
+    run_child(SETUP, dict(env, APP_STARTUP='eager'))
+
+    for mode in ('eager', 'lazy'):
+        samples = [json.loads(run_child(CHILD, dict(env, APP_STARTUP=mode))) for _ in range(args.repeat)]
+        print(f"{mode} (median of {args.repeat}, SQLAlchemy loaded before health: "
+              f"{samples[0]['sqlalchemy_at_health']})")
+        print(f"  {'import index':<28}{statistics.median(s['import_ms'] for s in samples):>9.1f} ms")
+        for path in PATHS:
+            status = samples[0][path + ' status']
+            print(f"  {'first ' + path:<28}{statistics.median(s[path] for s in samples):>9.1f} ms  [{status}]")
+
+
+if __name__ == "__main__":
+    main()
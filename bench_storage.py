@@ -0,0 +1,108 @@
+"""Exercise and time both storage backends, with S3 served by fake_s3.py.
+
+For the local backend and for S3Backend against an in-process fake_s3 server,
+it stores --blobs bodies of --size bytes, then checks, downloads, lists and
+deletes them. Every downloaded body is compared with what was written and
+the script exits non-zero on any mismatch. It prints operations per second
+for each step.
+
+    python bench_storage.py --blobs 200 --size 65536
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+
+def run(backend, bodies, staging):
+    timings = {}
+    keys = {}
+
+    started = time.perf_counter()
+    for body in bodies:
+        sha256 = hashlib.sha256(body).hexdigest()
+        key = f'{sha256[:2]}/{sha256[2:4]}/{sha256}'
+        path = os.path.join(staging, f'{sha256}.part')
+        with open(path, 'wb') as f:
+            f.write(body)
+        backend.put(path, key, sha256)
+        keys[key] = body
+    timings['put'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if not all(backend.exists(key) for key in keys):
+        sys.exit('exists() missed a stored blob')
+    timings['exists'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    target = os.path.join(staging, 'download')
+    for key, body in keys.items():
+        if not backend.download(key, target):
+            sys.exit(f'download() could not find {key}')
+        with open(target, 'rb') as f:
+            if f.read() != body:
+                sys.exit(f'Downloaded body for {key} does not match')
+    timings['download'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    listed = set(backend.keys())
+    if listed != set(keys):
+        sys.exit(f'keys() listed {len(listed)} blobs, expected {len(keys)}')
+    timings['list'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for key in keys:
+        backend.delete(key)
+    if any(backend.exists(key) for key in keys):
+        sys.exit('delete() left a blob behind')
+    timings['delete'] = time.perf_counter() - started
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--blobs', type=int, default=200)
+    parser.add_argument('--size', type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    from werkzeug.serving import make_server
+    from fake_s3 import create_fake_s3
+    from storage_backends import LocalBackend, S3Backend
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, create_fake_s3('bench', 'bench-secret'), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    root = tempfile.mkdtemp()
+    staging = os.path.join(root, 'staging')
+    os.makedirs(staging)
+    bodies = [os.urandom(args.size) for _ in range(args.blobs)]
+    backends = {
+        'local': LocalBackend(os.path.join(root, 'blobs')),
+        's3 (fake)': S3Backend(f'http://127.0.0.1:{server.server_port}', 'uploads', 'bench', 'bench-secret',
+                               prefix='blobs/'),
+    }
+
+    try:
+        print(f'{args.blobs} blobs of {args.size} bytes; operations per second')
+        print(f"{'backend':<12}{'put':>10}{'exists':>10}{'download':>10}{'list':>10}{'delete':>10}")
+        for name, backend in backends.items():
+            timings = run(backend, bodies, staging)
+            print(f'{name:<12}' + ''.join(
+                f'{(1 if step == "list" else args.blobs) / timings[step]:>10.0f}'
+                for step in ('put', 'exists', 'download', 'list', 'delete')
+            ))
+    finally:
+        server.shutdown()
+        shutil.rmtree(root)
+    print('\nAll round trips matched.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Show that GET /api/stream/stats keeps DB load flat as subscribers grow.
+
+For each subscriber count it opens that many SSE connections to a threaded
+local WSGI server, then creates candidates at a fixed rate for a fixed time.
+It counts the SQL statements the stats broadcaster issues and the stats
+events each subscriber receives. Broadcaster queries should track the
+number of writes and polls, not the number of subscribers. The script exits
+non-zero if the largest round needs more than --tolerance times the queries
+of the smallest.
+
+DATABASE_URL defaults to a temporary SQLite database.
+
+    python bench_stream.py --subscribers 1 10 50 --duration 5 --writes-per-second 4
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--duration', type=float, default=5, help='seconds per round')
+    parser.add_argument('--writes-per-second', type=float, default=4)
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+
+    # The app reads these at import time, so set them before importing it.
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    os.environ['APP_STARTUP'] = 'eager'
+    os.environ.setdefault('STATS_STREAM_POLL', '0.2')
+    os.environ.setdefault('STATS_STREAM_HEARTBEAT', '0.5')
+
+    import requests
+    from importlib import import_module
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from werkzeug.serving import make_server
+    from index import BLUEPRINTS, create_app, db
+
+    app = create_app()
+    for module, _, _ in BLUEPRINTS.values():
+        import_module(module)
+    import_module('models.employee')
+    with app.app_context():
+        db.create_all()
+
+    stream_queries = [0]
+
+    def count_stream_query(*_):
+        if threading.current_thread().name == 'stats-stream':
+            stream_queries[0] += 1
+
+    event.listen(Engine, 'before_cursor_execute', count_stream_query)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    client = app.test_client()
+    write_number = [0]
+
+    def subscribe(received, stop):
+        with requests.get(base_url + '/api/stream/stats', stream=True, timeout=30) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith('id:'):
+                    received.append(line)
+                if stop.is_set():
+                    break
+
+    rounds = []
+    try:
+        for subscribers in args.subscribers:
+            stop = threading.Event()
+            received = [[] for _ in range(subscribers)]
+            threads = [threading.Thread(target=subscribe, args=(events, stop), daemon=True) for events in received]
+            for thread in threads:
+                thread.start()
+            time.sleep(1)
+
+            before = stream_queries[0]
+            writes = int(args.duration * args.writes_per_second)
+            for _ in range(writes):
+                write_number[0] += 1
+                client.post('/api/candidates', json={
+                    'first_name': 'Stream', 'last_name': 'Bench', 'email': f'stream{write_number[0]}@example.com'
+                })
+                time.sleep(1 / args.writes_per_second)
+            time.sleep(1)
+            queries = stream_queries[0] - before
+
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            per_subscriber = [len(events) for events in received]
+            rounds.append((subscribers, writes, queries, min(per_subscriber), max(per_subscriber)))
+            time.sleep(1)
+    finally:
+        server.shutdown()
+
+    print(f"{'subscribers':>12}{'writes':>8}{'db queries':>12}{'events min':>12}{'events max':>12}")
+    for subscribers, writes, queries, fewest, most in rounds:
+        print(f"{subscribers:>12}{writes:>8}{queries:>12}{fewest:>12}{most:>12}")
+
+    smallest, largest = rounds[0][2], rounds[-1][2]
+    if largest > max(smallest, 1) * args.tolerance:
+        sys.exit(f'Broadcaster queries grew from {smallest} to {largest} with more subscribers')
+    print(f'\nBroadcaster queries stayed within {args.tolerance}x across subscriber counts.')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Content-addressed storage for uploaded files.
+
+Uploads are streamed into a staging file in fixed-size chunks, with the
+SHA-256 computed and the size limit enforced on the same pass. The finished
+file is handed to a storage backend (see storage_backends) under
+<aa>/<bb>/<sha256>, so identical documents uploaded for several people are
+stored once. A file_blobs row counts the catalog entries that point at each
+blob, and the blob is removed when the last one is deleted.
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from flask import Request, current_app
+from sqlalchemy import select
+from werkzeug.exceptions import RequestEntityTooLarge
+from models.user import db
+from models.file_blob import FileBlob
+from db_helpers import insert_for_dialect
+from storage_backends import LocalBackend, blob_key
+
+CHUNK_SIZE = 1024 * 1024
+BLOB_DIR = '.blobs'
+STAGING_DIR = '.staging'
+
+
+class HashingWriter:
+    """Staging file that hashes and size-checks everything written to it"""
+
+    def __init__(self, staging_folder, max_size=None):
+        os.makedirs(staging_folder, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=staging_folder, suffix='.part')
+        self.file = os.fdopen(fd, 'w+b')
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            # Nobody else will close a stream that fails mid-parse.
+            self.close()
+            raise RequestEntityTooLarge()
+        self.hash.update(data)
+        return self.file.write(data)
+
+    def copy_from(self, stream):
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            self.write(chunk)
+
+    @property
+    def sha256(self):
+        return self.hash.hexdigest()
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        # Anything not moved into the blob store by now was abandoned.
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class StreamingUploadRequest(Request):
+    """Request that streams multipart file parts straight into a HashingWriter.
+
+    This replaces werkzeug's spooled temp file, so each upload is written to
+    disk once and rejected as soon as it passes the size limit.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        staging_folder = current_app.config.get('UPLOAD_STAGING_FOLDER')
+        if staging_folder is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return HashingWriter(staging_folder, current_app.config.get('MAX_UPLOAD_FILE_SIZE'))
+
+
+class BlobStore:
+    def __init__(self, root, backend=None):
+        self.root = root
+        self.staging_folder = os.path.join(root, STAGING_DIR)
+        self.backend = backend or LocalBackend(os.path.join(root, BLOB_DIR))
+
+    def blob_path(self, sha256):
+        """Filesystem path of a blob, or None when the backend is remote"""
+        return self.backend.local_path(blob_key(sha256))
+
+    def download_url(self, sha256, filename, as_attachment=False):
+        return self.backend.download_url(blob_key(sha256), filename, as_attachment)
+
+    @contextmanager
+    def local_file(self, sha256):
+        """A readable local path for a blob (a temporary copy for remote backends), or None if missing"""
+        path = self.blob_path(sha256)
+        if path is not None:
+            yield path if os.path.exists(path) else None
+            return
+        os.makedirs(self.staging_folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.staging_folder, suffix='.blob')
+        os.close(fd)
+        try:
+            yield temp_path if self.backend.download(blob_key(sha256), temp_path) else None
+        finally:
+            os.remove(temp_path)
+
+    def writer(self, max_size=None):
+        return HashingWriter(self.staging_folder, max_size)
+
+    def ingest(self, stream, max_size=None):
+        """Store a stream, returning (sha256, size). Takes ownership of HashingWriter streams."""
+        if isinstance(stream, HashingWriter):
+            writer = stream
+        else:
+            writer = self.writer(max_size)
+            try:
+                writer.copy_from(stream)
+            except Exception:
+                writer.close()
+                raise
+        return self.commit(writer)
+
+    def commit(self, writer):
+        """Move a finished staging file into the store"""
+        writer.flush()
+        writer.file.close()
+        try:
+            return self.store(writer.path, writer.sha256, writer.size)
+        finally:
+            writer.close()
+
+    def adopt(self, path):
+        """Hash an already assembled file (e.g. a finished resumable upload) and move it into the store"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        return self.store(path, digest.hexdigest(), size)
+
+    def store(self, path, sha256, size):
+        """Move a finished file whose hash and size are already known into the store"""
+        table = FileBlob.__table__
+        stmt = insert_for_dialect(table).values(sha256=sha256, size=size, ref_count=1, created_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sha256],
+            set_={'ref_count': table.c.ref_count + 1}
+        )
+        db.session.execute(stmt)
+
+        key = blob_key(sha256)
+        if self.backend.exists(key):
+            os.remove(path)
+        else:
+            self.backend.put(path, key, sha256)
+        return sha256, size
+
+    def release(self, sha256):
+        """Drop one reference to a blob; returns sha256 if nothing references it any more.
+
+        The row stays behind at ref_count 0. After committing, the caller
+        passes the returned hash to discard_if_unreferenced(), so a
+        rolled-back delete never loses data.
+        """
+        table = FileBlob.__table__
+        db.session.execute(
+            table.update().where(table.c.sha256 == sha256).values(ref_count=table.c.ref_count - 1)
+        )
+        ref_count = db.session.execute(select(table.c.ref_count).where(table.c.sha256 == sha256)).scalar()
+        return sha256 if ref_count is not None and ref_count <= 0 else None
+
+    def discard_if_unreferenced(self, sha256):
+        """Delete a released blob and its row unless an upload has claimed it again since; commits.
+
+        Returns True if the blob was deleted.
+        """
+        table = FileBlob.__table__
+        # store() upserts this row before checking whether the body exists, so holding its lock
+        # while deleting means an upload either sees the body gone or bumps ref_count first.
+        ref_count = db.session.execute(
+            select(table.c.ref_count).where(table.c.sha256 == sha256).with_for_update()
+        ).scalar()
+        unreferenced = ref_count is not None and ref_count <= 0
+        if unreferenced:
+            self.backend.delete(blob_key(sha256))
+            db.session.execute(table.delete().where(table.c.sha256 == sha256))
+        db.session.commit()
+        return unreferenced
+
+    def delete(self, key):
+        self.backend.delete(key)
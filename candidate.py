@@ -1,26 +1,154 @@
-from flask import Blueprint, request, jsonify
+import base64
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from sqlalchemy import tuple_, func, text, update
 from models.user import db
 from models.candidate import Candidate
+from db_engine import use_replica
+from admission import route_class
+from response_cache import cached, invalidate, candidate_tag
+from candidate_import import parse_rows, import_candidates, BulkImportError, DuplicateEmailError, MAX_BULK_ROWS
+from stats import candidate_key, track_candidate, candidate_counts, pipeline_summary, is_fresh_requested
+from candidate_search import search_candidates, search_terms
+from candidate_transitions import transition_candidates, TransitionError
 from datetime import datetime
 
 candidate_bp = Blueprint('candidate', __name__)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+CANDIDATE_FIELDS = tuple(Candidate.__table__.columns.keys())
+
+LISTING_INDEX = 'ix_candidates_updated_at_id'
+
+# Keyset pagination walks (updated_at, id) newest first, so back it with an index.
+db.Index(LISTING_INDEX, Candidate.updated_at, Candidate.id)
+
+def ensure_listing_index():
+    """Backfill legacy rows with no updated_at and create the pagination index on existing tables"""
+    table = Candidate.__table__
+    # A NULL updated_at cannot be put in a cursor and falls outside the (updated_at, id) comparison.
+    db.session.execute(
+        update(table).where(table.c.updated_at.is_(None))
+        .values(updated_at=func.coalesce(table.c.created_at, datetime.utcnow()))
+    )
+    db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {LISTING_INDEX} ON {table.name} (updated_at, id)'))
+    db.session.commit()
+
+def encode_cursor(candidate):
+    """Build an opaque cursor pointing just past the given candidate"""
+    raw = f"{candidate.updated_at.isoformat()}|{candidate.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Turn a cursor back into an (updated_at, id) pair, raising ValueError if malformed"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    updated_at, candidate_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    return datetime.fromisoformat(updated_at), int(candidate_id)
+
+def filtered_candidates(args):
+    """Apply the listing filters shared by the candidate read endpoints"""
+    query = Candidate.query
+
+    pipeline_status = args.get('pipeline_status')
+    admin_approval = args.get('admin_approval')
+
+    if pipeline_status:
+        query = query.filter(Candidate.pipeline_status == pipeline_status)
+    if admin_approval:
+        query = query.filter(Candidate.admin_approval == admin_approval)
+
+    return query
+
+def sparse_fields(args):
+    """Field names requested with ?fields= (id always first), or None for full rows"""
+    raw = args.get('fields')
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in CANDIDATE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(CANDIDATE_FIELDS)})")
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
+
+def project(query, fields, extra=()):
+    """Select only the given columns (plus extra ones the caller needs), skipping ORM hydration"""
+    if fields is None:
+        return query
+    return query.with_entities(*[getattr(Candidate, name) for name in dict.fromkeys([*fields, *extra])])
+
+def serializer(fields):
+    """Row -> dict for full Candidate objects or projected rows"""
+    if fields is None:
+        return lambda candidate: candidate.to_dict()
+    return lambda row: {field: getattr(row, field) for field in fields}
+
+def _stream_candidates(query, fmt, serialize):
+    """Yield candidates as NDJSON lines or as a chunked JSON array"""
+    rows = query.yield_per(STREAM_BATCH_SIZE)
+    dumps = current_app.json.dumps
+
+    if fmt == 'ndjson':
+        for row in rows:
+            yield dumps(serialize(row)) + '\n'
+        return
+
+    yield '['
+    first = True
+    for row in rows:
+        yield ('' if first else ',') + dumps(serialize(row))
+        first = False
+    yield ']'
+
 @candidate_bp.route('/candidates', methods=['GET'])
+@cached('candidates')
+@use_replica
 def get_candidates():
-    """Get all candidates with optional filtering"""
+    """Get candidates with optional filtering, sparse fields, keyset pagination and streaming"""
     try:
-        pipeline_status = request.args.get('pipeline_status')
-        admin_approval = request.args.get('admin_approval')
-        
-        query = Candidate.query
-        
-        if pipeline_status:
-            query = query.filter(Candidate.pipeline_status == pipeline_status)
-        if admin_approval:
-            query = query.filter(Candidate.admin_approval == admin_approval)
-            
-        candidates = query.all()
-        return jsonify([candidate.to_dict() for candidate in candidates])
+        try:
+            fields = sparse_fields(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = filtered_candidates(request.args)
+
+        after = request.args.get('after')
+        if after:
+            try:
+                after_updated_at, after_id = decode_cursor(after)
+            except (ValueError, UnicodeDecodeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(
+                tuple_(Candidate.updated_at, Candidate.id) < tuple_(after_updated_at, after_id)
+            )
+
+        query = query.order_by(Candidate.updated_at.desc(), Candidate.id.desc())
+        # The cursor is built from (updated_at, id), so those are always selected.
+        query = project(query, fields, extra=('updated_at',))
+        serialize = serializer(fields)
+
+        stream = request.args.get('stream')
+        if stream:
+            if stream not in ('ndjson', 'json'):
+                return jsonify({'error': 'stream must be ndjson or json'}), 400
+            mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+            return Response(stream_with_context(_stream_candidates(query, stream, serialize)), mimetype=mimetype)
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        # Fetch one extra row to learn whether another page exists.
+        candidates = query.limit(limit + 1).all()
+        has_more = len(candidates) > limit
+        candidates = candidates[:limit]
+
+        return jsonify({
+            'candidates': [serialize(candidate) for candidate in candidates],
+            'next_cursor': encode_cursor(candidates[-1]) if has_more else None
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -50,17 +178,96 @@ def create_candidate():
         )
         
         db.session.add(candidate)
+        track_candidate(None, candidate_key(candidate))
         db.session.commit()
+        invalidate('candidates')
         
         return jsonify(candidate.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@candidate_bp.route('/candidates/bulk', methods=['POST'])
+@route_class('heavy_write')
+def bulk_import_candidates():
+    """Create or update many candidates from a JSON array, NDJSON or CSV body"""
+    try:
+        try:
+            rows = parse_rows(request.get_data(), request.content_type)
+        except BulkImportError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not rows:
+            return jsonify({'error': 'No candidates provided'}), 400
+        if len(rows) > MAX_BULK_ROWS:
+            return jsonify({'error': f'Too many rows (max {MAX_BULK_ROWS})'}), 413
+        
+        try:
+            results = import_candidates(rows)
+        except DuplicateEmailError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e), 'duplicate_emails': e.emails}), 409
+        invalidate('candidates', *[
+            candidate_tag(result['id']) for result in results if result['status'] == 'updated'
+        ])
+        
+        return jsonify({
+            'created': sum(1 for result in results if result['status'] == 'created'),
+            'updated': sum(1 for result in results if result['status'] == 'updated'),
+            'failed': sum(1 for result in results if result['status'] == 'error'),
+            'results': results
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@candidate_bp.route('/candidates/search', methods=['GET'])
+@cached('candidates')
+@use_replica
+def search_candidates_view():
+    """Ranked prefix/fuzzy search over candidate name, email and phone"""
+    try:
+        q = request.args.get('q', '').strip()
+        if not search_terms(q):
+            return jsonify({'error': 'q is required'}), 400
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = max(0, offset)
+
+        # Fetch one extra match to learn whether another page exists.
+        matches = search_candidates(q, limit + 1, offset)
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+
+        return jsonify({
+            'candidates': [dict(candidate.to_dict(), rank=round(float(rank), 6)) for candidate, rank in matches],
+            'next_offset': offset + limit if has_more else None
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @candidate_bp.route('/candidates/<int:candidate_id>', methods=['GET'])
+@cached(lambda candidate_id: candidate_tag(candidate_id))
+@use_replica
 def get_candidate(candidate_id):
-    """Get a specific candidate by ID"""
+    """Get a specific candidate by ID (?fields= selects columns)"""
     try:
+        try:
+            fields = sparse_fields(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if fields is not None:
+            row = project(Candidate.query, fields).filter(Candidate.id == candidate_id).first()
+            if row is None:
+                return jsonify({'error': 'Candidate not found'}), 404
+            return jsonify(serializer(fields)(row))
+
         candidate = Candidate.query.get_or_404(candidate_id)
         return jsonify(candidate.to_dict())
     except Exception as e:
@@ -71,6 +278,7 @@ def update_candidate(candidate_id):
     """Update a candidate"""
     try:
         candidate = Candidate.query.get_or_404(candidate_id)
+        before = candidate_key(candidate)
         data = request.get_json()
         
         if 'first_name' in data:
@@ -97,7 +305,9 @@ def update_candidate(candidate_id):
             candidate.indeed_status = data['indeed_status']
             
         candidate.updated_at = datetime.utcnow()
+        track_candidate(before, candidate_key(candidate))
         db.session.commit()
+        invalidate('candidates', candidate_tag(candidate_id))
         
         return jsonify(candidate.to_dict())
     except Exception as e:
@@ -109,8 +319,10 @@ def delete_candidate(candidate_id):
     """Delete a candidate"""
     try:
         candidate = Candidate.query.get_or_404(candidate_id)
+        track_candidate(candidate_key(candidate), None)
         db.session.delete(candidate)
         db.session.commit()
+        invalidate('candidates', candidate_tag(candidate_id))
         
         return jsonify({'message': 'Candidate deleted successfully'})
     except Exception as e:
@@ -122,11 +334,14 @@ def approve_candidate(candidate_id):
     """Approve a candidate"""
     try:
         candidate = Candidate.query.get_or_404(candidate_id)
+        before = candidate_key(candidate)
         candidate.admin_approval = 'Approved'
         candidate.pipeline_status = 'Approved'
         candidate.updated_at = datetime.utcnow()
+        track_candidate(before, candidate_key(candidate))
         
         db.session.commit()
+        invalidate('candidates', candidate_tag(candidate_id))
         
         return jsonify(candidate.to_dict())
     except Exception as e:
@@ -138,31 +353,54 @@ def deny_candidate(candidate_id):
     """Deny a candidate"""
     try:
         candidate = Candidate.query.get_or_404(candidate_id)
+        before = candidate_key(candidate)
         candidate.admin_approval = 'Denied'
         candidate.pipeline_status = 'Denied'
         candidate.updated_at = datetime.utcnow()
+        track_candidate(before, candidate_key(candidate))
         
         db.session.commit()
+        invalidate('candidates', candidate_tag(candidate_id))
         
         return jsonify(candidate.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@candidate_bp.route('/candidates/transitions', methods=['POST'])
+@route_class('heavy_write')
+def transition_candidates_view():
+    """Move many candidates to a pipeline status in one statement"""
+    try:
+        data = request.get_json() or {}
+        try:
+            moved = transition_candidates(data.get('to'), ids=data.get('ids'), filters=data.get('filter'))
+        except TransitionError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Serialize before commit expires the rows, or each one reloads itself.
+        updated = [candidate.to_dict() for candidate, _ in moved]
+        db.session.commit()
+        invalidate('candidates', *[candidate_tag(row['id']) for row in updated])
+
+        moved_ids = {row['id'] for row in updated}
+        return jsonify({
+            'updated': updated,
+            'skipped_ids': [i for i in data['ids'] if i not in moved_ids] if data.get('ids') is not None else []
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @candidate_bp.route('/candidates/pipeline-stats', methods=['GET'])
+@route_class('stats')
+@cached('candidates')
+@use_replica
 def get_pipeline_stats():
-    """Get pipeline statistics"""
+    """Get pipeline statistics from the maintained counters (?fresh=1 counts candidates directly)"""
     try:
-        stats = {
-            'total': Candidate.query.count(),
-            'applied': Candidate.query.filter(Candidate.pipeline_status == 'Applied').count(),
-            'interviewing': Candidate.query.filter(Candidate.pipeline_status == 'Interviewing').count(),
-            'offered': Candidate.query.filter(Candidate.pipeline_status == 'Offered').count(),
-            'approved': Candidate.query.filter(Candidate.admin_approval == 'Approved').count(),
-            'denied': Candidate.query.filter(Candidate.admin_approval == 'Denied').count(),
-            'pending': Candidate.query.filter(Candidate.admin_approval == 'Pending').count()
-        }
-        
-        return jsonify(stats)
+        counts = candidate_counts(fresh=is_fresh_requested(request.args))
+        return jsonify(pipeline_summary(counts))
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
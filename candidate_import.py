@@ -0,0 +1,240 @@
+"""Bulk candidate import for POST /api/candidates/bulk.
+
+Rows arrive as a JSON array, NDJSON or CSV. They are validated in one pass and
+written with multi-row INSERT ... ON CONFLICT (email) DO UPDATE statements, one
+per batch. A row that fails validation or trips a database error is reported
+back on its own without aborting the rest of the import.
+
+ON CONFLICT (email) needs a unique index on candidates.email, which create_all
+does not add to an existing table. ensure_email_index() creates it. init_db
+runs it, and SQLite databases also get it on first import; while duplicate
+emails block the index, imports are refused with DuplicateEmailError.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import func, text
+from sqlalchemy.exc import SQLAlchemyError
+from models.user import db
+from models.candidate import Candidate
+from db_helpers import insert_for_dialect, dialect_name
+from stats import adjust_candidate_counts
+from change_feed import record_changes
+
+BATCH_SIZE = 500
+MAX_BULK_ROWS = 10000
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'email')
+CANDIDATE_FIELDS = (
+    'first_name', 'last_name', 'email', 'phone', 'resume_path',
+    'pipeline_status', 'admin_approval', 'indeed_registration_id',
+    'ats_candidate_id', 'ats_application_id', 'indeed_status'
+)
+INSERT_DEFAULTS = {'pipeline_status': 'Applied', 'admin_approval': 'Pending'}
+EMAIL_INDEX = 'uq_candidates_email'
+
+# ON CONFLICT (email) needs a unique index to arbitrate on.
+if not Candidate.__table__.c.email.unique:
+    db.Index(EMAIL_INDEX, Candidate.email, unique=True)
+
+_sqlite_ready = False
+
+
+class BulkImportError(ValueError):
+    """Raised when the request body as a whole cannot be read"""
+
+
+class DuplicateEmailError(Exception):
+    """Raised when existing duplicate emails keep the unique email index from being created"""
+
+    def __init__(self, emails):
+        super().__init__('Unique email index is missing; merge the duplicate candidates first: ' + ', '.join(emails))
+        self.emails = emails
+
+
+def duplicate_emails(limit=20):
+    """Emails shared by more than one candidate, which block the unique index"""
+    return [email for (email,) in db.session.query(Candidate.email).group_by(Candidate.email)
+            .having(func.count(Candidate.id) > 1).order_by(Candidate.email).limit(limit)]
+
+
+def ensure_email_index():
+    """Create the unique email index if missing; returns the duplicate emails that prevent it, if any.
+
+    Existing duplicates are left for an admin to merge rather than deleted here.
+    """
+    global _sqlite_ready
+    if not Candidate.__table__.c.email.unique:
+        duplicates = duplicate_emails()
+        if duplicates:
+            return duplicates
+        db.session.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS {EMAIL_INDEX} ON {Candidate.__tablename__} (email)'))
+        db.session.commit()
+    _sqlite_ready = True
+    return []
+
+
+def parse_rows(body, content_type):
+    """Split a request body into (row_number, row_or_error) pairs"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    text = body.decode('utf-8-sig') if isinstance(body, bytes) else body
+
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError as e:
+                rows.append((number, BulkImportError(f'Invalid JSON: {e}')))
+        return rows
+
+    if content_type in ('text/csv', 'application/csv'):
+        reader = csv.DictReader(io.StringIO(text))
+        # A blank cell means "not supplied", so it neither clears a stored value nor overrides a default.
+        return [
+            (number, {key: value for key, value in row.items() if key and value not in ('', None)})
+            for number, row in enumerate(reader, start=1)
+        ]
+
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise BulkImportError(f'Invalid JSON body: {e}')
+    if isinstance(data, dict):
+        data = data.get('candidates')
+    if not isinstance(data, list):
+        raise BulkImportError('Expected a JSON array of candidates')
+    return list(enumerate(data, start=1))
+
+
+def validate_rows(rows):
+    """Check every row in one pass; returns (valid_rows, errors)"""
+    valid = []
+    errors = []
+    seen_emails = {}
+
+    for number, row in rows:
+        if isinstance(row, Exception):
+            errors.append({'row': number, 'status': 'error', 'error': str(row)})
+            continue
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'status': 'error', 'error': 'Row must be an object'})
+            continue
+
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            errors.append({'row': number, 'status': 'error',
+                           'error': f'Missing required field: {missing[0]}'})
+            continue
+
+        values = {field: row[field] for field in CANDIDATE_FIELDS if field in row}
+        values['email'] = str(values['email']).strip()
+
+        # Postgres refuses to update the same row twice in one statement.
+        if values['email'] in seen_emails:
+            errors.append({'row': number, 'status': 'error',
+                           'error': f"Duplicate email in batch (first seen on row {seen_emails[values['email']]})"})
+            continue
+        seen_emails[values['email']] = number
+
+        valid.append((number, values))
+
+    return valid, errors
+
+
+def _upsert_statement(columns, rows):
+    """Build one multi-row upsert that only overwrites the columns the rows supplied"""
+    table = Candidate.__table__
+    stmt = insert_for_dialect(table).values(rows)
+    update_columns = [column for column in columns if column != 'email'] + ['updated_at']
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.email],
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+    return stmt.returning(table.c.id, table.c.email)
+
+
+def _write_batch(batch):
+    """Upsert one batch of (row_number, values) sharing a column set; returns per-row results"""
+    emails = [values['email'] for _, values in batch]
+    existing = {
+        email: (candidate_id, pipeline_status or '', admin_approval or '')
+        for candidate_id, email, pipeline_status, admin_approval in db.session.query(
+            Candidate.id, Candidate.email, Candidate.pipeline_status, Candidate.admin_approval
+        ).filter(Candidate.email.in_(emails))
+    }
+
+    now = datetime.utcnow()
+    columns = list(batch[0][1].keys())
+    rows = []
+    deltas = {}
+    for _, values in batch:
+        row = dict(INSERT_DEFAULTS, **values)
+        row['created_at'] = now
+        row['updated_at'] = now
+        rows.append(row)
+
+        previous = existing.get(values['email'])
+        if previous:
+            old_key = previous[1:]
+            new_key = (values.get('pipeline_status', old_key[0]) or '',
+                       values.get('admin_approval', old_key[1]) or '')
+            deltas[old_key] = deltas.get(old_key, 0) - 1
+        else:
+            new_key = (row['pipeline_status'] or '', row['admin_approval'] or '')
+        deltas[new_key] = deltas.get(new_key, 0) + 1
+
+    ids = {email: candidate_id for candidate_id, email in
+           db.session.execute(_upsert_statement(columns, rows))}
+    adjust_candidate_counts(deltas)
+
+    return [{
+        'row': number,
+        'status': 'updated' if values['email'] in existing else 'created',
+        'id': ids.get(values['email']),
+        'email': values['email']
+    } for number, values in batch]
+
+
+def _write_isolated(batch):
+    """Write a batch in a savepoint, splitting it down to single rows if it fails"""
+    try:
+        with db.session.begin_nested():
+            return _write_batch(batch)
+    except SQLAlchemyError as e:
+        if len(batch) == 1:
+            return [{'row': batch[0][0], 'status': 'error',
+                     'error': str(getattr(e, 'orig', None) or e)}]
+
+    results = []
+    for item in batch:
+        results.extend(_write_isolated([item]))
+    return results
+
+
+def import_candidates(rows):
+    """Validate and upsert parsed rows, committing once; returns per-row results in input order"""
+    if not _sqlite_ready and dialect_name() == 'sqlite':
+        duplicates = ensure_email_index()
+        if duplicates:
+            raise DuplicateEmailError(duplicates)
+    valid, results = validate_rows(rows)
+
+    # Multi-row VALUES need a uniform column list, so batch rows by the fields they supplied.
+    groups = {}
+    for number, values in valid:
+        groups.setdefault(tuple(values.keys()), []).append((number, values))
+
+    for group in groups.values():
+        for start in range(0, len(group), BATCH_SIZE):
+            results.extend(_write_isolated(group[start:start + BATCH_SIZE]))
+
+    record_changes('candidate', [result['id'] for result in results if result.get('status') == 'created'], 'insert')
+    record_changes('candidate', [result['id'] for result in results if result.get('status') == 'updated'], 'update')
+    db.session.commit()
+    results.sort(key=lambda result: result['row'])
+    return results
@@ -0,0 +1,116 @@
+"""Ranked candidate search over name, email and phone.
+
+On Postgres, search uses a GIN tsvector index for prefix matching and a
+pg_trgm index for typo-tolerant word similarity. Both are expression indexes
+over the same document string, so the candidates table itself is unchanged.
+On SQLite (local runs and tests), an FTS5 table kept current by triggers
+gives prefix matching ranked by bm25.
+
+ensure_search_index() creates whichever of these the database needs. init_db
+runs it, and SQLite databases also get it on first search.
+"""
+
+import re
+from sqlalchemy import text
+from models.user import db
+from models.candidate import Candidate
+from db_helpers import dialect_name
+
+TABLE = Candidate.__tablename__
+FTS_TABLE = 'candidate_search'
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'phone')
+
+# Index and query must spell this expression identically for Postgres to use the indexes.
+DOCUMENT = " || ' ' || ".join(f"coalesce({field}, '')" for field in SEARCH_FIELDS)
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_search_tsv ON {TABLE} USING GIN (to_tsvector('simple', {DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_search_trgm ON {TABLE} USING GIN (({DOCUMENT}) gin_trgm_ops)",
+]
+
+_columns = ', '.join(SEARCH_FIELDS)
+_new = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+_old = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({_columns}, content='{TABLE}', content_rowid='id')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new});
+    END""",
+]
+
+_sqlite_ready = False
+
+
+def ensure_search_index():
+    """Create the search indexes (Postgres) or FTS table and triggers (SQLite) if missing"""
+    global _sqlite_ready
+    if dialect_name() == 'postgresql':
+        for statement in POSTGRES_DDL:
+            db.session.execute(text(statement))
+        db.session.commit()
+        return
+
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first()
+    for statement in SQLITE_DDL:
+        db.session.execute(text(statement))
+    if not exists:
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+    _sqlite_ready = True
+
+
+def search_terms(q):
+    return re.findall(r'\w+', q.lower())
+
+
+def _postgres_search(q, terms, limit, offset):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    return db.session.execute(text(f"""
+        SELECT id,
+               ts_rank(to_tsvector('simple', {DOCUMENT}), query) + word_similarity(:q, {DOCUMENT}) AS rank
+        FROM {TABLE}, to_tsquery('simple', :tsquery) AS query
+        WHERE to_tsvector('simple', {DOCUMENT}) @@ query OR :q <% ({DOCUMENT})
+        ORDER BY rank DESC, id
+        LIMIT :limit OFFSET :offset
+    """), {'q': q, 'tsquery': tsquery, 'limit': limit, 'offset': offset}).all()
+
+
+def _sqlite_search(terms, limit, offset):
+    if not _sqlite_ready:
+        ensure_search_index()
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # bm25() is lower-is-better; negate it so both backends report higher-is-better.
+    return db.session.execute(text(f"""
+        SELECT rowid AS id, -bm25({FTS_TABLE}) AS rank
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH :match
+        ORDER BY bm25({FTS_TABLE}), rowid
+        LIMIT :limit OFFSET :offset
+    """), {'match': match, 'limit': limit, 'offset': offset}).all()
+
+
+def search_candidates(q, limit, offset=0):
+    """Return [(candidate, rank)] best match first"""
+    terms = search_terms(q)
+    if not terms:
+        return []
+
+    if dialect_name() == 'postgresql':
+        ranked = _postgres_search(q, terms, limit, offset)
+    else:
+        ranked = _sqlite_search(terms, limit, offset)
+
+    candidates = {candidate.id: candidate for candidate in Candidate.query.filter(
+        Candidate.id.in_([row.id for row in ranked])
+    )}
+    return [(candidates[row.id], row.rank) for row in ranked if row.id in candidates]
@@ -0,0 +1,102 @@
+"""Set-based pipeline transitions for POST /api/candidates/transitions.
+
+A cohort is moved with one UPDATE ... RETURNING instead of one request and one
+transaction per candidate. The allowed source states are part of the UPDATE's
+WHERE clause, so a candidate that another request moved in the meantime is
+skipped rather than pushed through an illegal transition.
+
+On Postgres the UPDATE joins a locked snapshot of the matched rows, so the
+same statement returns each row's previous status for the summary counters.
+SQLite cannot return joined columns, so there the previous statuses are read
+first inside the same (serialized) write transaction.
+"""
+
+from datetime import datetime
+from sqlalchemy import select, update
+from models.user import db
+from models.candidate import Candidate
+from db_helpers import dialect_name
+from stats import candidate_key, adjust_candidate_counts
+from change_feed import record_changes
+
+MAX_TRANSITION_IDS = 10000
+FILTER_FIELDS = ('pipeline_status', 'admin_approval')
+
+# Target pipeline status -> (columns written, pipeline statuses it may be entered from)
+TRANSITIONS = {
+    'Interviewing': ({'pipeline_status': 'Interviewing'}, ('Applied',)),
+    'Offered': ({'pipeline_status': 'Offered'}, ('Interviewing',)),
+    'Approved': ({'pipeline_status': 'Approved', 'admin_approval': 'Approved'}, ('Applied', 'Interviewing', 'Offered')),
+    'Denied': ({'pipeline_status': 'Denied', 'admin_approval': 'Denied'}, ('Applied', 'Interviewing', 'Offered')),
+}
+
+
+class TransitionError(ValueError):
+    """Raised when a transition request is malformed"""
+
+
+def _matching(ids, filters, allowed_from):
+    stmt = select(Candidate.id, Candidate.pipeline_status, Candidate.admin_approval).where(
+        Candidate.pipeline_status.in_(allowed_from)
+    )
+    if ids is not None:
+        stmt = stmt.where(Candidate.id.in_(ids))
+    for field, value in filters.items():
+        stmt = stmt.where(getattr(Candidate, field) == value)
+    return stmt
+
+
+def transition_candidates(target, ids=None, filters=None):
+    """Move the selected candidates to target; returns [(candidate, previous key)].
+
+    Runs in the caller's transaction; the caller commits and invalidates.
+    """
+    if target not in TRANSITIONS:
+        raise TransitionError(f"Unknown target '{target}' (expected one of {', '.join(TRANSITIONS)})")
+    if (ids is None) == (not filters):
+        raise TransitionError('Provide exactly one of ids or filter')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise TransitionError('ids must be a list of integers')
+        if len(ids) > MAX_TRANSITION_IDS:
+            raise TransitionError(f'Too many ids (max {MAX_TRANSITION_IDS})')
+        if not ids:
+            return []
+    if filters is not None and not isinstance(filters, dict):
+        raise TransitionError('filter must be an object')
+    filters = filters or {}
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise TransitionError(f"Unsupported filter fields: {', '.join(sorted(unknown))}")
+
+    values, allowed_from = TRANSITIONS[target]
+    values = dict(values, updated_at=datetime.utcnow())
+    matching = _matching(ids, filters, allowed_from)
+
+    if dialect_name() == 'postgresql':
+        previous = matching.with_for_update().subquery('previous')
+        stmt = update(Candidate).where(Candidate.id == previous.c.id).values(**values).returning(
+            Candidate, previous.c.pipeline_status, previous.c.admin_approval
+        )
+        rows = db.session.execute(stmt, execution_options={'synchronize_session': False}).all()
+        moved = [(candidate, (old_status or '', old_approval or '')) for candidate, old_status, old_approval in rows]
+    else:
+        previous = {row.id: (row.pipeline_status or '', row.admin_approval or '')
+                    for row in db.session.execute(matching)}
+        if not previous:
+            return []
+        stmt = update(Candidate).where(
+            Candidate.id.in_(list(previous)), Candidate.pipeline_status.in_(allowed_from)
+        ).values(**values).returning(Candidate)
+        rows = db.session.execute(stmt, execution_options={'synchronize_session': False}).scalars().all()
+        moved = [(candidate, previous[candidate.id]) for candidate in rows]
+
+    deltas = {}
+    for candidate, before in moved:
+        after = candidate_key(candidate)
+        deltas[before] = deltas.get(before, 0) - 1
+        deltas[after] = deltas.get(after, 0) + 1
+    adjust_candidate_counts(deltas)
+    record_changes('candidate', [candidate.id for candidate, _ in moved], 'update')
+
+    return sorted(moved, key=lambda item: item[0].id)
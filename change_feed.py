@@ -0,0 +1,217 @@
+"""Append-only change log behind GET /api/changes.
+
+Writes to tracked rows are buffered on the session and written by a single
+multi-row INSERT just before the transaction commits, so a change is logged
+exactly when its write commits. The buffer is dropped on rollback. ORM
+inserts, updates and deletes of tracked models are picked up automatically
+at flush. Set-based Core statements (bulk import, transitions, Indeed sync
+and push, bulk users) report their ids with record_changes().
+
+Readers poll with the id of the last entry they saw and get only the rows
+changed since. Clients should treat 'insert' and 'update' alike as upserts.
+compact_changes() keeps the log bounded in two ways. It drops entries
+superseded by a later change to the same row, which never hides a change
+from any cursor. It also drops everything older than the retention window,
+and cursors from before that point get a 410 telling the client to reload.
+"""
+
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, delete
+from models.user import db
+from models.candidate import Candidate
+from models.auth import AdminUser
+from models.employee import Employee
+from models.change_log import ChangeLogEntry, ChangeLogHorizon
+from db_engine import RoutingSession
+from db_helpers import dialect_name
+from job_queue import job_handler
+
+CHANGE_LOG_RETENTION_HOURS = float(os.getenv('CHANGE_LOG_RETENTION_HOURS', 72))
+# Concurrent Postgres transactions can commit out of id order, so very recent
+# entries are held back until any lower id still in flight has committed.
+CHANGE_FEED_SETTLE_MS = int(os.getenv('CHANGE_FEED_SETTLE_MS', 1000))
+COMPACT_JOB = 'change_log.compact'
+BUFFER_KEY = 'pending_changes'
+
+
+def _user_dict(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'role': user.role,
+        'is_active': user.is_active,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'last_login': user.last_login.isoformat() if user.last_login else None
+    }
+
+
+def _employee_dict(employee):
+    return {column.name: getattr(employee, column.name) for column in Employee.__table__.columns}
+
+
+# entity name -> (model, serializer)
+ENTITIES = {
+    'candidate': (Candidate, lambda candidate: candidate.to_dict()),
+    'user': (AdminUser, _user_dict),
+    'employee': (Employee, _employee_dict),
+}
+_ENTITY_BY_MODEL = {model: name for name, (model, _) in ENTITIES.items()}
+
+# Later ops on the same row within one transaction override earlier ones.
+_MERGED_OPS = {
+    ('insert', 'update'): 'insert',
+    ('insert', 'delete'): None,
+    ('update', 'delete'): 'delete',
+    ('delete', 'insert'): 'update',
+}
+
+
+def _buffer(session):
+    return session.info.setdefault(BUFFER_KEY, {})
+
+
+def record_changes(entity, ids, op, session=None):
+    """Buffer changes to the given rows; they are written when the session commits"""
+    buffer = _buffer(session or db.session())
+    for entity_id in ids:
+        key = (entity, entity_id)
+        previous = buffer.get(key)
+        merged = _MERGED_OPS.get((previous, op), op) if previous else op
+        if merged is None:
+            buffer.pop(key)
+        else:
+            buffer[key] = merged
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _capture_flush(session, flush_context):
+    for obj in session.new:
+        entity = _ENTITY_BY_MODEL.get(type(obj))
+        if entity:
+            record_changes(entity, [obj.id], 'insert', session)
+    for obj in session.dirty:
+        entity = _ENTITY_BY_MODEL.get(type(obj))
+        if entity and session.is_modified(obj, include_collections=False):
+            record_changes(entity, [obj.id], 'update', session)
+    for obj in session.deleted:
+        entity = _ENTITY_BY_MODEL.get(type(obj))
+        if entity:
+            record_changes(entity, [obj.id], 'delete', session)
+
+
+@event.listens_for(RoutingSession, 'before_commit')
+def _write_buffer(session):
+    # Flush first so pending ORM changes land in the buffer too.
+    session.flush()
+    buffer = session.info.pop(BUFFER_KEY, None)
+    if buffer:
+        now = datetime.utcnow()
+        session.execute(ChangeLogEntry.__table__.insert(), [
+            {'entity': entity, 'entity_id': entity_id, 'op': op, 'changed_at': now}
+            for (entity, entity_id), op in buffer.items()
+        ])
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _drop_buffer(session):
+    session.info.pop(BUFFER_KEY, None)
+
+
+def _settled_before():
+    """Entries changed at or after this may still have lower ids in flight; None where ids commit in order"""
+    if dialect_name() == 'postgresql' and CHANGE_FEED_SETTLE_MS > 0:
+        return datetime.utcnow() - timedelta(milliseconds=CHANGE_FEED_SETTLE_MS)
+    return None
+
+
+def head_cursor():
+    # Bootstrapping from an unsettled id could skip a lower one that commits later, so stop short of them.
+    query = db.session.query(func.coalesce(func.max(ChangeLogEntry.id), 0))
+    settled_before = _settled_before()
+    if settled_before is not None:
+        query = query.filter(ChangeLogEntry.changed_at < settled_before)
+    # Once compaction has pruned every entry the horizon is the newest cursor still valid.
+    return max(query.scalar(), horizon())
+
+
+def horizon():
+    row = db.session.get(ChangeLogHorizon, 1)
+    return row.pruned_through if row else 0
+
+
+class CursorExpired(Exception):
+    """Raised when a cursor predates entries removed by compaction"""
+
+
+def changes_since(since, limit, entities=None):
+    """Changes after cursor since, latest per row, with current row data; returns (changes, next_cursor, has_more)"""
+    if since < horizon():
+        raise CursorExpired()
+
+    query = ChangeLogEntry.query.filter(ChangeLogEntry.id > since)
+    if entities:
+        query = query.filter(ChangeLogEntry.entity.in_(entities))
+    entries = query.order_by(ChangeLogEntry.id).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    settled_before = _settled_before()
+    if settled_before is not None:
+        for index, entry in enumerate(entries):
+            if entry.changed_at >= settled_before:
+                entries, has_more = entries[:index], True
+                break
+    if not entries:
+        return [], since, has_more
+
+    latest = {}
+    for entry in entries:
+        latest[(entry.entity, entry.entity_id)] = entry
+
+    # One IN query per entity type for the rows that still exist.
+    current = {}
+    for name, (model, serialize) in ENTITIES.items():
+        ids = [entity_id for (entity, entity_id), entry in latest.items() if entity == name and entry.op != 'delete']
+        if ids:
+            for row in model.query.filter(model.id.in_(ids)):
+                current[(name, row.id)] = serialize(row)
+
+    changes = []
+    for key, entry in sorted(latest.items(), key=lambda item: item[1].id):
+        data = current.get(key)
+        # A row missing now was deleted after this page; its delete entry comes later.
+        changes.append({
+            'cursor': str(entry.id),
+            'entity': entry.entity,
+            'id': entry.entity_id,
+            'op': entry.op,
+            'changed_at': entry.changed_at.isoformat(),
+            'data': data
+        })
+    return changes, entries[-1].id, has_more
+
+
+def compact_changes(retention_hours=CHANGE_LOG_RETENTION_HOURS):
+    """Drop superseded and expired entries; returns counts removed"""
+    table = ChangeLogEntry.__table__
+    latest_ids = select(func.max(table.c.id)).group_by(table.c.entity, table.c.entity_id)
+    superseded = db.session.execute(delete(table).where(table.c.id.not_in(latest_ids))).rowcount
+
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    pruned_through = db.session.query(func.max(ChangeLogEntry.id)).filter(ChangeLogEntry.changed_at < cutoff).scalar()
+    expired = 0
+    if pruned_through:
+        expired = db.session.execute(delete(table).where(table.c.id <= pruned_through)).rowcount
+        state = db.session.get(ChangeLogHorizon, 1)
+        if state is None:
+            state = ChangeLogHorizon(id=1, pruned_through=0)
+            db.session.add(state)
+        state.pruned_through = max(state.pruned_through or 0, pruned_through)
+    db.session.commit()
+    return {'superseded': superseded, 'expired': expired, 'horizon': horizon()}
+
+
+@job_handler(COMPACT_JOB)
+def compact_changes_job(payload, progress):
+    return compact_changes(payload.get('retention_hours', CHANGE_LOG_RETENTION_HOURS))
@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from models.user import db
+from change_feed import changes_since, head_cursor, horizon, CursorExpired
+
+changes_bp = Blueprint('changes', __name__)
+
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+
+@changes_bp.route('/changes', methods=['GET'])
+def get_changes():
+    """Rows inserted, updated or deleted after ?since=<cursor>; omit since to get the current cursor"""
+    try:
+        since = request.args.get('since')
+        if since is None or since == '':
+            # Clients load the full list once, then poll from here.
+            return jsonify({'changes': [], 'next_cursor': str(head_cursor()), 'has_more': False})
+
+        try:
+            since = int(since)
+            limit = int(request.args.get('limit', DEFAULT_CHANGES_LIMIT))
+        except ValueError:
+            return jsonify({'error': 'since and limit must be integers'}), 400
+        limit = max(1, min(limit, MAX_CHANGES_LIMIT))
+        entities = [entity for entity in request.args.get('entity', '').split(',') if entity] or None
+
+        try:
+            changes, next_cursor, has_more = changes_since(since, limit, entities)
+        except CursorExpired:
+            return jsonify({
+                'error': 'Cursor is older than the retained change log; reload the full list',
+                'resync': True,
+                'horizon': str(horizon())
+            }), 410
+
+        return jsonify({'changes': changes, 'next_cursor': str(next_cursor), 'has_more': has_more})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,23 @@
+"""Compact the change log behind GET /api/changes.
+
+Removes entries superseded by a later change to the same row and everything
+older than CHANGE_LOG_RETENTION_HOURS. Schedule it (cron, or a
+'change_log.compact' job) at least daily so the log stays bounded.
+"""
+
+from index import create_app
+
+
+def main() -> None:
+    app = create_app()
+    with app.app_context():
+        from change_feed import compact_changes
+
+        result = compact_changes()
+        print(f"Change log compacted: {result['superseded']} superseded and "
+              f"{result['expired']} expired entries removed; cursors before "
+              f"{result['horizon']} must resync.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Engine configuration and read-replica routing.
+
+The app runs both as a long-lived gunicorn service and as Vercel serverless
+functions against Neon, and those need different connection handling. Each
+deployment picks a named profile with DB_ENGINE_PROFILE:
+
+- ``server``: a pooled, pre-pinged engine whose connections are recycled
+  before Neon's idle suspend drops them.
+- ``serverless``: NullPool, so a frozen function never holds a dead connection.
+- ``pgbouncer``: NullPool in front of a transaction-mode pooler such as Neon's
+  ``-pooler`` endpoint. Session settings are applied per transaction there.
+
+When DATABASE_REPLICA_URL is set, SELECTs issued by views marked with
+@use_replica go to the replica. Everything else stays on the primary,
+including any SELECT that follows a write in the same request.
+"""
+
+import os
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = 'replica'
+
+ENGINE_PROFILES = {
+    'server': {
+        'pool_pre_ping': True,
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': 280,
+    },
+    'serverless': {
+        'poolclass': NullPool,
+    },
+    'pgbouncer': {
+        'poolclass': NullPool,
+    },
+}
+
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': 'pool_size',
+    'DB_MAX_OVERFLOW': 'max_overflow',
+    'DB_POOL_TIMEOUT': 'pool_timeout',
+    'DB_POOL_RECYCLE': 'pool_recycle',
+}
+
+
+def default_profile():
+    return 'serverless' if os.getenv('VERCEL') else 'server'
+
+
+def engine_options(url, profile, statement_timeout_ms=None, connect_timeout=None):
+    """SQLAlchemy engine options for a database URL under the given profile"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE '{profile}' (expected one of {', '.join(ENGINE_PROFILES)})")
+
+    # SQLite (local runs and tests) keeps Flask-SQLAlchemy's own pool choice.
+    if url.startswith('sqlite'):
+        return {}
+
+    options = dict(ENGINE_PROFILES[profile])
+    if options.get('poolclass') is not NullPool:
+        for env_name, option in POOL_SETTINGS.items():
+            if os.getenv(env_name):
+                options[option] = int(os.getenv(env_name))
+
+    connect_args = {}
+    if connect_timeout:
+        connect_args['connect_timeout'] = connect_timeout
+    # Transaction-mode poolers reject startup options; those get SET LOCAL per transaction instead.
+    if statement_timeout_ms and profile != 'pgbouncer':
+        connect_args['options'] = f'-c statement_timeout={int(statement_timeout_ms)}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+
+def configure_engines(app):
+    """Fill in engine options and the optional replica bind before db.init_app"""
+    profile = os.getenv('DB_ENGINE_PROFILE', default_profile())
+    statement_timeout_ms = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    connect_timeout = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
+
+    app.config.setdefault('DB_ENGINE_PROFILE', profile)
+    app.config.setdefault('DB_STATEMENT_TIMEOUT_MS', statement_timeout_ms)
+
+    url = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                          engine_options(url, profile, statement_timeout_ms, connect_timeout))
+
+    replica_url = os.getenv('DATABASE_REPLICA_URL')
+    if replica_url:
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(REPLICA_BIND, dict(
+            engine_options(replica_url, profile, statement_timeout_ms, connect_timeout),
+            url=replica_url
+        ))
+
+
+def install_engine_hooks(app, db):
+    """Attach per-transaction settings that profiles cannot express as engine options"""
+    statement_timeout_ms = app.config.get('DB_STATEMENT_TIMEOUT_MS')
+    if app.config.get('DB_ENGINE_PROFILE') != 'pgbouncer' or not statement_timeout_ms:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name != 'postgresql':
+                continue
+
+            @event.listens_for(engine, 'begin')
+            def set_statement_timeout(conn):
+                conn.exec_driver_sql(f'SET LOCAL statement_timeout = {int(statement_timeout_ms)}')
+
+
+class RoutingSession(Session):
+    """Session that sends read-only statements from @use_replica views to the replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+
+        # Once a request writes, keep it on the primary so it reads its own writes.
+        if bind is None and (self._flushing or (clause is not None and not isinstance(clause, Select))):
+            self.info['pinned_primary'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        return (
+            isinstance(clause, Select)
+            and not self._flushing
+            and not self.info.get('pinned_primary')
+            and has_app_context()
+            and g.get('use_replica', False)
+            and REPLICA_BIND in self._db.engines
+        )
+
+
+def pin_primary(session):
+    """Send the rest of this session's statements to the primary, e.g. before a read that feeds a write"""
+    session.info['pinned_primary'] = True
+
+
+def use_replica(view):
+    """Mark a read-only view as safe to serve from the read replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,19 @@
+"""Dialect-aware SQL helpers shared by the blueprints.
+
+Production runs on Postgres (Neon) while local runs and tests use SQLite, so
+statements that rely on dialect-specific syntax are built here.
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+from models.user import db
+
+
+def dialect_name():
+    return db.engine.dialect.name
+
+
+def insert_for_dialect(table):
+    """Return an INSERT construct that supports ON CONFLICT for the active database"""
+    if dialect_name() == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -0,0 +1,317 @@
+"""Background text extraction and full-text search for uploaded documents.
+
+Uploads of extractable types queue a 'documents.extract' job. The job runs
+text_extraction in a process pool, so parsing never blocks a request thread.
+A parser that crashes its process, or runs past DOCUMENT_EXTRACT_TIMEOUT,
+gets the pool torn down and rebuilt. The job then fails and is retried by
+the queue instead of storing a 'failed' row for the document. Text is
+stored once per content hash (document_texts.sha256). Re-uploading the same
+bytes, under any name or person, neither queues nor runs a second
+extraction. Searches join back to file_records, so results carry each
+copy's entity_type, person_id and category and can be filtered on them.
+
+On Postgres, search uses an english tsvector GIN expression index. On SQLite
+it uses an FTS5 table with the porter stemmer, kept current by triggers.
+ensure_document_index() creates whichever of these the database needs.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from datetime import datetime
+from sqlalchemy import text
+from models.user import db
+from models.file_record import FileRecord
+from models.document_text import DocumentText
+from db_helpers import dialect_name, insert_for_dialect
+from job_queue import enqueue, job_handler
+from candidate_search import search_terms
+from text_extraction import extract_text, EXTRACTABLE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_JOB = 'documents.extract'
+DOCUMENT_EXTRACT_WORKERS = int(os.getenv('DOCUMENT_EXTRACT_WORKERS', min(2, os.cpu_count() or 1)))
+DOCUMENT_EXTRACT_BATCH = 50
+# Seconds a single document may take in the pool before its worker is killed.
+DOCUMENT_EXTRACT_TIMEOUT = float(os.getenv('DOCUMENT_EXTRACT_TIMEOUT', 120))
+
+TABLE = DocumentText.__tablename__
+FTS_TABLE = 'document_search'
+
+POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_content_tsv ON {TABLE} USING GIN (to_tsvector('english', content))",
+]
+
+SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, content='{TABLE}', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+SEARCH_FILTERS = ('entity_type', 'person_id', 'category')
+
+_sqlite_ready = False
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ExtractionInterrupted(RuntimeError):
+    """Raised when documents could not be extracted because the pool broke or timed out; retry later"""
+
+
+def ensure_document_index():
+    """Create the content index (Postgres) or FTS table and triggers (SQLite) if missing"""
+    global _sqlite_ready
+    if dialect_name() == 'postgresql':
+        for statement in POSTGRES_DDL:
+            db.session.execute(text(statement))
+        db.session.commit()
+        return
+
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first()
+    for statement in SQLITE_DDL:
+        db.session.execute(text(statement))
+    if not exists:
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+    _sqlite_ready = True
+
+
+def extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def queue_extraction(record):
+    """Queue text extraction for a newly catalogued file, unless its content was already extracted"""
+    if not record.sha256 or extension(record.name) not in EXTRACTABLE_EXTENSIONS:
+        return None
+    if db.session.query(DocumentText.id).filter_by(sha256=record.sha256).first():
+        return None
+    job, _ = enqueue(EXTRACT_JOB, {'sha256': record.sha256}, dedup_key=f'{EXTRACT_JOB}:{record.sha256}')
+    return job
+
+
+def _get_pool():
+    global _pool, DOCUMENT_EXTRACT_WORKERS
+    if DOCUMENT_EXTRACT_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                # spawn: forking a process with open DB connections and threads is unsafe.
+                _pool = ProcessPoolExecutor(DOCUMENT_EXTRACT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            except (OSError, NotImplementedError) as e:
+                logger.warning('Document extraction pool unavailable (%s); extracting inline', e)
+                DOCUMENT_EXTRACT_WORKERS = 0
+                return None
+            atexit.register(_pool.shutdown, wait=False)
+        return _pool
+
+
+def _discard_pool(pool):
+    """Tear down a broken or stuck pool, so the next _get_pool() starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # A hung parser never returns on its own; shutdown() alone would leave it running.
+    for process in list((getattr(pool, '_processes', None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_all(items):
+    """Run extract_text over [(path, ext)], in the pool when there is one.
+
+    A result is None when the pool broke or timed out before producing it.
+    """
+    pool = _get_pool()
+    if pool is None:
+        return [extract_text(path, ext) for path, ext in items]
+    try:
+        futures = [pool.submit(extract_text, path, ext) for path, ext in items]
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return [None] * len(items)
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=DOCUMENT_EXTRACT_TIMEOUT))
+        except (BrokenProcessPool, FutureTimeoutError) as e:
+            logger.warning('Document extraction pool %s; restarting it',
+                           'timed out' if isinstance(e, FutureTimeoutError) else 'lost a worker')
+            _discard_pool(pool)
+            return results + [None] * (len(futures) - len(results))
+        except Exception as e:
+            results.append(('failed', '', None, f'{type(e).__name__}: {e}'))
+    return results
+
+
+def extract_documents(sha256s, force=False):
+    """Extract and store text for the given content hashes; returns counts by outcome"""
+    from files import blob_store
+
+    counts = {'ok': 0, 'failed': 0, 'unsupported': 0, 'skipped': 0, 'missing': 0, 'interrupted': 0}
+    sha256s = list(dict.fromkeys(sha256s))
+    done = set()
+    if not force:
+        done = {sha256 for (sha256,) in db.session.query(DocumentText.sha256).filter(DocumentText.sha256.in_(sha256s))}
+    counts['skipped'] = len(done)
+
+    # Any catalog entry for the content will do; they share the bytes.
+    names = {}
+    for sha256, name in db.session.query(FileRecord.sha256, FileRecord.name).filter(
+        FileRecord.sha256.in_([sha256 for sha256 in sha256s if sha256 not in done])
+    ):
+        names.setdefault(sha256, name)
+
+    table = DocumentText.__table__
+    items = list(names.items())
+    for start in range(0, len(items), DOCUMENT_EXTRACT_BATCH):
+        # Remote backends download each body to a temporary file for the duration of the batch.
+        with ExitStack() as stack:
+            batch = []
+            for sha256, name in items[start:start + DOCUMENT_EXTRACT_BATCH]:
+                path = stack.enter_context(blob_store.local_file(sha256))
+                if path is None:
+                    counts['missing'] += 1
+                else:
+                    batch.append((sha256, path, extension(name)))
+            if not batch:
+                continue
+            results = _extract_all([(path, ext) for _, path, ext in batch])
+
+        now = datetime.utcnow()
+        rows = []
+        for (sha256, _, _), result in zip(batch, results):
+            # Nothing is stored for an interrupted document, so it stays pending and is retried.
+            if result is None:
+                counts['interrupted'] += 1
+                continue
+            status, content, extractor, error = result
+            counts[status] += 1
+            rows.append({'sha256': sha256, 'status': status, 'content': content, 'char_count': len(content),
+                         'extractor': extractor, 'error': error, 'extracted_at': now})
+        if not rows:
+            continue
+        stmt = insert_for_dialect(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sha256],
+            set_={column: stmt.excluded[column] for column in
+                  ('status', 'content', 'char_count', 'extractor', 'error', 'extracted_at')}
+        )
+        db.session.execute(stmt)
+        db.session.commit()
+    return counts
+
+
+def pending_documents(limit=None):
+    """Content hashes of catalogued, extractable files with no stored text yet"""
+    query = db.session.query(FileRecord.sha256, FileRecord.name).outerjoin(
+        DocumentText, DocumentText.sha256 == FileRecord.sha256
+    ).filter(FileRecord.sha256.isnot(None), DocumentText.id.is_(None))
+    sha256s = {}
+    for sha256, name in query.yield_per(1000):
+        if extension(name) in EXTRACTABLE_EXTENSIONS:
+            sha256s[sha256] = None
+            if limit and len(sha256s) >= limit:
+                break
+    return list(sha256s)
+
+
+def prune_orphan_texts():
+    """Delete stored text whose content no catalog entry references any more"""
+    removed = DocumentText.query.filter(
+        ~db.session.query(FileRecord.id).filter(FileRecord.sha256 == DocumentText.sha256).exists()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+@job_handler(EXTRACT_JOB)
+def extract_document_job(payload, progress):
+    counts = extract_documents([payload['sha256']], force=payload.get('force', False))
+    if counts['interrupted']:
+        # Failing the job hands it back to the queue's retry and backoff.
+        raise ExtractionInterrupted(f"Extraction of {payload['sha256']} was interrupted")
+    return counts
+
+
+def _filter_clause(filters, params):
+    clauses = []
+    for field in SEARCH_FILTERS:
+        if filters.get(field):
+            clauses.append(f'f.{field} = :{field}')
+            params[field] = filters[field]
+    return ''.join(f' AND {clause}' for clause in clauses)
+
+
+def _postgres_search(q, filters, limit, offset):
+    params = {'q': q, 'limit': limit, 'offset': offset}
+    where = _filter_clause(filters, params)
+    # Headlines are costly, so build them only for the page being returned.
+    return db.session.execute(text(f"""
+        SELECT ranked.file_id, ranked.rank,
+               ts_headline('english', d.content, websearch_to_tsquery('english', :q), 'MaxFragments=2') AS snippet
+        FROM (
+            SELECT f.id AS file_id, d.id AS text_id, ts_rank(to_tsvector('english', d.content), query) AS rank
+            FROM {TABLE} d JOIN file_records f ON f.sha256 = d.sha256, websearch_to_tsquery('english', :q) AS query
+            WHERE to_tsvector('english', d.content) @@ query{where}
+            ORDER BY rank DESC, f.id
+            LIMIT :limit OFFSET :offset
+        ) ranked JOIN {TABLE} d ON d.id = ranked.text_id
+        ORDER BY ranked.rank DESC, ranked.file_id
+    """), params).all()
+
+
+def _sqlite_search(terms, filters, limit, offset):
+    if not _sqlite_ready:
+        ensure_document_index()
+    params = {'match': ' '.join(f'"{term}"' for term in terms), 'limit': limit, 'offset': offset}
+    where = _filter_clause(filters, params)
+    # bm25() is lower-is-better; negate it so both backends report higher-is-better.
+    return db.session.execute(text(f"""
+        SELECT f.id AS file_id, -bm25({FTS_TABLE}) AS rank,
+               snippet({FTS_TABLE}, 0, '<b>', '</b>', '...', 16) AS snippet
+        FROM {FTS_TABLE} JOIN {TABLE} d ON d.id = {FTS_TABLE}.rowid JOIN file_records f ON f.sha256 = d.sha256
+        WHERE {FTS_TABLE} MATCH :match{where}
+        ORDER BY bm25({FTS_TABLE}), f.id
+        LIMIT :limit OFFSET :offset
+    """), params).all()
+
+
+def search_documents(q, filters=None, limit=50, offset=0):
+    """Return [(file_record, rank, snippet)] best match first"""
+    terms = search_terms(q)
+    if not terms:
+        return []
+    filters = filters or {}
+
+    if dialect_name() == 'postgresql':
+        ranked = _postgres_search(q, filters, limit, offset)
+    else:
+        ranked = _sqlite_search(terms, filters, limit, offset)
+
+    records = {record.id: record for record in FileRecord.query.filter(
+        FileRecord.id.in_([row.file_id for row in ranked])
+    )}
+    return [(records[row.file_id], row.rank, row.snippet) for row in ranked if row.file_id in records]
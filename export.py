@@ -0,0 +1,111 @@
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from models.user import db
+from models.candidate import Candidate
+from models.auth import AdminUser
+from db_engine import use_replica
+from admission import route_class
+from candidate import filtered_candidates, sparse_fields, project, CANDIDATE_FIELDS
+
+export_bp = Blueprint('export', __name__)
+
+# Rows come off a server-side cursor (yield_per; a named cursor on Postgres) as
+# plain tuples and go out EXPORT_BATCH_SIZE per chunk, so memory stays flat and
+# the first chunk leaves as soon as the first batch is fetched.
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+USER_EXPORT_FIELDS = ('id', 'username', 'email', 'role', 'is_active', 'created_at', 'last_login')
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def _chunks(query, fields, fmt):
+    """Encode rows of the given fields into text chunks of EXPORT_BATCH_SIZE rows"""
+    rows = query.yield_per(EXPORT_BATCH_SIZE)
+    buffer = io.StringIO()
+
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        write = lambda row: writer.writerow([_csv_value(value) for value in row])
+    else:
+        dumps = current_app.json.dumps
+        write = lambda row: buffer.write(dumps(dict(zip(fields, row))) + '\n')
+
+    pending = 0
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzipped(chunks):
+    # Sync-flush every chunk so the client can decode rows as they arrive.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def _wants_gzip():
+    # ?gzip= overrides content negotiation, e.g. to download a .gz file as is.
+    requested = request.args.get('gzip')
+    if requested is not None:
+        return requested.lower() in ('1', 'true', 'yes')
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+def _export_response(query, fields, name):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    chunks = _chunks(query, fields, fmt)
+    gzipped = _wants_gzip()
+    if gzipped:
+        chunks = _gzipped(chunks)
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[fmt])
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Content-Disposition'] = (
+        f"attachment; filename={name}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    )
+    return response
+
+@export_bp.route('/export/candidates', methods=['GET'])
+@route_class('export')
+@use_replica
+def export_candidates():
+    """Stream every matching candidate as CSV or NDJSON (same filters and ?fields= as GET /candidates)"""
+    try:
+        try:
+            fields = sparse_fields(request.args) or list(CANDIDATE_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        query = project(filtered_candidates(request.args), fields).order_by(Candidate.id)
+        return _export_response(query, fields, 'candidates')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@export_bp.route('/export/users', methods=['GET'])
+@route_class('export')
+@use_replica
+def export_users():
+    """Stream every admin user (without password hashes) as CSV or NDJSON"""
+    try:
+        query = db.session.query(*[getattr(AdminUser, field) for field in USER_EXPORT_FIELDS]).order_by(AdminUser.id)
+        return _export_response(query, USER_EXPORT_FIELDS, 'users')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
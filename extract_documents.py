@@ -0,0 +1,39 @@
+"""Extract and index text for uploaded documents that have none yet.
+
+Uploads queue their own extraction jobs. Run this once after first
+deploying document search, to cover files uploaded before it existed. It
+also deletes stored text whose files have all been removed.
+
+    python extract_documents.py           # backfill missing text
+    python extract_documents.py --force   # re-extract everything, e.g. after adding a PDF extractor
+"""
+
+import argparse
+from index import create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--force', action='store_true', help='re-extract documents that already have text')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        from sqlalchemy import select
+        from models.user import db
+        from models.file_record import FileRecord
+        from document_index import extract_documents, pending_documents, prune_orphan_texts
+
+        if args.force:
+            sha256s = list(db.session.scalars(select(FileRecord.sha256).where(FileRecord.sha256.isnot(None)).distinct()))
+        else:
+            sha256s = pending_documents()
+        counts = extract_documents(sha256s, force=args.force)
+        print(f"Documents extracted: {counts['ok']} ok, {counts['failed']} failed, "
+              f"{counts['unsupported']} unsupported, {counts['missing']} missing blobs, "
+              f"{counts['interrupted']} interrupted (rerun to retry).")
+        print(f"Removed text for {prune_orphan_texts()} deleted documents.")
+
+
+if __name__ == "__main__":
+    main()
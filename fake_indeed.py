@@ -0,0 +1,79 @@
+"""Local stand-in for the Indeed ATS API.
+
+Serves a synthetic candidate feed and accepts status pushes using the protocol
+HttpFeedClient and HttpPushClient expect, so the sync and push paths can be
+exercised end to end without network access:
+
+    python fake_indeed.py --records 50000 --port 5001
+    INDEED_API_BASE=http://127.0.0.1:5001 INDEED_CLIENT_ID=local INDEED_CLIENT_SECRET=local python run.py
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from flask import Flask, request, jsonify
+
+
+def make_records(count, start=None):
+    start = start or datetime(2024, 1, 1)
+    return [{
+        'indeed_registration_id': f'REG{n:08d}',
+        'ats_candidate_id': f'CAND{n:08d}',
+        'ats_application_id': f'APP{n:08d}',
+        'first_name': f'First{n}',
+        'last_name': f'Last{n}',
+        'email': f'candidate{n}@example.com',
+        'phone': f'555-{n % 10000:04d}',
+        'indeed_status': 'Active',
+        'updated_at': (start + timedelta(seconds=n)).isoformat()
+    } for n in range(count)]
+
+
+def create_fake_indeed(records):
+    """Build the fake API app; `records` may be mutated between requests to simulate feed changes"""
+    app = Flask(__name__)
+    pushed_statuses = {}
+
+    @app.get('/v1/ats/candidates')
+    def candidate_feed():
+        since = request.args.get('since')
+        offset = int(request.args.get('page_token') or 0)
+        limit = int(request.args.get('limit', 500))
+
+        matching = sorted(
+            (record for record in records if not since or record['updated_at'] > since),
+            key=lambda record: record['updated_at']
+        )
+        page = matching[offset:offset + limit]
+        more = offset + limit < len(matching)
+
+        return jsonify({
+            'candidates': page,
+            'next_page_token': str(offset + limit) if more else None,
+            'cursor': page[-1]['updated_at'] if page else since
+        })
+
+    @app.post('/v1/ats/candidates/<registration_id>/status')
+    def push_status(registration_id):
+        status = (request.get_json(silent=True) or {}).get('status')
+        pushed_statuses[registration_id] = status
+        return jsonify({
+            'success': True,
+            'message': 'Status updated successfully in Indeed',
+            'indeed_status': status
+        })
+
+    app.pushed_statuses = pushed_statuses
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+
+    create_fake_indeed(make_records(args.records)).run(host='127.0.0.1', port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Local stand-in for an S3-compatible object store.
+
+Serves the subset of the S3 API that S3Backend uses: path-style PUT, GET
+(with Range), HEAD and DELETE on objects, ListObjectsV2, and presigned GETs.
+Objects are kept in memory. Header-signed requests have their SigV4
+signature checked, so a request that S3 would reject fails here as well:
+
+    python fake_s3.py --port 5002
+    STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://127.0.0.1:5002 S3_BUCKET=uploads \\
+        S3_ACCESS_KEY_ID=local S3_SECRET_ACCESS_KEY=local python run.py
+"""
+
+import argparse
+import hashlib
+import hmac
+import re
+from datetime import datetime
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from flask import Flask, Response, request
+from storage_backends import S3Backend
+
+LIST_PAGE_SIZE = 1000
+
+
+def _error(status, code, message):
+    body = f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>'
+    return Response(body, status=status, mimetype='application/xml')
+
+
+def create_fake_s3(access_key='local', secret_key='local', region='us-east-1'):
+    """Build the fake store app; `app.objects` maps (bucket, key) to bytes and `app.modified` to its write time"""
+    app = Flask(__name__)
+    objects = {}
+    modified = {}
+    signer = S3Backend('http://unused', 'unused', access_key, secret_key, region=region)
+
+    def check_signature():
+        if 'X-Amz-Signature' in request.args:
+            return None  # presigned URLs are trusted here
+        header = request.headers.get('Authorization', '')
+        match = re.match(r'AWS4-HMAC-SHA256 Credential=([^/]+)/[^,]+, SignedHeaders=([^,]+), Signature=(\w+)', header)
+        if not match or match.group(1) != access_key:
+            return _error(403, 'AccessDenied', 'Missing or unknown credentials')
+        headers = {name: request.headers.get(name, '') for name in match.group(2).split(';')}
+        payload_hash = request.headers.get('x-amz-content-sha256', '')
+        _, _, expected = signer._signature(
+            request.method, quote(request.path, safe='/~'), request.args.to_dict(), headers,
+            payload_hash, request.headers.get('x-amz-date', '')
+        )
+        if not hmac.compare_digest(expected, match.group(3)):
+            return _error(403, 'SignatureDoesNotMatch', 'The request signature does not match')
+        return None
+
+    @app.route('/<bucket>', methods=['GET'])
+    def list_objects(bucket):
+        denied = check_signature()
+        if denied:
+            return denied
+        prefix = request.args.get('prefix', '')
+        start = request.args.get('continuation-token', '')
+        keys = sorted(key for (name, key) in objects if name == bucket and key.startswith(prefix) and key > start)
+        page = keys[:LIST_PAGE_SIZE]
+        truncated = len(keys) > LIST_PAGE_SIZE
+        contents = ''.join(
+            f'<Contents><Key>{escape(key)}</Key>'
+            f'<LastModified>{modified[(bucket, key)].strftime("%Y-%m-%dT%H:%M:%S.000Z")}</LastModified>'
+            f'<Size>{len(objects[(bucket, key)])}</Size></Contents>' for key in page
+        )
+        token = f'<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>' if truncated else ''
+        body = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>'
+                f'<IsTruncated>{"true" if truncated else "false"}</IsTruncated>{token}{contents}</ListBucketResult>')
+        return Response(body, mimetype='application/xml')
+
+    @app.route('/<bucket>/<path:key>', methods=['PUT'])
+    def put_object(bucket, key):
+        denied = check_signature()
+        if denied:
+            return denied
+        body = request.get_data()
+        declared = request.headers.get('x-amz-content-sha256')
+        if declared != 'UNSIGNED-PAYLOAD' and declared != hashlib.sha256(body).hexdigest():
+            return _error(400, 'XAmzContentSHA256Mismatch', 'The provided x-amz-content-sha256 does not match')
+        objects[(bucket, key)] = body
+        modified[(bucket, key)] = datetime.utcnow()
+        response = Response(status=200)
+        response.headers['ETag'] = f'"{hashlib.md5(body).hexdigest()}"'
+        return response
+
+    @app.route('/<bucket>/<path:key>', methods=['GET', 'HEAD'])
+    def get_object(bucket, key):
+        denied = check_signature()
+        if denied:
+            return denied
+        body = objects.get((bucket, key))
+        if body is None:
+            return _error(404, 'NoSuchKey', 'The specified key does not exist')
+        response = Response(body, mimetype='application/octet-stream')
+        response.set_etag(hashlib.md5(body).hexdigest())
+        if request.args.get('response-content-disposition'):
+            response.headers['Content-Disposition'] = request.args['response-content-disposition']
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+
+    @app.route('/<bucket>/<path:key>', methods=['DELETE'])
+    def delete_object(bucket, key):
+        denied = check_signature()
+        if denied:
+            return denied
+        objects.pop((bucket, key), None)
+        modified.pop((bucket, key), None)
+        return Response(status=204)
+
+    app.objects = objects
+    app.modified = modified
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--access-key', default='local')
+    parser.add_argument('--secret-key', default='local')
+    args = parser.parse_args()
+
+    create_fake_s3(args.access_key, args.secret_key).run(host='127.0.0.1', port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
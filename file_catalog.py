@@ -0,0 +1,269 @@
+"""Database catalog of the files kept under UPLOAD_FOLDER.
+
+Uploads and deletes keep the catalog current so that listings are indexed
+queries rather than directory walks. reconcile() rescans the tree once to
+repair drift from files added or removed outside the API. Entries with a
+sha256 point into the blob store; the rest are legacy files stored at their
+catalog path until migrate_storage.py moves them into it.
+
+Per-entity storage usage is kept in storage_usage by every path that adds or
+removes catalog entries, in the same transaction, so usage reports never
+walk the tree. Usage counts logical files: a body shared by two entries is
+counted for both.
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models.user import db
+from models.file_record import FileRecord
+from models.file_blob import FileBlob
+from models.upload_session import UploadSession
+from models.storage_usage import StorageUsage
+from db_helpers import insert_for_dialect
+from db_engine import pin_primary
+
+ORPHAN_BLOB_GRACE = int(os.getenv('ORPHAN_BLOB_GRACE', 3600))
+
+
+def usage_key(entity_type, person_id):
+    return (entity_type or '', person_id or '')
+
+
+def adjust_storage_usage(deltas):
+    """Apply {(entity_type, person_id): (file delta, byte delta)} in the caller's transaction"""
+    table = StorageUsage.__table__
+    for (entity_type, person_id), (files, size) in deltas.items():
+        if not files and not size:
+            continue
+        stmt = insert_for_dialect(table).values(
+            entity_type=entity_type, person_id=person_id, file_count=files, total_bytes=size
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.entity_type, table.c.person_id],
+            set_={
+                'file_count': table.c.file_count + stmt.excluded.file_count,
+                'total_bytes': table.c.total_bytes + stmt.excluded.total_bytes
+            }
+        )
+        db.session.execute(stmt)
+
+
+def _add_usage(deltas, record, files, size):
+    key = usage_key(record.entity_type, record.person_id)
+    previous = deltas.get(key, (0, 0))
+    deltas[key] = (previous[0] + files, previous[1] + size)
+
+
+def add_record(rel_path, sha256, size, entity_type, person_id, category):
+    """Catalog a file whose body lives in the blob store"""
+    record = FileRecord(
+        path=rel_path,
+        name=rel_path.rsplit('/', 1)[-1],
+        sha256=sha256,
+        size=size,
+        modified_at=datetime.utcnow(),
+        entity_type=entity_type,
+        person_id=person_id,
+        category=category
+    )
+    db.session.add(record)
+    adjust_storage_usage({usage_key(entity_type, person_id): (1, size)})
+    return record
+
+
+def remove_record(record):
+    """Delete a catalog entry, keeping storage usage in step"""
+    db.session.delete(record)
+    adjust_storage_usage({usage_key(record.entity_type, record.person_id): (-1, -(record.size or 0))})
+
+
+def recount_storage_usage():
+    """Rebuild storage_usage from a single GROUP BY over the catalog"""
+    pin_primary(db.session)
+    rows = db.session.query(
+        func.coalesce(FileRecord.entity_type, ''),
+        func.coalesce(FileRecord.person_id, ''),
+        func.count(FileRecord.id),
+        func.coalesce(func.sum(FileRecord.size), 0)
+    ).group_by(FileRecord.entity_type, FileRecord.person_id).all()
+
+    usage = {}
+    for entity_type, person_id, files, size in rows:
+        previous = usage.get((entity_type, person_id), (0, 0))
+        usage[(entity_type, person_id)] = (previous[0] + files, previous[1] + int(size))
+
+    db.session.query(StorageUsage).delete()
+    db.session.add_all([
+        StorageUsage(entity_type=key[0], person_id=key[1], file_count=files, total_bytes=size)
+        for key, (files, size) in usage.items()
+    ])
+    db.session.commit()
+    return usage
+
+
+def reconcile(upload_folder):
+    """Bring the catalog in line with what is actually on disk"""
+    on_disk = {}
+    if os.path.exists(upload_folder):
+        for root, dirs, files in os.walk(upload_folder):
+            # Blob store and staging directories are managed separately.
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in files:
+                file_path = os.path.join(root, name)
+                on_disk[os.path.relpath(file_path, upload_folder)] = os.stat(file_path)
+
+    added = updated = removed = 0
+    deltas = {}
+    for record in FileRecord.query.filter(FileRecord.sha256.is_(None)).yield_per(1000):
+        stat = on_disk.pop(record.path, None)
+        if stat is None:
+            db.session.delete(record)
+            _add_usage(deltas, record, -1, -(record.size or 0))
+            removed += 1
+            continue
+        modified_at = datetime.fromtimestamp(stat.st_mtime)
+        if record.size != stat.st_size or record.modified_at != modified_at:
+            _add_usage(deltas, record, 0, stat.st_size - (record.size or 0))
+            record.size = stat.st_size
+            record.modified_at = modified_at
+            updated += 1
+
+    # A legacy file can share its path with an entry that has since moved into the blob store.
+    catalogued = {path for (path,) in db.session.query(FileRecord.path).filter(FileRecord.path.in_(list(on_disk)))}
+
+    for rel_path, stat in on_disk.items():
+        if rel_path in catalogued:
+            continue
+        # Layout is <entity_type>/<category>/<file>; the person is not recoverable from disk.
+        parts = rel_path.split(os.sep)
+        record = FileRecord(
+            path=rel_path,
+            name=parts[-1],
+            entity_type=parts[0] if len(parts) > 2 else None,
+            category=parts[1] if len(parts) > 2 else None,
+            size=stat.st_size,
+            modified_at=datetime.fromtimestamp(stat.st_mtime)
+        )
+        db.session.add(record)
+        _add_usage(deltas, record, 1, stat.st_size)
+        added += 1
+
+    adjust_storage_usage(deltas)
+    db.session.commit()
+    return {'added': added, 'updated': updated, 'removed': removed}
+
+
+def migrate_legacy_files(upload_folder, blob_store, batch_size=100):
+    """Move files still stored at their catalog path into the blob store; returns counts"""
+    moved = missing = 0
+    last_id = 0
+    while True:
+        records = FileRecord.query.filter(FileRecord.sha256.is_(None), FileRecord.id > last_id) \
+            .order_by(FileRecord.id).limit(batch_size).all()
+        if not records:
+            break
+
+        os.makedirs(blob_store.staging_folder, exist_ok=True)
+        migrated = []
+        deltas = {}
+        for record in records:
+            last_id = record.id
+            legacy_path = os.path.join(upload_folder, record.path)
+            if not os.path.isfile(legacy_path):
+                missing += 1
+                continue
+            # Store a link (or copy) so the original survives until the catalog change commits.
+            staged = os.path.join(blob_store.staging_folder, f'migrate-{record.id}.part')
+            try:
+                os.link(legacy_path, staged)
+            except OSError:
+                shutil.copyfile(legacy_path, staged)
+            try:
+                sha256, size = blob_store.adopt(staged)
+            finally:
+                if os.path.exists(staged):
+                    os.remove(staged)
+            _add_usage(deltas, record, 0, size - (record.size or 0))
+            record.sha256 = sha256
+            record.size = size
+            migrated.append(legacy_path)
+
+        adjust_storage_usage(deltas)
+        db.session.commit()
+        for legacy_path in migrated:
+            os.remove(legacy_path)
+        moved += len(migrated)
+
+    # Drop the directories the legacy layout leaves behind once empty.
+    for root, dirs, files in os.walk(upload_folder, topdown=False):
+        relative = os.path.relpath(root, upload_folder)
+        if relative != '.' and not relative.startswith('.') and not os.listdir(root):
+            os.rmdir(root)
+    return {'moved': moved, 'missing': missing}
+
+
+def copy_blobs(source, target, staging_folder):
+    """Copy every blob missing from the target backend; returns the number copied"""
+    os.makedirs(staging_folder, exist_ok=True)
+    copied = 0
+    for key in source.keys():
+        if target.exists(key):
+            continue
+        fd, temp_path = tempfile.mkstemp(dir=staging_folder, suffix='.part')
+        os.close(fd)
+        try:
+            if source.download(key, temp_path):
+                target.put(temp_path, key, key.rsplit('/', 1)[-1])
+                copied += 1
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return copied
+
+
+def purge_stale_uploads(staging_folder, max_age):
+    """Abandon resumable uploads untouched for longer than max_age (a timedelta)"""
+    cutoff = datetime.utcnow() - max_age
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for session in stale:
+        part_path = os.path.join(staging_folder, f'{session.id}.upload')
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        db.session.delete(session)
+    db.session.commit()
+    return len(stale)
+
+
+def collect_orphan_blobs(blob_store, batch_size=1000, grace=timedelta(seconds=ORPHAN_BLOB_GRACE)):
+    """Remove stored blobs that no catalog entry references.
+
+    Blobs written within grace (a timedelta) are left alone: store() puts the
+    body before the upload's file_blobs row commits.
+    """
+    removed = 0
+    # Released blobs whose delete never got as far as discard_if_unreferenced().
+    released = [sha256 for (sha256,) in db.session.query(FileBlob.sha256).filter(FileBlob.ref_count <= 0)]
+    for sha256 in released:
+        removed += blob_store.discard_if_unreferenced(sha256)
+
+    batch = []
+
+    def sweep():
+        nonlocal removed
+        names = [key.rsplit('/', 1)[-1] for key in batch]
+        known = {sha256 for (sha256,) in db.session.query(FileBlob.sha256).filter(FileBlob.sha256.in_(names))}
+        for key, name in zip(batch, names):
+            if name not in known:
+                blob_store.delete(key)
+                removed += 1
+        batch.clear()
+
+    for key in blob_store.backend.keys(older_than=datetime.utcnow() - grace):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            sweep()
+    sweep()
+    return removed
@@ -1,20 +1,80 @@
+import fcntl
 import os
-from flask import Blueprint, request, jsonify, send_file
+import uuid
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, redirect
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from models.user import db
+from models.file_record import FileRecord
+from models.upload_session import UploadSession
+from models.storage_usage import StorageUsage
+from admission import route_class
+from file_catalog import add_record, remove_record
+from blob_store import BlobStore, StreamingUploadRequest, CHUNK_SIZE, BLOB_DIR
+from storage_backends import backend_from_env
+from document_index import queue_extraction, search_documents
 
 files_bp = Blueprint('files', __name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', os.path.join(BASE_DIR, 'uploads'))
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt', 'jpg', 'jpeg', 'png'}
 MAX_FILE_SIZE = 16 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+UPLOAD_SESSION_TTL_HOURS = 24
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+
+blob_store = BlobStore(UPLOAD_FOLDER, backend_from_env(STORAGE_BACKEND, os.path.join(UPLOAD_FOLDER, BLOB_DIR)))
+
+@files_bp.record_once
+def configure_streaming_uploads(state):
+    """Stream multipart uploads straight into the blob store's staging folder"""
+    state.app.request_class = StreamingUploadRequest
+    state.app.config.setdefault('UPLOAD_STAGING_FOLDER', blob_store.staging_folder)
+    state.app.config.setdefault('MAX_UPLOAD_FILE_SIZE', MAX_FILE_SIZE)
+    # Let Apache/lighttpd (X-Sendfile) or nginx (X-Accel-Redirect) stream downloads.
+    state.app.config.setdefault('USE_X_SENDFILE', os.getenv('USE_X_SENDFILE', '').lower() == 'true')
+    state.app.config.setdefault('X_ACCEL_REDIRECT_PREFIX', os.getenv('X_ACCEL_REDIRECT_PREFIX'))
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def catalog_path(entity_type, category, filename):
+    """Logical path for a new upload: <entity_type>/<category>/<timestamp>_<random>_<filename>"""
+    # secure_filename also drops the '..' and leading dots that normalize_path refuses to serve.
+    category_folder = secure_filename(category.lower().replace('/', '_').replace(' ', '_')) or 'other'
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # The random part keeps uploads in the same second apart without a lookup that could race.
+    return f"{secure_filename(entity_type) or 'general'}/{category_folder}/{timestamp}_{uuid.uuid4().hex[:8]}_{filename}"
+
+def normalize_path(filename):
+    """Catalog path for a URL path, or None if it would escape UPLOAD_FOLDER or reach its internal directories"""
+    rel_path = os.path.normpath(filename).replace(os.sep, '/')
+    # The blob store and staging folders (.blobs, .staging) are never catalog paths.
+    if rel_path.startswith('/') or any(part.startswith('.') for part in rel_path.split('/')):
+        return None
+    return rel_path
+
+def upload_part_path(upload_id):
+    return os.path.join(blob_store.staging_folder, f'{upload_id}.upload')
+
+def upload_result(record):
+    return {
+        'message': 'File uploaded successfully',
+        'id': record.id,
+        'filename': record.name,
+        'path': record.path,
+        'sha256': record.sha256,
+        'category': record.category,
+        'entity_type': record.entity_type,
+        'person_id': record.person_id,
+        'size': record.size
+    }
+
 @files_bp.route('/files/upload', methods=['POST'])
+@route_class('files')
 def upload_file():
     try:
         if 'file' not in request.files:
@@ -31,65 +91,329 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': 'File type not allowed'}), 400
         
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
+        rel_path = catalog_path(entity_type, category, secure_filename(file.filename))
+        
+        # The body was already streamed into staging (and hashed) while the form was parsed.
+        sha256, file_size = blob_store.ingest(file.stream, MAX_FILE_SIZE)
+        record = add_record(rel_path, sha256, file_size, entity_type, person_id, category)
+        queue_extraction(record)
+        db.session.commit()
+        
+        return jsonify(upload_result(record)), 200
+        
+    except RequestEntityTooLarge:
+        db.session.rollback()
+        return jsonify({'error': 'File too large (max 16MB)'}), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+
+@files_bp.route('/files/uploads', methods=['POST'])
+@route_class('files')
+def start_resumable_upload():
+    """Open a resumable upload; the client then PATCHes chunks at Upload-Offset"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('filename'):
+            return jsonify({'error': 'Missing required field: filename'}), 400
+        if not allowed_file(data['filename']):
+            return jsonify({'error': 'File type not allowed'}), 400
         
-        if file_size > MAX_FILE_SIZE:
-            return jsonify({'error': 'File too large (max 16MB)'}), 400
+        total_size = data.get('size')
+        if not isinstance(total_size, int) or total_size <= 0:
+            return jsonify({'error': 'size must be a positive integer'}), 400
+        if total_size > MAX_FILE_SIZE:
+            return jsonify({'error': 'File too large (max 16MB)'}), 413
         
-        category_folder = category.lower().replace('/', '_').replace(' ', '_')
-        upload_path = os.path.join(UPLOAD_FOLDER, entity_type, category_folder)
-        os.makedirs(upload_path, exist_ok=True)
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            filename=secure_filename(data['filename']),
+            total_size=total_size,
+            entity_type=data.get('entity_type', 'general'),
+            person_id=data.get('person_id', 'unknown'),
+            category=data.get('category', 'other')
+        )
+        db.session.add(session)
         
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(upload_path, filename)
+        os.makedirs(blob_store.staging_folder, exist_ok=True)
+        open(upload_part_path(session.id), 'wb').close()
+        db.session.commit()
         
-        file.save(file_path)
+        return jsonify({
+            'upload_id': session.id,
+            'offset': 0,
+            'size': total_size,
+            'chunk_size': CHUNK_SIZE
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/uploads/<upload_id>', methods=['GET'])
+def get_resumable_upload(upload_id):
+    """Report how many bytes of a resumable upload have been received"""
+    try:
+        session = UploadSession.query.get_or_404(upload_id)
+        part_path = upload_part_path(session.id)
         
         return jsonify({
-            'message': 'File uploaded successfully',
-            'filename': filename,
-            'path': file_path,
-            'category': category,
-            'entity_type': entity_type,
-            'person_id': person_id,
-            'size': file_size
+            'upload_id': session.id,
+            'offset': os.path.getsize(part_path) if os.path.exists(part_path) else 0,
+            'size': session.total_size
         }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/uploads/<upload_id>', methods=['PATCH'])
+@route_class('files')
+def append_resumable_upload(upload_id):
+    """Append the request body at Upload-Offset, finishing the upload once every byte has arrived"""
+    try:
+        session = UploadSession.query.get_or_404(upload_id)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return jsonify({'error': 'Upload-Offset header is required'}), 400
+        
+        part_path = upload_part_path(session.id)
+        try:
+            # r+b rather than ab: a part file that was finished and moved away must not be recreated.
+            part = open(part_path, 'r+b')
+        except FileNotFoundError:
+            return jsonify({'error': 'Upload data is missing; start a new upload'}), 410
         
+        with part:
+            # Overlapping PATCHes (e.g. a retry racing the original) take turns here,
+            # so the offset check and the append see the same file size.
+            fcntl.flock(part, fcntl.LOCK_EX)
+            if not os.path.exists(part_path):
+                return jsonify({'error': 'Upload data is missing; start a new upload'}), 410
+            
+            # The bytes on disk are the source of truth, so a dropped chunk resumes from what landed.
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                return jsonify({'error': 'Offset mismatch', 'offset': current}), 409
+            
+            part.seek(current)
+            remaining = session.total_size - current
+            while True:
+                chunk = request.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(chunk) > remaining:
+                    # Drop what this request already appended too, so a retry resumes at the offset it sent.
+                    part.truncate(offset)
+                    return jsonify({'error': 'Chunk runs past the declared size', 'offset': offset}), 413
+                part.write(chunk)
+                remaining -= len(chunk)
+            part.flush()
+            
+            received = session.total_size - remaining
+            session.updated_at = datetime.utcnow()
+            
+            if remaining:
+                db.session.commit()
+                return jsonify({'upload_id': session.id, 'offset': received, 'size': session.total_size}), 200
+            
+            # Still under the lock, so a concurrent PATCH finds the part file gone rather than finishing twice.
+            sha256, file_size = blob_store.adopt(part_path)
+            record = add_record(
+                catalog_path(session.entity_type, session.category, session.filename),
+                sha256, file_size, session.entity_type, session.person_id, session.category
+            )
+            queue_extraction(record)
+            db.session.delete(session)
+            db.session.commit()
+        
+        return jsonify(upload_result(record)), 200
     except Exception as e:
-        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/uploads/<upload_id>', methods=['DELETE'])
+def cancel_resumable_upload(upload_id):
+    """Abandon a resumable upload and discard the bytes received so far"""
+    try:
+        session = UploadSession.query.get_or_404(upload_id)
+        part_path = upload_part_path(session.id)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        db.session.delete(session)
+        db.session.commit()
+        
+        return jsonify({'message': 'Upload cancelled'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
 
 @files_bp.route('/files', methods=['GET'])
 def get_files():
+    """List catalogued files, newest first, filtered by entity_type/person_id/category"""
     try:
-        files_list = []
-        if os.path.exists(UPLOAD_FOLDER):
-            for root, dirs, files in os.walk(UPLOAD_FOLDER):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(file_path, UPLOAD_FOLDER)
-                    files_list.append({
-                        'name': file,
-                        'path': rel_path,
-                        'size': os.path.getsize(file_path),
-                        'modified': datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-                    })
-        
-        return jsonify(files_list), 200
+        query = FileRecord.query
+        for field in ('entity_type', 'person_id', 'category'):
+            value = request.args.get(field)
+            if value:
+                query = query.filter(getattr(FileRecord, field) == value)
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+            after = request.args.get('after')
+            if after:
+                query = query.filter(FileRecord.id < int(after))
+        except ValueError:
+            return jsonify({'error': 'limit and after must be integers'}), 400
+        
+        records = query.order_by(FileRecord.id.desc()).limit(limit + 1).all()
+        has_more = len(records) > limit
+        records = records[:limit]
+        
+        return jsonify({
+            'files': [record.to_dict() for record in records],
+            'next_cursor': str(records[-1].id) if has_more else None
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/search', methods=['GET'])
+def search_files():
+    """Full-text search over extracted document text, filtered by entity_type/person_id/category"""
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'q is required'}), 400
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+            offset = max(0, int(request.args.get('offset', 0)))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        
+        filters = {field: request.args.get(field) for field in ('entity_type', 'person_id', 'category')}
+        # Fetch one extra match to learn whether another page exists.
+        matches = search_documents(q, filters, limit + 1, offset)
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+        
+        return jsonify({
+            'files': [dict(record.to_dict(), rank=round(float(rank), 6), snippet=snippet)
+                      for record, rank, snippet in matches],
+            'next_offset': offset + limit if has_more else None
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/usage', methods=['GET'])
+@route_class('stats')
+def get_storage_usage():
+    """Stored file counts and bytes per entity, from the maintained counters"""
+    try:
+        query = StorageUsage.query
+        for field in ('entity_type', 'person_id'):
+            value = request.args.get(field)
+            if value:
+                query = query.filter(getattr(StorageUsage, field) == value)
+        
+        rows = query.order_by(StorageUsage.total_bytes.desc()).all()
+        return jsonify({
+            'usage': [row.to_dict() for row in rows],
+            'total_files': sum(row.file_count for row in rows),
+            'total_bytes': sum(row.total_bytes for row in rows)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def not_modified(etag, last_modified):
+    """True when the client's validators show its cached copy is current"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+@files_bp.route('/files/<path:filename>', methods=['GET'])
+@route_class('files')
+def download_file(filename):
+    """Serve a stored file with Range, ETag and conditional GET support (?download=1 forces an attachment)"""
+    try:
+        rel_path = normalize_path(filename)
+        if rel_path is None:
+            return jsonify({'error': 'File not found'}), 404
+        
+        # Only catalogued files are served, never whatever happens to sit under UPLOAD_FOLDER.
+        record = FileRecord.query.filter_by(path=rel_path).first()
+        if record is None:
+            return jsonify({'error': 'File not found'}), 404
+        
+        download_name = record.name
+        as_attachment = request.args.get('download', '').lower() in ('1', 'true', 'yes')
+        if record.sha256:
+            file_path = blob_store.blob_path(record.sha256)
+            etag = record.sha256
+        else:
+            file_path = os.path.join(UPLOAD_FOLDER, rel_path)
+            etag = True
+        
+        # Blob ETags come from the catalog, so a revalidation needs no filesystem access at all.
+        if record.sha256 and not_modified(etag, record.modified_at):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        
+        if file_path is None:
+            # Remote backends hand out a short-lived URL, so the bytes never pass through the app.
+            return redirect(blob_store.download_url(record.sha256, download_name, as_attachment), code=302)
+        
+        if not os.path.isfile(file_path):
+            return jsonify({'error': 'File not found'}), 404
+        
+        accel_prefix = current_app.config.get('X_ACCEL_REDIRECT_PREFIX')
+        if accel_prefix:
+            # nginx serves the bytes (and Range) from an internal location mapped onto UPLOAD_FOLDER.
+            response = send_file(file_path, download_name=download_name, as_attachment=as_attachment,
+                                 etag=etag, conditional=True, max_age=0)
+            if response.status_code == 200:
+                response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + \
+                    os.path.relpath(file_path, UPLOAD_FOLDER).replace(os.sep, '/')
+                response.close()
+                response.response = []
+        else:
+            response = send_file(file_path, download_name=download_name, as_attachment=as_attachment,
+                                 etag=etag, conditional=True, max_age=0)
+        
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @files_bp.route('/files/<path:filename>', methods=['DELETE'])
 def delete_file(filename):
     try:
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            return jsonify({'message': 'File deleted successfully'}), 200
-        else:
+        rel_path = normalize_path(filename)
+        if rel_path is None:
             return jsonify({'error': 'File not found'}), 404
+        
+        record = FileRecord.query.filter_by(path=rel_path).first()
+        if record is None:
+            return jsonify({'error': 'File not found'}), 404
+        
+        released = blob_store.release(record.sha256) if record.sha256 else None
+        # Legacy uploads live at their catalog path until migrate_storage.py moves them.
+        legacy_path = os.path.join(UPLOAD_FOLDER, rel_path) if not record.sha256 else None
+        remove_record(record)
+        db.session.commit()
+        
+        if released:
+            blob_store.discard_if_unreferenced(released)
+        if legacy_path and os.path.isfile(legacy_path):
+            os.remove(legacy_path)
+        
+        return jsonify({'message': 'File deleted successfully'}), 200
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
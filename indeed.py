@@ -1,84 +1,83 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models.user import db
 from models.candidate import Candidate
+from db_engine import use_replica
+from admission import route_class
+from response_cache import cached, invalidate, candidate_tag
+from indeed_sync import HttpFeedClient, StaticFeedClient, MOCK_INDEED_CANDIDATES, SYNC_STATUS_TAG, run_sync, last_run
+from indeed_push import HttpPushClient, MockPushClient, push_statuses
+from job_queue import job_handler, enqueue
 import os
 from datetime import datetime
 
 indeed_bp = Blueprint('indeed', __name__)
 
-INDEED_API_BASE = "https://api.indeed.com"
+INDEED_API_BASE = os.getenv('INDEED_API_BASE', "https://api.indeed.com")
 INDEED_CLIENT_ID = os.getenv('INDEED_CLIENT_ID', 'your_client_id' )
 INDEED_CLIENT_SECRET = os.getenv('INDEED_CLIENT_SECRET', 'your_client_secret')
+INDEED_PUSH_WORKERS = int(os.getenv('INDEED_PUSH_WORKERS', 8))
+INDEED_PUSH_RATE = float(os.getenv('INDEED_PUSH_RATE', 10))
+INDEED_PUSH_RETRIES = int(os.getenv('INDEED_PUSH_RETRIES', 3))
+MAX_PUSH_BATCH = 1000
+SYNC_JOB = 'indeed.sync_candidates'
+
+_push_client = None
 
 # NOTE: The @token_required and @admin_required decorators were removed
 # because the auth.py file was deleted. This makes these endpoints public.
 # This is a temporary measure to get the app to build.
 # Real authentication should be re-implemented later.
 
+def get_feed_client():
+    """Pick the feed client: app config override, the live API when configured, else mock data"""
+    client = current_app.config.get('INDEED_FEED_CLIENT')
+    if client is not None:
+        return client
+    if os.getenv('INDEED_CLIENT_ID'):
+        return HttpFeedClient(INDEED_API_BASE, INDEED_CLIENT_ID, INDEED_CLIENT_SECRET)
+    return StaticFeedClient(MOCK_INDEED_CANDIDATES)
+
+def get_push_client():
+    """Status push client, built once per process so its keep-alive connections are reused"""
+    global _push_client
+    client = current_app.config.get('INDEED_PUSH_CLIENT')
+    if client is not None:
+        return client
+    if _push_client is None:
+        if os.getenv('INDEED_CLIENT_ID'):
+            _push_client = HttpPushClient(
+                INDEED_API_BASE, INDEED_CLIENT_ID, INDEED_CLIENT_SECRET,
+                rate=INDEED_PUSH_RATE, max_retries=INDEED_PUSH_RETRIES, pool_size=INDEED_PUSH_WORKERS
+            )
+        else:
+            _push_client = MockPushClient()
+    return _push_client
+
+@job_handler(SYNC_JOB)
+def sync_candidates_job(payload, progress):
+    """Background variant of sync_candidates, run by worker.py"""
+    return run_sync(get_feed_client(), full=payload.get('full', False), on_page=progress)
+
 @indeed_bp.route('/sync-candidates', methods=['POST'])
+@route_class('heavy_write')
 def sync_candidates():
-    """Sync candidates from Indeed ATS"""
+    """Sync candidates from Indeed ATS since the last cursor (?full=1 re-reads the whole feed, ?async=1 queues a job)"""
     try:
-        mock_indeed_candidates = [
-            {
-                "indeed_registration_id": "REG123456",
-                "ats_candidate_id": "CAND789",
-                "ats_application_id": "APP456",
-                "first_name": "Michael",
-                "last_name": "Brown",
-                "email": "michael.brown@email.com",
-                "phone": "555-0123",
-                "indeed_status": "Active"
-            },
-            {
-                "indeed_registration_id": "REG789012",
-                "ats_candidate_id": "CAND345",
-                "ats_application_id": "APP789",
-                "first_name": "Emily",
-                "last_name": "Davis",
-                "email": "emily.davis@email.com",
-                "phone": "555-0456",
-                "indeed_status": "Under Review"
-            }
-        ]
-        
-        synced_candidates = []
-        
-        for candidate_data in mock_indeed_candidates:
-            existing_candidate = Candidate.query.filter_by(
-                indeed_registration_id=candidate_data['indeed_registration_id']
-            ).first()
-            
-            if existing_candidate:
-                existing_candidate.ats_candidate_id = candidate_data['ats_candidate_id']
-                existing_candidate.ats_application_id = candidate_data['ats_application_id']
-                existing_candidate.indeed_status = candidate_data['indeed_status']
-                existing_candidate.last_sync_timestamp = datetime.utcnow()
-                existing_candidate.updated_at = datetime.utcnow()
-                synced_candidates.append(existing_candidate.to_dict())
-            else:
-                new_candidate = Candidate(
-                    first_name=candidate_data['first_name'],
-                    last_name=candidate_data['last_name'],
-                    email=candidate_data['email'],
-                    phone=candidate_data['phone'],
-                    indeed_registration_id=candidate_data['indeed_registration_id'],
-                    ats_candidate_id=candidate_data['ats_candidate_id'],
-                    ats_application_id=candidate_data['ats_application_id'],
-                    indeed_status=candidate_data['indeed_status'],
-                    pipeline_status='Applied',
-                    admin_approval='Pending',
-                    last_sync_timestamp=datetime.utcnow()
-                )
-                db.session.add(new_candidate)
-                db.session.flush()
-                synced_candidates.append(new_candidate.to_dict())
+        full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
         
-        db.session.commit()
+        if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+            # One sync at a time: a request while one is queued or running gets that job back.
+            job, created = enqueue(SYNC_JOB, {'full': full}, dedup_key=SYNC_JOB)
+            db.session.commit()
+            response = jsonify({'job': job.to_dict(), 'created': created})
+            response.headers['Location'] = f'/api/jobs/{job.id}'
+            return response, 202
+        
+        report = run_sync(get_feed_client(), full=full)
         
         return jsonify({
-            'message': f'Successfully synced {len(synced_candidates)} candidates from Indeed',
-            'synced_candidates': synced_candidates
+            'message': f"Successfully synced {report['created'] + report['updated']} candidates from Indeed",
+            'run': report
         }), 200
         
     except Exception as e:
@@ -99,22 +98,57 @@ def push_candidate_status():
         if not candidate.indeed_registration_id:
             return jsonify({'error': 'Candidate is not synced with Indeed'}), 400
         
-        mock_response = {
-            'success': True,
-            'message': 'Status updated successfully in Indeed',
-            'indeed_status': candidate.pipeline_status
-        }
+        indeed_response = get_push_client().push_status({
+            'id': candidate.id,
+            'indeed_registration_id': candidate.indeed_registration_id,
+            'ats_candidate_id': candidate.ats_candidate_id,
+            'ats_application_id': candidate.ats_application_id,
+            'pipeline_status': candidate.pipeline_status
+        })
         
         candidate.indeed_status = candidate.pipeline_status
         candidate.last_sync_timestamp = datetime.utcnow()
         candidate.updated_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate('candidates', candidate_tag(candidate.id))
         
         return jsonify({
             'message': 'Candidate status pushed to Indeed successfully',
             'candidate': candidate.to_dict(),
-            'indeed_response': mock_response
+            'indeed_response': indeed_response
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@indeed_bp.route('/push-candidate-status/batch', methods=['POST'])
+@route_class('heavy_write')
+def push_candidate_status_batch():
+    """Push status updates for many candidates to Indeed concurrently"""
+    try:
+        data = request.get_json()
+        
+        candidate_ids = data.get('candidate_ids') if isinstance(data, dict) else None
+        if not isinstance(candidate_ids, list) or not candidate_ids:
+            return jsonify({'error': 'candidate_ids must be a non-empty list'}), 400
+        if len(candidate_ids) > MAX_PUSH_BATCH:
+            return jsonify({'error': f'Too many candidates (max {MAX_PUSH_BATCH})'}), 400
+        if not all(isinstance(candidate_id, int) for candidate_id in candidate_ids):
+            return jsonify({'error': 'candidate_ids must be integers'}), 400
+        
+        results = push_statuses(get_push_client(), candidate_ids, workers=INDEED_PUSH_WORKERS)
+        pushed = sum(1 for result in results if result['status'] == 'pushed')
+        invalidate('candidates', *[
+            candidate_tag(result['candidate_id']) for result in results if result['status'] == 'pushed'
+        ])
+        
+        return jsonify({
+            'message': f'Pushed {pushed} of {len(results)} candidate statuses to Indeed',
+            'pushed': pushed,
+            'failed': len(results) - pushed,
+            'results': results
         }), 200
         
     except Exception as e:
@@ -122,6 +156,9 @@ def push_candidate_status():
         return jsonify({'error': str(e)}), 500
 
 @indeed_bp.route('/sync-status', methods=['GET'])
+@route_class('stats')
+@cached('candidates', SYNC_STATUS_TAG)
+@use_replica
 def get_sync_status():
     """Get Indeed sync status and statistics"""
     try:
@@ -141,6 +178,7 @@ def get_sync_status():
             'synced_candidates': synced_candidates,
             'sync_percentage': (synced_candidates / max(total_candidates, 1)) * 100,
             'last_sync_time': last_sync_time.isoformat() if last_sync_time else None,
+            'last_run': last_run(),
             'indeed_api_configured': bool(INDEED_CLIENT_ID and INDEED_CLIENT_SECRET)
         }), 200
         
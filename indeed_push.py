@@ -0,0 +1,159 @@
+"""Candidate status pushes to the Indeed ATS API.
+
+Batch pushes fan out over a bounded thread pool. The workers share one pooled
+keep-alive session, are paced by a client-side token bucket and retry
+transient failures with exponential backoff. The outcome of every push is
+collected, and successful ones are written back in a single bulk UPDATE.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import update
+from models.user import db
+from models.candidate import Candidate
+from change_feed import record_changes
+
+PUSH_TIMEOUT = 15
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Thread-safe token bucket; acquire() blocks until a token is free"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class MockPushClient:
+    """Accepts every push without calling out, used until Indeed credentials are configured"""
+
+    def push_status(self, candidate):
+        return {
+            'success': True,
+            'message': 'Status updated successfully in Indeed',
+            'indeed_status': candidate['pipeline_status']
+        }
+
+
+class HttpPushClient:
+    """Pushes statuses to POST {base_url}/v1/ats/candidates/<registration id>/status"""
+
+    def __init__(self, base_url, client_id=None, client_secret=None, rate=10, max_retries=3,
+                 backoff=0.5, max_backoff=30, pool_size=8, timeout=PUSH_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if client_id and client_secret:
+            self.session.auth = (client_id, client_secret)
+        self.limiter = RateLimiter(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        # Each wait holds a request thread, so even a server-requested one is capped.
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * (2 ** attempt), self.max_backoff) * (0.5 + random.random() / 2)
+
+    def push_status(self, candidate):
+        url = f"{self.base_url}/v1/ats/candidates/{candidate['indeed_registration_id']}/status"
+        body = {
+            'status': candidate['pipeline_status'],
+            'ats_candidate_id': candidate['ats_candidate_id'],
+            'ats_application_id': candidate['ats_application_id']
+        }
+
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                response = self.session.post(url, json=body, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._delay(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                time.sleep(self._delay(attempt, response))
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+
+def _push_one(client, candidate):
+    try:
+        return {'candidate_id': candidate['id'], 'status': 'pushed',
+                'indeed_response': client.push_status(candidate)}
+    except Exception as e:
+        return {'candidate_id': candidate['id'], 'status': 'error', 'error': str(e)}
+
+
+def push_statuses(client, candidate_ids, workers=8):
+    """Push the current pipeline status of many candidates; returns per-candidate results in input order"""
+    rows = db.session.query(
+        Candidate.id, Candidate.indeed_registration_id, Candidate.ats_candidate_id,
+        Candidate.ats_application_id, Candidate.pipeline_status
+    ).filter(Candidate.id.in_(candidate_ids)).all()
+    candidates = {row.id: row._asdict() for row in rows}
+
+    results = {}
+    to_push = []
+    for candidate_id in dict.fromkeys(candidate_ids):
+        candidate = candidates.get(candidate_id)
+        if candidate is None:
+            results[candidate_id] = {'candidate_id': candidate_id, 'status': 'error', 'error': 'Candidate not found'}
+        elif not candidate['indeed_registration_id']:
+            results[candidate_id] = {'candidate_id': candidate_id, 'status': 'error',
+                                     'error': 'Candidate is not synced with Indeed'}
+        else:
+            to_push.append(candidate)
+
+    # The pool only does HTTP; all database work stays on the request thread.
+    if to_push:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(to_push)))) as pool:
+            for result in pool.map(lambda candidate: _push_one(client, candidate), to_push):
+                results[result['candidate_id']] = result
+
+    now = datetime.utcnow()
+    pushed = [candidate for candidate in to_push if results[candidate['id']]['status'] == 'pushed']
+    if pushed:
+        db.session.execute(update(Candidate), [{
+            'id': candidate['id'],
+            'indeed_status': candidate['pipeline_status'],
+            'last_sync_timestamp': now,
+            'updated_at': now
+        } for candidate in pushed])
+        record_changes('candidate', [candidate['id'] for candidate in pushed], 'update')
+    db.session.commit()
+
+    return [results[candidate_id] for candidate_id in dict.fromkeys(candidate_ids)]
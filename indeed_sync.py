@@ -0,0 +1,362 @@
+"""Incremental Indeed ATS candidate sync.
+
+The engine pages through the feed from the cursor persisted by the previous
+run. For each page it resolves the candidates that already exist with a single
+IN (...) lookup. It skips records whose payload hash has not changed, and
+applies the rest as one bulk INSERT plus one bulk UPDATE. A record whose
+email already belongs to a different registration is counted as a conflict
+and left alone, rather than relinking that candidate. A new registration
+without an email is counted as invalid and skipped. Feed access goes
+through a client object, so a local fake Indeed server or a static list can
+stand in for the real API. AsyncHttpFeedClient and run_sync_async serve the
+ASGI entry point: the next page is fetched while the current one is written.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime
+import requests
+from sqlalchemy import or_, update
+from models.user import db
+from models.candidate import Candidate
+from models.indeed_sync import IndeedSyncState, IndeedRecordHash
+from db_helpers import insert_for_dialect
+from stats import adjust_candidate_counts
+from change_feed import record_changes
+from response_cache import invalidate, candidate_tag
+
+try:
+    import httpx
+except ImportError:  # optional; only the ASGI entry point's async client needs it
+    httpx = None
+
+CANDIDATE_FEED = 'candidates'
+SYNC_STATUS_TAG = 'indeed_sync'
+SYNC_PAGE_SIZE = 500
+FEED_TIMEOUT = 30
+
+MOCK_INDEED_CANDIDATES = [
+    {
+        "indeed_registration_id": "REG123456",
+        "ats_candidate_id": "CAND789",
+        "ats_application_id": "APP456",
+        "first_name": "Michael",
+        "last_name": "Brown",
+        "email": "michael.brown@email.com",
+        "phone": "555-0123",
+        "indeed_status": "Active"
+    },
+    {
+        "indeed_registration_id": "REG789012",
+        "ats_candidate_id": "CAND345",
+        "ats_application_id": "APP789",
+        "first_name": "Emily",
+        "last_name": "Davis",
+        "email": "emily.davis@email.com",
+        "phone": "555-0456",
+        "indeed_status": "Under Review"
+    }
+]
+
+
+class FeedPage:
+    """One page of feed records plus where to continue from"""
+
+    def __init__(self, records, next_page_token=None, cursor=None):
+        self.records = records
+        self.next_page_token = next_page_token
+        self.cursor = cursor
+
+
+class StaticFeedClient:
+    """Serves a fixed list of records as a single page"""
+
+    def __init__(self, records):
+        self.records = records
+
+    def fetch_page(self, since=None, page_token=None, limit=SYNC_PAGE_SIZE):
+        return FeedPage(list(self.records), cursor=since)
+
+
+class HttpFeedClient:
+    """Reads the candidate feed from the Indeed ATS API, or any server speaking the same protocol.
+
+    GET {base_url}/v1/ats/candidates?since=&page_token=&limit= is expected to return
+    {"candidates": [...], "next_page_token": str|null, "cursor": str}.
+    """
+
+    def __init__(self, base_url, client_id=None, client_secret=None, session=None, timeout=FEED_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.session = session or requests.Session()
+        if client_id and client_secret:
+            self.session.auth = (client_id, client_secret)
+        self.timeout = timeout
+
+    def fetch_page(self, since=None, page_token=None, limit=SYNC_PAGE_SIZE):
+        params = {'limit': limit}
+        if since:
+            params['since'] = since
+        if page_token:
+            params['page_token'] = page_token
+
+        response = self.session.get(f'{self.base_url}/v1/ats/candidates', params=params, timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+        return FeedPage(payload.get('candidates', []), payload.get('next_page_token'), payload.get('cursor'))
+
+
+class AsyncHttpFeedClient:
+    """HttpFeedClient over httpx.AsyncClient, for the ASGI entry point"""
+
+    def __init__(self, base_url, client_id=None, client_secret=None, timeout=FEED_TIMEOUT):
+        if httpx is None:
+            raise RuntimeError('AsyncHttpFeedClient needs httpx installed')
+        auth = (client_id, client_secret) if client_id and client_secret else None
+        self.client = httpx.AsyncClient(base_url=base_url.rstrip('/'), auth=auth, timeout=timeout)
+
+    async def fetch_page(self, since=None, page_token=None, limit=SYNC_PAGE_SIZE):
+        params = {'limit': limit}
+        if since:
+            params['since'] = since
+        if page_token:
+            params['page_token'] = page_token
+
+        response = await self.client.get('/v1/ats/candidates', params=params)
+        response.raise_for_status()
+        payload = response.json()
+        return FeedPage(payload.get('candidates', []), payload.get('next_page_token'), payload.get('cursor'))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def payload_hash(record):
+    return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _sync_state():
+    state = db.session.get(IndeedSyncState, CANDIDATE_FEED)
+    if state is None:
+        state = IndeedSyncState(feed=CANDIDATE_FEED)
+        db.session.add(state)
+    return state
+
+
+def _apply_page(records, now):
+    """Write one page of feed records; returns (created count, updated candidate ids, skipped, conflict and invalid counts)"""
+    # Later records for the same registration supersede earlier ones.
+    by_registration = {}
+    for record in records:
+        by_registration[record['indeed_registration_id']] = record
+    hashes = {registration_id: payload_hash(record) for registration_id, record in by_registration.items()}
+    emails = [record['email'] for record in by_registration.values() if record.get('email')]
+
+    existing_by_registration = {}
+    existing_by_email = {}
+    rows = db.session.query(
+        Candidate.id, Candidate.indeed_registration_id, Candidate.email, IndeedRecordHash.payload_hash
+    ).outerjoin(
+        IndeedRecordHash, IndeedRecordHash.candidate_id == Candidate.id
+    ).filter(or_(
+        Candidate.indeed_registration_id.in_(list(by_registration)),
+        Candidate.email.in_(emails)
+    ))
+    for candidate_id, registration_id, email, stored_hash in rows:
+        if registration_id:
+            existing_by_registration[registration_id] = (candidate_id, stored_hash)
+        existing_by_email[email] = (candidate_id, registration_id)
+
+    inserts = []
+    updates = []
+    skipped = conflicts = invalid = 0
+    # email -> the registration that takes it in this page; emails are unique, registrations may not share one.
+    claimed = {}
+    for registration_id, record in by_registration.items():
+        match = existing_by_registration.get(registration_id)
+        if match is None:
+            email = record.get('email')
+            if not email:
+                # Nothing to create or link a candidate by.
+                invalid += 1
+                continue
+            owner = existing_by_email.get(email)
+            if claimed.setdefault(email, registration_id) != registration_id or \
+                    (owner is not None and owner[1] and owner[1] != registration_id):
+                # Another registration already holds this email; linking this one would take it over.
+                conflicts += 1
+                continue
+            if owner is not None:
+                match = (owner[0], None)
+        if match is None:
+            inserts.append({
+                'first_name': record['first_name'],
+                'last_name': record['last_name'],
+                'email': record['email'],
+                'phone': record.get('phone'),
+                'indeed_registration_id': registration_id,
+                'ats_candidate_id': record.get('ats_candidate_id'),
+                'ats_application_id': record.get('ats_application_id'),
+                'indeed_status': record.get('indeed_status'),
+                'pipeline_status': 'Applied',
+                'admin_approval': 'Pending',
+                'last_sync_timestamp': now,
+                'created_at': now,
+                'updated_at': now
+            })
+        elif match[1] == hashes[registration_id]:
+            skipped += 1
+        else:
+            updates.append({
+                'id': match[0],
+                'indeed_registration_id': registration_id,
+                'ats_candidate_id': record.get('ats_candidate_id'),
+                'ats_application_id': record.get('ats_application_id'),
+                'indeed_status': record.get('indeed_status'),
+                'last_sync_timestamp': now,
+                'updated_at': now
+            })
+
+    candidate_ids = {}
+    if inserts:
+        table = Candidate.__table__
+        for candidate_id, registration_id in db.session.execute(
+            table.insert().returning(table.c.id, table.c.indeed_registration_id), inserts
+        ):
+            candidate_ids[registration_id] = candidate_id
+        adjust_candidate_counts({('Applied', 'Pending'): len(inserts)})
+        record_changes('candidate', list(candidate_ids.values()), 'insert')
+    if updates:
+        db.session.execute(update(Candidate), updates)
+        record_changes('candidate', [row['id'] for row in updates], 'update')
+        candidate_ids.update({row['indeed_registration_id']: row['id'] for row in updates})
+
+    if candidate_ids:
+        table = IndeedRecordHash.__table__
+        stmt = insert_for_dialect(table).values([{
+            'indeed_registration_id': registration_id,
+            'candidate_id': candidate_id,
+            'payload_hash': hashes[registration_id],
+            'synced_at': now
+        } for registration_id, candidate_id in candidate_ids.items()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.indeed_registration_id],
+            set_={
+                'candidate_id': stmt.excluded.candidate_id,
+                'payload_hash': stmt.excluded.payload_hash,
+                'synced_at': stmt.excluded.synced_at
+            }
+        )
+        db.session.execute(stmt)
+
+    return len(inserts), [row['id'] for row in updates], skipped, conflicts, invalid
+
+
+def _new_report():
+    return {'pages': 0, 'records': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'conflicts': 0, 'invalid': 0}
+
+
+def _stored_cursor():
+    return _sync_state().cursor
+
+
+def _commit_page(page, report):
+    """Apply one fetched page, advance the stored cursor and commit; adds the page's counts to report"""
+    created, updated_ids, skipped, conflicts, invalid = \
+        _apply_page(page.records, datetime.utcnow()) if page.records else (0, [], 0, 0, 0)
+    updated = len(updated_ids)
+
+    report['pages'] += 1
+    report['records'] += len(page.records)
+    report['created'] += created
+    report['updated'] += updated
+    report['skipped'] += skipped
+    report['conflicts'] += conflicts
+    report['invalid'] += invalid
+
+    # Commit per page so an interrupted run resumes after the last applied page.
+    if page.cursor is not None:
+        _sync_state().cursor = page.cursor
+    db.session.commit()
+    if created or updated:
+        invalidate('candidates', *[candidate_tag(candidate_id) for candidate_id in updated_ids])
+
+
+def _finish_run(report, started):
+    elapsed = time.perf_counter() - started
+    report['duration_seconds'] = round(elapsed, 4)
+    report['records_per_second'] = round(report['records'] / elapsed, 1) if elapsed > 0 else None
+
+    state = _sync_state()
+    report['cursor'] = state.cursor
+    state.last_run_at = datetime.utcnow()
+    state.last_run_stats = json.dumps(report)
+    db.session.commit()
+    # The status endpoint shows this run even when it changed no candidates.
+    invalidate(SYNC_STATUS_TAG)
+    return report
+
+
+def run_sync(client, full=False, page_size=SYNC_PAGE_SIZE, on_page=None):
+    """Pull the feed from the stored cursor (or from scratch when full) and apply it page by page.
+
+    on_page, if given, is called with the running totals after each committed page.
+    """
+    started = time.perf_counter()
+    since = None if full else _stored_cursor()
+    report = _new_report()
+
+    page_token = None
+    while True:
+        page = client.fetch_page(since=since, page_token=page_token, limit=page_size)
+        _commit_page(page, report)
+        if on_page is not None:
+            on_page(dict(report))
+
+        page_token = page.next_page_token
+        if not page_token:
+            break
+
+    return _finish_run(report, started)
+
+
+async def run_sync_async(client, run_blocking, full=False, page_size=SYNC_PAGE_SIZE):
+    """run_sync for an async feed client.
+
+    run_blocking(fn, *args) must run fn off the event loop with a database
+    session (e.g. in a thread inside an app context). The next page is
+    fetched while the current one is being written.
+    """
+    started = time.perf_counter()
+    since = None if full else await run_blocking(_stored_cursor)
+    report = _new_report()
+
+    page = await client.fetch_page(since=since, limit=page_size)
+    while True:
+        next_page = None
+        if page.next_page_token:
+            next_page = asyncio.ensure_future(
+                client.fetch_page(since=since, page_token=page.next_page_token, limit=page_size)
+            )
+        try:
+            await run_blocking(_commit_page, page, report)
+        except BaseException:
+            if next_page is not None:
+                next_page.cancel()
+            raise
+        if next_page is None:
+            break
+        page = await next_page
+
+    return await run_blocking(_finish_run, report, started)
+
+
+def last_run():
+    """Report from the most recent sync run, or None"""
+    state = db.session.get(IndeedSyncState, CANDIDATE_FEED)
+    if state is None or not state.last_run_stats:
+        return None
+    report = json.loads(state.last_run_stats)
+    report['finished_at'] = state.last_run_at.isoformat() if state.last_run_at else None
+    return report
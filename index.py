@@ -1,47 +1,137 @@
 import os
+import threading
 from flask import Flask, jsonify
-from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 load_dotenv()
 
-db = SQLAlchemy()
 cors = CORS()
 
-def create_app():
+# First path segment under /api -> (module, blueprint attribute, url_prefix)
+BLUEPRINTS = {
+    'admin': ('admin', 'admin_bp', '/api'),
+    'candidates': ('candidate', 'candidate_bp', '/api'),
+    'files': ('files', 'files_bp', '/api'),
+    'indeed': ('indeed', 'indeed_bp', '/api/indeed'),
+    'jobs': ('jobs', 'jobs_bp', '/api'),
+    'changes': ('changes', 'changes_bp', '/api'),
+    'stream': ('stream', 'stream_bp', '/api'),
+    'export': ('export', 'export_bp', '/api'),
+}
+
+# 'lazy' defers SQLAlchemy, models and each blueprint to the first request under its prefix.
+STARTUP_MODE = os.getenv('APP_STARTUP', 'lazy' if os.getenv('VERCEL') else 'eager')
+
+_db = None
+
+def get_db():
+    """The shared Flask-SQLAlchemy extension, created on first use"""
+    global _db
+    if _db is None:
+        from flask_sqlalchemy import SQLAlchemy
+        from db_engine import RoutingSession
+        _db = SQLAlchemy(session_options={'class_': RoutingSession})
+    return _db
+
+def __getattr__(name):
+    # Keeps `from index import db` working without importing SQLAlchemy at module load.
+    if name == 'db':
+        return get_db()
+    raise AttributeError(f"module 'index' has no attribute '{name}'")
+
+def health_check():
+    return jsonify({"ok": True})
+
+def create_app(blueprints=None):
+    """Build the app with the named BLUEPRINTS (all of them by default)"""
+    from importlib import import_module
+    from db_engine import configure_engines, install_engine_hooks
+    from request_metrics import install_request_metrics
+    from admission import install_admission
+    from json_provider import json_provider
+
+    db = get_db()
     app = Flask(__name__)
+    app.json = json_provider(app)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_engines(app)
 
     db.init_app(app)
+    install_engine_hooks(app, db)
+    install_request_metrics(app, db)
+    install_admission(app)
     cors.init_app(app, supports_credentials=True)
 
     # Import blueprints from modules in your repo root
-    from admin import admin_bp
-    from candidate import candidate_bp
-    from files import files_bp
-    from indeed import indeed_bp
+    for name in blueprints or BLUEPRINTS:
+        module, attribute, url_prefix = BLUEPRINTS[name]
+        app.register_blueprint(getattr(import_module(module), attribute), url_prefix=url_prefix)
 
-    app.register_blueprint(admin_bp, url_prefix='/api')
-    app.register_blueprint(candidate_bp, url_prefix='/api')
-    app.register_blueprint(files_bp, url_prefix='/api')
-    app.register_blueprint(indeed_bp, url_prefix='/api/indeed')
-
-    @app.get("/api/health")
-    def health_check():
-        return jsonify({"ok": True})
+    app.add_url_rule("/api/health", view_func=health_check, methods=["GET"])
 
     # TEMP: one‑time DB initialization
-    @app.post("/api/admin/init-db")
-    def init_db_once():
-        if os.getenv("ALLOW_INIT_DB") != "true":
-            return ("forbidden", 403)
-        with app.app_context():
-            db.create_all()
-        return jsonify({"ok": True})
+    if blueprints is None or 'admin' in blueprints:
+        @app.post("/api/admin/init-db")
+        def init_db_once():
+            if os.getenv("ALLOW_INIT_DB") != "true":
+                return ("forbidden", 403)
+            from candidate_search import ensure_search_index
+            from document_index import ensure_document_index
+            from candidate_import import ensure_email_index
+            from candidate import ensure_listing_index
+            from stats import recount_candidates
+            # create_all only sees models that have been imported.
+            for module, _, _ in BLUEPRINTS.values():
+                import_module(module)
+            with app.app_context():
+                db.create_all()
+                ensure_search_index()
+                ensure_document_index()
+                duplicates = ensure_email_index()
+                ensure_listing_index()
+                recount_candidates()
+            return jsonify({"ok": True, "duplicate_emails": duplicates})
 
     return app
 
-app = create_app()
+def create_health_app():
+    """Minimal app that answers /api/health and 404s everything else"""
+    app = Flask(__name__)
+    cors.init_app(app, supports_credentials=True)
+    app.add_url_rule("/api/health", view_func=health_check, methods=["GET"])
+    return app
+
+class LazyApp:
+    """WSGI app that builds one app per /api/<prefix> on the first request to it.
+
+    Each loaded prefix gets its own Flask app and engine. That suits the
+    serverless profile, where engines use NullPool and an instance rarely
+    serves more than a couple of prefixes.
+    """
+
+    def __init__(self, factory=create_app):
+        self.factory = factory
+        self.health_app = create_health_app()
+        self.apps = {}
+        self.lock = threading.Lock()
+
+    def get_application(self, prefix):
+        if prefix not in BLUEPRINTS:
+            return self.health_app
+        app = self.apps.get(prefix)
+        if app is None:
+            with self.lock:
+                app = self.apps.get(prefix)
+                if app is None:
+                    app = self.apps[prefix] = self.factory([prefix])
+        return app
+
+    def __call__(self, environ, start_response):
+        parts = environ.get('PATH_INFO', '').split('/')
+        prefix = parts[2] if len(parts) > 2 and parts[1] == 'api' else None
+        return self.get_application(prefix)(environ, start_response)
+
+app = LazyApp() if STARTUP_MODE == 'lazy' else create_app()
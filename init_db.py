@@ -5,13 +5,26 @@ This will create all SQLAlchemy tables defined across the application.
 """
 
 from index import create_app, db
+from candidate_search import ensure_search_index
+from document_index import ensure_document_index
+from candidate_import import ensure_email_index
+from candidate import ensure_listing_index
+from stats import recount_candidates
 
 
 def main() -> None:
     app = create_app()
     with app.app_context():
         db.create_all()
-        print("Database tables created successfully.")
+        ensure_search_index()
+        ensure_document_index()
+        duplicates = ensure_email_index()
+        ensure_listing_index()
+        recount_candidates()
+        print("Database tables and search indexes created successfully.")
+        if duplicates:
+            print("Unique email index not created; merge these duplicate candidates and rerun: "
+                  + ", ".join(duplicates))
 
 
 if __name__ == "__main__":
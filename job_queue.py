@@ -0,0 +1,181 @@
+"""Durable background jobs stored in the jobs table.
+
+Any module can register a handler with @job_handler('kind') and queue work
+with enqueue(). worker.py processes claim jobs one at a time. On Postgres a
+claim uses SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers never
+block on the same row. On SQLite, where writes are serialized anyway, the
+FOR UPDATE clause is dropped. Both rely on a conditional UPDATE to settle a
+race for the same job.
+
+Failed jobs are retried with exponential backoff until max_attempts is
+reached. A running job whose worker stops heartbeating (via progress reports)
+for JOB_LOCK_TIMEOUT seconds is handed to another worker. A dedup_key allows
+at most one queued or running job per key.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update, func
+from sqlalchemy.exc import IntegrityError
+from models.user import db
+from models.job import Job, ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_BACKOFF_SECONDS = float(os.getenv('JOB_BACKOFF_SECONDS', 30))
+JOB_BACKOFF_MAX = float(os.getenv('JOB_BACKOFF_MAX', 3600))
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', 900))
+CLAIM_RETRIES = 5
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register handler(payload, progress) for jobs of this kind; its return value is stored as the result"""
+    def decorator(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def active_job(dedup_key):
+    return Job.query.filter(Job.dedup_key == dedup_key, Job.status.in_(ACTIVE_STATUSES)).first()
+
+
+def enqueue(kind, payload=None, dedup_key=None, max_attempts=JOB_MAX_ATTEMPTS, delay=0):
+    """Queue a job in the caller's transaction; returns (job, created).
+
+    If dedup_key matches a queued or running job, that job is returned instead.
+    """
+    if dedup_key:
+        existing = active_job(dedup_key)
+        if existing is not None:
+            return existing, False
+
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload) if payload is not None else None,
+        dedup_key=dedup_key,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # Lost a race with another request queueing the same key.
+        return active_job(dedup_key), False
+    return job, True
+
+
+def _claimable(now):
+    return or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT))
+    )
+
+
+def claim(worker_id):
+    """Take the oldest runnable job for this worker, or None if there is nothing to do"""
+    for _ in range(CLAIM_RETRIES):
+        now = datetime.utcnow()
+        job_id = db.session.execute(
+            select(Job.id).where(_claimable(now)).order_by(Job.run_after, Job.id).limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if job_id is None:
+            db.session.commit()
+            return None
+
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, _claimable(now)).values(
+                status='running',
+                locked_by=worker_id,
+                locked_at=now,
+                started_at=func.coalesce(Job.started_at, now),
+                attempts=Job.attempts + 1
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def retry_delay(attempts):
+    delay = min(JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), JOB_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _progress_reporter(job_id, worker_id):
+    def report(progress):
+        # Also the heartbeat that keeps another worker from taking the job over.
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.locked_by == worker_id)
+            .values(progress=json.dumps(progress, default=str), locked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    return report
+
+
+def run_job(job, worker_id):
+    """Run a claimed job and record its outcome; returns the final status, or None if the job was taken over"""
+    job_id = job.id
+    attempts, max_attempts = job.attempts, job.max_attempts
+    handler = HANDLERS.get(job.kind)
+    payload = json.loads(job.payload) if job.payload else {}
+
+    if handler is None:
+        outcome, result, error = 'failed', None, f"No handler registered for '{job.kind}'"
+    elif attempts > max_attempts:
+        outcome, result, error = 'failed', None, 'Gave up after the worker running it stopped responding'
+    else:
+        try:
+            result = handler(payload, _progress_reporter(job_id, worker_id))
+            outcome, error = 'succeeded', None
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Job %s (%s) failed on attempt %s', job_id, job.kind, attempts)
+            outcome, result, error = 'failed', None, f'{type(e).__name__}: {e}'
+
+    now = datetime.utcnow()
+    values = {'error': error, 'locked_by': None, 'locked_at': None}
+    if outcome == 'failed' and handler is not None and attempts < max_attempts:
+        values.update(status='queued', run_after=now + timedelta(seconds=retry_delay(attempts)))
+    else:
+        values.update(status=outcome, finished_at=now,
+                      result=json.dumps(result, default=str) if result is not None else None)
+
+    # Only the worker still holding the lock may record an outcome; a stale one must not clobber the new owner.
+    recorded = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.locked_by == worker_id).values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not recorded:
+        logger.warning('Job %s was taken over by another worker; dropping this run\'s %s outcome', job_id, outcome)
+        return None
+    return values['status']
+
+
+def run_worker(worker_id, poll_interval=2.0, should_stop=lambda: False, burst=False):
+    """Claim and run jobs until should_stop() (or, with burst, until the queue is empty)"""
+    processed = 0
+    while not should_stop():
+        job = claim(worker_id)
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        logger.info('Worker %s running job %s (%s)', worker_id, job.id, job.kind)
+        run_job(job, worker_id)
+        processed += 1
+        db.session.remove()
+    return processed
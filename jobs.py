@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify
+from models.user import db
+from models.job import Job
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a background job's status, progress and result"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,67 @@
+"""JSON providers for API responses.
+
+Rows returned without going through to_dict() (e.g. column projections for
+?fields=) contain raw datetimes, so every provider here writes dates and
+datetimes as ISO 8601, the same format to_dict() uses. Flask's default would
+write them as HTTP dates instead.
+
+JSON_PROVIDER selects the implementation: 'orjson' (the default when orjson is
+installed) serializes in C and hands the response its bytes directly; 'json'
+uses the standard library.
+"""
+
+import decimal
+import os
+import uuid
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; fall back to the standard library
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, '_asdict'):  # SQLAlchemy Row
+        return obj._asdict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Standard library json with ISO 8601 dates and insertion-ordered keys"""
+
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson-backed provider; responses skip the str round trip"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+PROVIDERS = {'json': StdlibJSONProvider, 'orjson': OrjsonProvider}
+
+
+def json_provider(app, name=None):
+    """Build the provider named by JSON_PROVIDER for app"""
+    name = name or os.getenv('JSON_PROVIDER', 'orjson' if orjson else 'json')
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_PROVIDER '{name}' (expected one of {', '.join(PROVIDERS)})")
+    if name == 'orjson' and orjson is None:
+        raise ValueError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+    return PROVIDERS[name](app)
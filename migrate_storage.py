@@ -0,0 +1,44 @@
+"""Move uploads into the sharded blob store and rebuild storage usage.
+
+Files uploaded before the blob store existed still sit in the legacy
+UPLOAD_FOLDER/<entity_type>/<category>/ tree. This moves each one into the
+configured backend and then removes the emptied directories. A file is only
+unlinked after its catalog entry has been committed. Run
+reconcile_files.py first if files were added outside the API.
+
+    python migrate_storage.py                 # legacy tree -> STORAGE_BACKEND
+    python migrate_storage.py --copy-to s3    # also copy local blobs to S3, before switching STORAGE_BACKEND
+"""
+
+import argparse
+import os
+from index import create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copy-to', choices=['local', 's3'], help='copy every stored blob into this backend')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        from files import UPLOAD_FOLDER, blob_store
+        from blob_store import BLOB_DIR
+        from storage_backends import backend_from_env
+        from file_catalog import migrate_legacy_files, copy_blobs, recount_storage_usage
+
+        result = migrate_legacy_files(UPLOAD_FOLDER, blob_store)
+        print(f"Moved {result['moved']} legacy files into the blob store "
+              f"({result['missing']} catalogued files were missing on disk).")
+
+        if args.copy_to:
+            target = backend_from_env(args.copy_to, os.path.join(UPLOAD_FOLDER, BLOB_DIR))
+            copied = copy_blobs(blob_store.backend, target, blob_store.staging_folder)
+            print(f"Copied {copied} blobs to the {args.copy_to} backend.")
+
+        usage = recount_storage_usage()
+        print(f"Storage usage rebuilt for {len(usage)} entities.")
+
+
+if __name__ == "__main__":
+    main()
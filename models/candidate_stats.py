@@ -0,0 +1,17 @@
+from models.user import db
+
+
+class CandidateStatusCount(db.Model):
+    """Running count of candidates per (pipeline_status, admin_approval) pair"""
+    __tablename__ = 'candidate_status_counts'
+
+    pipeline_status = db.Column(db.String(50), primary_key=True)
+    admin_approval = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'pipeline_status': self.pipeline_status,
+            'admin_approval': self.admin_approval,
+            'count': self.count
+        }
@@ -0,0 +1,30 @@
+from datetime import datetime
+from models.user import db
+
+# SQLite only autoincrements INTEGER primary keys.
+ChangeId = db.BigInteger().with_variant(db.Integer, 'sqlite')
+
+
+class ChangeLogEntry(db.Model):
+    """One insert/update/delete of a tracked row; the id doubles as the feed cursor"""
+    __tablename__ = 'change_log'
+
+    id = db.Column(ChangeId, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_change_log_entity', 'entity', 'entity_id'),
+        # Without AUTOINCREMENT SQLite reuses ids once the log is emptied, landing new entries below the horizon.
+        {'sqlite_autoincrement': True},
+    )
+
+
+class ChangeLogHorizon(db.Model):
+    """Highest change id removed by age-based compaction; older cursors must resync"""
+    __tablename__ = 'change_log_horizon'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pruned_through = db.Column(ChangeId, nullable=False, default=0)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from models.user import db
+
+
+class DocumentText(db.Model):
+    """Text extracted from a stored file body, shared by every catalog entry with that sha256"""
+    __tablename__ = 'document_texts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    content = db.Column(db.Text, nullable=False, default='')
+    char_count = db.Column(db.Integer, nullable=False, default=0)
+    extractor = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    extracted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'status': self.status,
+            'char_count': self.char_count,
+            'extractor': self.extractor,
+            'error': self.error,
+            'extracted_at': self.extracted_at.isoformat() if self.extracted_at else None
+        }
@@ -0,0 +1,12 @@
+from datetime import datetime
+from models.user import db
+
+
+class FileBlob(db.Model):
+    """A stored file body, keyed by its SHA-256 and shared by every catalog entry with that content"""
+    __tablename__ = 'file_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
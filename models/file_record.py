@@ -0,0 +1,34 @@
+from datetime import datetime
+from models.user import db
+
+
+class FileRecord(db.Model):
+    """Catalog entry for a file stored under UPLOAD_FOLDER"""
+    __tablename__ = 'file_records'
+    __table_args__ = (
+        db.Index('ix_file_records_entity_person', 'entity_type', 'person_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(512), unique=True, nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    entity_type = db.Column(db.String(50), index=True)
+    person_id = db.Column(db.String(50), index=True)
+    category = db.Column(db.String(100), index=True)
+    sha256 = db.Column(db.String(64), index=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    modified_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'path': self.path,
+            'size': self.size,
+            'sha256': self.sha256,
+            'modified': self.modified_at.isoformat() if self.modified_at else None,
+            'entity_type': self.entity_type,
+            'person_id': self.person_id,
+            'category': self.category
+        }
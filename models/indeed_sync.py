@@ -0,0 +1,29 @@
+from models.user import db
+
+
+class IndeedSyncState(db.Model):
+    """High-water mark and last-run report for an Indeed feed"""
+    __tablename__ = 'indeed_sync_state'
+
+    feed = db.Column(db.String(50), primary_key=True)
+    cursor = db.Column(db.String(255))
+    last_run_at = db.Column(db.DateTime)
+    last_run_stats = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'feed': self.feed,
+            'cursor': self.cursor,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_run_stats': self.last_run_stats
+        }
+
+
+class IndeedRecordHash(db.Model):
+    """Hash of the last feed payload applied for each Indeed registration"""
+    __tablename__ = 'indeed_record_hashes'
+
+    indeed_registration_id = db.Column(db.String(100), primary_key=True)
+    candidate_id = db.Column(db.Integer, index=True)
+    payload_hash = db.Column(db.String(64), nullable=False)
+    synced_at = db.Column(db.DateTime)
@@ -0,0 +1,54 @@
+import json
+from datetime import datetime
+from models.user import db
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class Job(db.Model):
+    """Unit of background work claimed and run by worker.py"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(100), nullable=False, index=True)
+    payload = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    dedup_key = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    progress = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Workers poll for the oldest runnable job.
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+        # At most one queued or running job per dedup key.
+        db.Index('uq_jobs_active_dedup_key', 'dedup_key', unique=True,
+                 postgresql_where=db.text("status IN ('queued', 'running')"),
+                 sqlite_where=db.text("status IN ('queued', 'running')")),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'dedup_key': self.dedup_key,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'payload': json.loads(self.payload) if self.payload else None,
+            'progress': json.loads(self.progress) if self.progress else None,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
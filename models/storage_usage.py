@@ -0,0 +1,19 @@
+from models.user import db
+
+
+class StorageUsage(db.Model):
+    """Running file count and bytes per (entity_type, person_id); NULLs are stored as ''"""
+    __tablename__ = 'storage_usage'
+
+    entity_type = db.Column(db.String(50), primary_key=True)
+    person_id = db.Column(db.String(50), primary_key=True)
+    file_count = db.Column(db.Integer, nullable=False, default=0)
+    total_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'entity_type': self.entity_type,
+            'person_id': self.person_id,
+            'file_count': self.file_count,
+            'total_bytes': self.total_bytes
+        }
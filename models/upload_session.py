@@ -0,0 +1,16 @@
+from datetime import datetime
+from models.user import db
+
+
+class UploadSession(db.Model):
+    """An in-progress resumable upload; bytes received so far live in the staging folder"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    entity_type = db.Column(db.String(50))
+    person_id = db.Column(db.String(50))
+    category = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,104 @@
+"""Password hashing off the request thread.
+
+werkzeug's default scrypt is deliberately expensive in CPU and memory, so
+hashes are computed in a small process pool rather than on request threads.
+The pool is created on first use and bounded twice: PASSWORD_HASH_WORKERS
+processes, and at most PASSWORD_HASH_MAX_PENDING hashes in flight. A caller
+that cannot get a slot within PASSWORD_HASH_WAIT seconds gets HashingBusy
+instead of queueing without bound.
+
+PASSWORD_HASH_METHOD is passed to generate_password_hash, e.g. 'scrypt' or
+'pbkdf2:sha256:600000'. Setting PASSWORD_HASH_WORKERS=0 hashes inline. That
+is also the fallback wherever a process pool cannot be started (e.g. AWS
+Lambda, which has no POSIX semaphores).
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+PASSWORD_HASH_WAIT = float(os.getenv('PASSWORD_HASH_WAIT', 5))
+
+
+class HashingBusy(RuntimeError):
+    """Raised when too many hashes are already in flight"""
+
+
+class PasswordHasher:
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, wait=PASSWORD_HASH_WAIT):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait = wait
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.pool = None
+
+    def _get_pool(self):
+        if self.workers <= 0:
+            return None
+        with self.lock:
+            if self.pool is None:
+                try:
+                    # spawn: forking a threaded server process is unsafe.
+                    self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+                except (OSError, NotImplementedError) as e:
+                    logger.warning('Password hashing pool unavailable (%s); hashing inline', e)
+                    self.workers = 0
+                    return None
+                atexit.register(self.pool.shutdown, wait=False)
+            return self.pool
+
+    def _acquire(self, count):
+        acquired = 0
+        for _ in range(count):
+            if not self.slots.acquire(timeout=self.wait):
+                for _ in range(acquired):
+                    self.slots.release()
+                raise HashingBusy('Password hashing is saturated; retry shortly')
+            acquired += 1
+
+    def hash_many(self, passwords):
+        """Hash passwords in parallel, preserving order"""
+        passwords = list(passwords)
+        # Take slots a chunk at a time so one bulk call cannot hold every slot.
+        chunk_size = max(1, self.max_pending // 4)
+        hashes = []
+        for start in range(0, len(passwords), chunk_size):
+            chunk = passwords[start:start + chunk_size]
+            self._acquire(len(chunk))
+            try:
+                pool = self._get_pool()
+                if pool is None:
+                    hashes.extend(generate_password_hash(password, self.method) for password in chunk)
+                else:
+                    futures = [pool.submit(generate_password_hash, password, self.method) for password in chunk]
+                    hashes.extend(future.result() for future in futures)
+            finally:
+                for _ in chunk:
+                    self.slots.release()
+        return hashes
+
+    def hash(self, password):
+        return self.hash_many([password])[0]
+
+
+hasher = PasswordHasher()
+
+
+def hash_password(password):
+    return hasher.hash(password)
+
+
+def hash_passwords(passwords):
+    return hasher.hash_many(passwords)
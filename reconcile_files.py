@@ -0,0 +1,30 @@
+"""Rescan UPLOAD_FOLDER and repair the file catalog.
+
+Run this after files have been copied into or removed from the upload tree
+outside the API, or after first deploying the catalog, so that GET /api/files
+reflects what is on disk. It also abandons stale resumable uploads and removes
+blobs that no catalog entry references any more, once they are older than
+ORPHAN_BLOB_GRACE seconds (an hour by default).
+"""
+
+from datetime import timedelta
+from index import create_app
+
+
+def main() -> None:
+    app = create_app()
+    with app.app_context():
+        from files import UPLOAD_FOLDER, UPLOAD_SESSION_TTL_HOURS, blob_store
+        from file_catalog import reconcile, purge_stale_uploads, collect_orphan_blobs
+
+        result = reconcile(UPLOAD_FOLDER)
+        print(f"File catalog reconciled: {result['added']} added, "
+              f"{result['updated']} updated, {result['removed']} removed.")
+
+        purged = purge_stale_uploads(blob_store.staging_folder, timedelta(hours=UPLOAD_SESSION_TTL_HOURS))
+        orphans = collect_orphan_blobs(blob_store)
+        print(f"Purged {purged} stale uploads and {orphans} orphaned blobs.")
+
+
+if __name__ == "__main__":
+    main()
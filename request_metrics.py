@@ -0,0 +1,229 @@
+"""Per-request SQL instrumentation and Prometheus metrics.
+
+Engine hooks time every statement a request sends. Each response then
+carries a Server-Timing header with the DB time, query count and total time.
+A warning is logged when one statement shape repeats past
+N_PLUS_ONE_THRESHOLD within a request (the usual N+1 signature), and again
+when a request spends more than SLOW_REQUEST_MS in the database, listing its
+slowest statements.
+
+Per-route histograms of request duration, DB time and query count are kept
+in-process and rendered in the Prometheus text format by render_metrics(),
+served at /api/admin/metrics, along with admission control decisions
+(admitted, rate limited or shed) and in-flight requests per route class.
+Each worker process reports its own numbers.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 10))
+SLOW_REQUEST_MS = float(os.getenv('SQL_SLOW_REQUEST_MS', 500))
+SLOWEST_KEPT = 3
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Statement text with whitespace and expanded IN lists collapsed"""
+    return _PLACEHOLDER_LIST.sub('(...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestQueries:
+    """SQL activity of the current request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self.slowest = []
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        if len(self.slowest) < SLOWEST_KEPT or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, shape))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return [(shape, count) for shape, count in self.shapes.items() if count > threshold]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Per-(method, route) histograms plus response counts by status"""
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Time spent handling the request', DURATION_BUCKETS),
+        'http_request_db_seconds': ('Time spent in SQL statements per request', DURATION_BUCKETS),
+        'http_request_db_queries': ('SQL statements issued per request', QUERY_BUCKETS),
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in self.HISTOGRAMS}
+        self.responses = {}
+        self.n_plus_one = {}
+        self.admissions = {}
+        self.in_flight = {}
+
+    def observe_admission(self, route_class, method, route, decision):
+        key = (route_class, method, route, decision)
+        with self.lock:
+            self.admissions[key] = self.admissions.get(key, 0) + 1
+
+    def set_in_flight(self, route_class, value):
+        with self.lock:
+            self.in_flight[route_class] = value
+
+    def observe(self, method, route, status, duration, queries):
+        labels = (method, route)
+        values = {
+            'http_request_duration_seconds': duration,
+            'http_request_db_seconds': queries.seconds,
+            'http_request_db_queries': queries.count,
+        }
+        with self.lock:
+            for name, value in values.items():
+                series = self.histograms[name]
+                if labels not in series:
+                    series[labels] = Histogram(self.HISTOGRAMS[name][1])
+                series[labels].observe(value)
+            key = labels + (str(status),)
+            self.responses[key] = self.responses.get(key, 0) + 1
+            if queries.repeated():
+                self.n_plus_one[labels] = self.n_plus_one.get(labels, 0) + 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (method, route), histogram in sorted(self.histograms[name].items()):
+                    labels = f'method="{method}",route="{_escape(route)}"'
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.total}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.total}')
+
+            lines.append('# HELP http_responses_total Responses sent, by status code')
+            lines.append('# TYPE http_responses_total counter')
+            for (method, route, status), count in sorted(self.responses.items()):
+                lines.append(f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+            lines.append('# HELP sql_n_plus_one_requests_total Requests that repeated one statement shape past the threshold')
+            lines.append('# TYPE sql_n_plus_one_requests_total counter')
+            for (method, route), count in sorted(self.n_plus_one.items()):
+                lines.append(f'sql_n_plus_one_requests_total{{method="{method}",route="{_escape(route)}"}} {count}')
+
+            lines.append('# HELP admission_decisions_total Admission control decisions, by route class and outcome')
+            lines.append('# TYPE admission_decisions_total counter')
+            for (route_class, method, route, decision), count in sorted(self.admissions.items()):
+                lines.append(f'admission_decisions_total{{route_class="{route_class}",method="{method}",'
+                             f'route="{_escape(route)}",decision="{decision}"}} {count}')
+
+            lines.append('# HELP admission_in_flight Requests currently holding a slot, by route class')
+            lines.append('# TYPE admission_in_flight gauge')
+            for route_class, value in sorted(self.in_flight.items()):
+                lines.append(f'admission_in_flight{{route_class="{route_class}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+def render_metrics():
+    return registry.render()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(context):
+    # after_cursor_execute never fires for a failed statement, so its start time is popped here.
+    conn = context.connection
+    if conn is None or context.statement is None or not conn.info.get('query_started'):
+        return
+    started = conn.info['query_started'].pop()
+    if has_request_context() and 'sql_queries' in g:
+        g.sql_queries.record(context.statement, time.perf_counter() - started)
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_queries = RequestQueries()
+
+
+def _finish_request(response):
+    if 'request_started' not in g:
+        return response
+    duration = time.perf_counter() - g.request_started
+    queries = g.sql_queries
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+    response.headers.add('Server-Timing', f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries"')
+    response.headers.add('Server-Timing', f'total;dur={duration * 1000:.2f}')
+
+    for shape, count in queries.repeated():
+        logger.warning('Possible N+1 in %s %s: %d executions of %s', request.method, route, count, shape[:300])
+    if queries.seconds * 1000 > SLOW_REQUEST_MS:
+        logger.warning('Slow DB time in %s %s: %.1f ms over %d queries; slowest: %s',
+                       request.method, route, queries.seconds * 1000, queries.count,
+                       '; '.join(f'{seconds * 1000:.1f} ms {shape[:200]}' for seconds, shape in queries.slowest))
+
+    registry.observe(request.method, route, response.status_code, duration, queries)
+    return response
+
+
+def install_request_metrics(app, db):
+    """Hook statement timing into the app's engines and timing into its request lifecycle"""
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+                event.listen(engine, 'handle_error', _handle_error)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,250 @@
+"""Response cache for read endpoints.
+
+Cached views are keyed on their path plus normalized query args, and on the
+current version of each tag they depend on ('candidates', 'candidate:<id>',
+'users', 'employees', 'indeed_sync'). Write handlers call invalidate() with the tags they
+touched, which bumps those versions so only the affected entries stop
+matching; nothing is flushed wholesale. Models written from outside these
+handlers are registered with invalidate_on_write() instead. Every entry carries an ETag, so a client revalidating an
+unchanged entry gets a 304.
+
+The default backend is an in-process LRU bounded by TTL, entry count and
+bytes. With several workers, install a shared backend implementing
+CacheBackend (e.g. over Redis) via configure() so invalidations reach every
+process.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response, Response
+from sqlalchemy import event
+from db_engine import RoutingSession
+
+DEFAULT_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+BYPASS_ARGS = ('fresh', 'stream')
+
+
+class CacheBackend(ABC):
+    """Storage interface for cached responses and tag versions"""
+
+    @abstractmethod
+    def get(self, key):
+        """Cached value for key, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key, value, ttl, size):
+        """Store value under key for ttl seconds; size is its approximate byte count"""
+
+    @abstractmethod
+    def tag_versions(self, tags):
+        """Current version of each tag, as a list in the same order"""
+
+    @abstractmethod
+    def bump_tags(self, tags):
+        """Advance each tag's version, so entries cached under the old one stop matching"""
+
+    def stats(self):
+        return {}
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe LRU with per-entry TTL and entry/byte limits"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            value, expires, size = item
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, size):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic() + ttl, size)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def tag_versions(self, tags):
+        with self.lock:
+            return [self.versions.get(tag, 0) for tag in tags]
+
+    def bump_tags(self, tags):
+        with self.lock:
+            for tag in tags:
+                self.versions[tag] = self.versions.get(tag, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions
+            }
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'bypassed': 0, 'invalidations': 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def key(self, tags):
+        args = sorted(
+            (name, value)
+            for name in request.args
+            for value in request.args.getlist(name)
+            if value != ''
+        )
+        query = '&'.join(f'{name}={value}' for name, value in args)
+        versions = ','.join(f'{tag}@{version}' for tag, version in zip(tags, self.backend.tag_versions(tags)))
+        return f'{request.path}?{query}|{versions}'
+
+    def invalidate(self, *tags):
+        if tags:
+            self.backend.bump_tags(tags)
+            self.count('invalidations')
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else None
+        counters['ttl'] = self.ttl
+        counters['backend'] = self.backend.stats()
+        return counters
+
+
+cache = ResponseCache(MemoryBackend())
+
+
+def configure(backend, ttl=DEFAULT_TTL):
+    """Swap in a different backend, e.g. a shared one for multi-worker deployments"""
+    global cache
+    cache = ResponseCache(backend, ttl)
+
+
+def invalidate(*tags):
+    cache.invalidate(*tags)
+
+
+def cache_stats():
+    return cache.stats()
+
+
+PENDING_TAGS_KEY = 'pending_cache_tags'
+_write_tags = {}
+
+
+def invalidate_on_write(model, *tags):
+    """Invalidate tags whenever a transaction that wrote model rows through the ORM commits"""
+    _write_tags.setdefault(model, set()).update(tags)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_write_tags(session, flush_context):
+    if not _write_tags:
+        return
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tags = _write_tags.get(type(obj))
+        if tags:
+            session.info.setdefault(PENDING_TAGS_KEY, set()).update(tags)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_written(session):
+    tags = session.info.pop(PENDING_TAGS_KEY, None)
+    if tags:
+        invalidate(*tags)
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _drop_write_tags(session):
+    session.info.pop(PENDING_TAGS_KEY, None)
+
+
+def candidate_tag(candidate_id):
+    return f'candidate:{candidate_id}'
+
+
+def _conditional(response):
+    if request.if_none_match and request.if_none_match.contains(response.get_etag()[0]):
+        cache.count('not_modified')
+        return Response(status=304, headers={'ETag': response.headers['ETag'], 'X-Cache': response.headers['X-Cache']})
+    return response
+
+
+def cached(*tags, ttl=None):
+    """Cache a GET view's successful JSON responses under the given tags.
+
+    A tag may be a string or a callable that receives the view's URL kwargs,
+    e.g. ``cached(lambda candidate_id: candidate_tag(candidate_id))``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or any(request.args.get(name) for name in BYPASS_ARGS):
+                cache.count('bypassed')
+                return view(*args, **kwargs)
+
+            resolved = [tag(**kwargs) if callable(tag) else tag for tag in tags]
+            key = cache.key(resolved)
+            entry = cache.backend.get(key)
+            if entry is not None:
+                cache.count('hits')
+                body, status, mimetype, etag = entry
+                response = Response(body, status=status, mimetype=mimetype)
+                response.set_etag(etag)
+                response.headers['X-Cache'] = 'HIT'
+                return _conditional(response)
+
+            cache.count('misses')
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            cache.backend.set(key, (body, response.status_code, response.mimetype, etag),
+                              ttl or cache.ttl, len(body))
+            response.set_etag(etag)
+            response.headers['X-Cache'] = 'MISS'
+            return _conditional(response)
+        return wrapper
+    return decorator
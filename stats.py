@@ -0,0 +1,160 @@
+"""Maintained candidate counters backing the stats endpoints.
+
+Every candidate write path reports the (pipeline_status, admin_approval) pair
+it moved a candidate out of and into, so the stats endpoints can read a handful
+of summary rows instead of counting the candidates table on every load.
+Rebuilding the counters (recount_candidates) is a write that only runs from
+init_db.py or the stats.recount job, never from a GET.
+"""
+
+from sqlalchemy import func, text
+from models.user import db
+from models.candidate import Candidate
+from models.candidate_stats import CandidateStatusCount
+from db_helpers import insert_for_dialect, dialect_name
+from db_engine import pin_primary
+from job_queue import job_handler
+
+RECOUNT_JOB = 'stats.recount'
+
+
+def candidate_key(candidate):
+    """Summary-table key for a candidate; NULL statuses are stored as ''"""
+    return (candidate.pipeline_status or '', candidate.admin_approval or '')
+
+
+def adjust_candidate_counts(deltas):
+    """Apply {(pipeline_status, admin_approval): delta} to the summary table.
+
+    Runs in the caller's transaction, so the counters commit or roll back with
+    the candidate rows they describe.
+    """
+    table = CandidateStatusCount.__table__
+    for (pipeline_status, admin_approval), delta in deltas.items():
+        if not delta:
+            continue
+        stmt = insert_for_dialect(table).values(
+            pipeline_status=pipeline_status,
+            admin_approval=admin_approval,
+            count=delta
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.pipeline_status, table.c.admin_approval],
+            set_={'count': table.c.count + stmt.excluded.count}
+        )
+        db.session.execute(stmt)
+
+
+def track_candidate(before, after):
+    """Move one candidate between summary keys; pass None for create/delete"""
+    if before == after:
+        return
+    deltas = {}
+    if before is not None:
+        deltas[before] = deltas.get(before, 0) - 1
+    if after is not None:
+        deltas[after] = deltas.get(after, 0) + 1
+    adjust_candidate_counts(deltas)
+
+
+def count_candidates():
+    """{(pipeline_status, admin_approval): count} from a single GROUP BY over candidates, without writing"""
+    rows = db.session.query(
+        func.coalesce(Candidate.pipeline_status, ''),
+        func.coalesce(Candidate.admin_approval, ''),
+        func.count(Candidate.id)
+    ).group_by(Candidate.pipeline_status, Candidate.admin_approval).all()
+
+    counts = {}
+    for pipeline_status, admin_approval, count in rows:
+        key = (pipeline_status, admin_approval)
+        counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def recount_candidates():
+    """Rebuild the summary table from count_candidates() and commit"""
+    # A lagging replica would write stale counts back, so always count on the primary.
+    pin_primary(db.session)
+    table = CandidateStatusCount.__table__
+    # Hold the write lock before counting (on SQLite the DELETE takes it): a concurrent
+    # adjust_candidate_counts either committed first and is counted, or waits and applies on top.
+    if dialect_name() == 'postgresql':
+        db.session.execute(text(f'LOCK TABLE {table.name} IN EXCLUSIVE MODE'))
+    db.session.execute(table.delete())
+    counts = count_candidates()
+
+    db.session.add_all([
+        CandidateStatusCount(pipeline_status=key[0], admin_approval=key[1], count=count)
+        for key, count in counts.items()
+    ])
+    db.session.commit()
+    return counts
+
+
+@job_handler(RECOUNT_JOB)
+def recount_candidates_job(payload, progress):
+    return {f'{key[0]}/{key[1]}': count for key, count in recount_candidates().items()}
+
+
+def candidate_counts(fresh=False):
+    """Return {(pipeline_status, admin_approval): count} from the counters; fresh counts the candidates instead.
+
+    No counter rows means no candidates, not counters that were never built.
+    """
+    if fresh:
+        return count_candidates()
+    return {(row.pipeline_status, row.admin_approval): row.count for row in CandidateStatusCount.query.all()}
+
+
+def pipeline_summary(counts):
+    """Fold summary rows into the totals the dashboards display"""
+    by_status = {}
+    by_approval = {}
+    for (pipeline_status, admin_approval), count in counts.items():
+        by_status[pipeline_status] = by_status.get(pipeline_status, 0) + count
+        by_approval[admin_approval] = by_approval.get(admin_approval, 0) + count
+
+    return {
+        'total': sum(counts.values()),
+        'applied': by_status.get('Applied', 0),
+        'interviewing': by_status.get('Interviewing', 0),
+        'offered': by_status.get('Offered', 0),
+        'approved': by_approval.get('Approved', 0),
+        'denied': by_approval.get('Denied', 0),
+        'pending': by_approval.get('Pending', 0)
+    }
+
+
+def database_stats(counts):
+    """Totals for the admin database stats panel, given candidate_counts()"""
+    from models.employee import Employee
+    from models.auth import AdminUser
+
+    pipeline = pipeline_summary(counts)
+
+    # Employees and users have no counters, so count both in one round trip.
+    totals = db.session.query(
+        db.session.query(func.count(Employee.id)).scalar_subquery(),
+        db.session.query(func.count(AdminUser.id)).scalar_subquery(),
+        db.session.query(func.count(AdminUser.id)).filter_by(is_active=True).scalar_subquery()
+    ).one()
+
+    return {
+        'total_candidates': pipeline['total'],
+        'total_employees': totals[0],
+        'total_users': totals[1],
+        'active_users': totals[2],
+        'candidate_pipeline_stats': {
+            'applied': pipeline['applied'],
+            'interviewing': pipeline['interviewing'],
+            'offered': pipeline['offered'],
+            'approved': pipeline['approved'],
+            'pending': pipeline['pending'],
+            'denied': pipeline['denied']
+        }
+    }
+
+
+def is_fresh_requested(args):
+    return args.get('fresh', '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,137 @@
+"""Shared stats snapshot fanned out to GET /api/stream/stats subscribers.
+
+Each process runs one broadcaster thread per app, and only while someone is
+subscribed. Every STATS_STREAM_POLL seconds it reads a version made of the
+change log head and the employee count. The count also catches employee
+writes made outside the ORM, which the change log does not see. Both reads
+are cheap. Only when the version has moved does it rerun
+the aggregate queries and encode the result. Every subscriber then gets
+that same encoded event. DB load therefore depends on the write rate, not
+the subscriber count. The version is the SSE event id, so a client
+reconnecting with Last-Event-ID is sent a snapshot only if it has missed
+a change.
+
+Subscribers block on a threading.Condition. Under gunicorn's gthread
+workers each stream holds one thread, so size --threads for the expected
+number of dashboards. Under gevent workers the monkey-patched Condition and
+thread turn into greenlets (psycopg2 additionally needs psycogreen).
+"""
+
+import logging
+import os
+import threading
+import time
+from flask import json
+from sqlalchemy import func
+from models.user import db
+from change_feed import head_cursor
+from stats import candidate_counts, pipeline_summary, database_stats
+
+logger = logging.getLogger(__name__)
+
+STATS_STREAM_POLL = float(os.getenv('STATS_STREAM_POLL', 1))
+STATS_STREAM_HEARTBEAT = float(os.getenv('STATS_STREAM_HEARTBEAT', 15))
+# Streams end after this long so worker threads recycle; clients reconnect with Last-Event-ID.
+STATS_STREAM_MAX_SECONDS = float(os.getenv('STATS_STREAM_MAX_SECONDS', 300))
+STATS_STREAM_MAX_SUBSCRIBERS = int(os.getenv('STATS_STREAM_MAX_SUBSCRIBERS', 200))
+STATS_STREAM_RETRY_MS = 3000
+
+
+class StreamFull(RuntimeError):
+    """Raised when a process already serves STATS_STREAM_MAX_SUBSCRIBERS streams"""
+
+
+def stats_version():
+    """Changes whenever compute_stats() could: the change log head plus the employee count"""
+    from models.employee import Employee
+
+    return f'{head_cursor()}-{db.session.query(func.count(Employee.id)).scalar()}'
+
+
+def compute_stats():
+    """Dashboard and admin aggregates in one payload"""
+    counts = candidate_counts()
+    return {'pipeline': pipeline_summary(counts), 'database': database_stats(counts)}
+
+
+class StatsBroadcaster:
+    def __init__(self, app, poll_interval=STATS_STREAM_POLL, max_subscribers=STATS_STREAM_MAX_SUBSCRIBERS):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.max_subscribers = max_subscribers
+        self.condition = threading.Condition()
+        self.subscribers = 0
+        self.version = None
+        self.event = None
+        self.polls = 0
+        self.refreshes = 0
+        self.thread = None
+
+    def _refresh(self):
+        with self.app.app_context():
+            version = stats_version()
+            self.polls += 1
+            if version == self.version:
+                return
+            # Encoded once here and shared by every subscriber.
+            event = f'id: {version}\nevent: stats\ndata: {json.dumps(compute_stats())}\n\n'
+        with self.condition:
+            self.version = version
+            self.event = event
+            self.refreshes += 1
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.subscribers > 0)
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception('Stats stream refresh failed')
+            time.sleep(self.poll_interval)
+
+    def subscribe(self):
+        with self.condition:
+            if self.subscribers >= self.max_subscribers:
+                raise StreamFull('Too many stats streams on this worker; retry shortly')
+            self.subscribers += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='stats-stream', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def unsubscribe(self):
+        with self.condition:
+            self.subscribers -= 1
+
+    def wait(self, seen, timeout):
+        """Block until there is a snapshot other than seen; returns (version, event) or (None, None) on timeout"""
+        with self.condition:
+            if self.condition.wait_for(lambda: self.version is not None and self.version != seen, timeout):
+                return self.version, self.event
+        return None, None
+
+    def events(self, last_event_id=None, heartbeat=STATS_STREAM_HEARTBEAT, max_seconds=STATS_STREAM_MAX_SECONDS):
+        """SSE chunks for one subscriber, who must already hold a subscribe() slot"""
+        yield f'retry: {STATS_STREAM_RETRY_MS}\n\n'
+        seen = last_event_id
+        deadline = time.monotonic() + max_seconds
+        while time.monotonic() < deadline:
+            version, event = self.wait(seen, min(heartbeat, max(0, deadline - time.monotonic())))
+            if version is None:
+                yield ': heartbeat\n\n'
+                continue
+            seen = version
+            yield event
+
+
+_lock = threading.Lock()
+
+
+def broadcaster(app):
+    """The app's broadcaster, created on first use"""
+    with _lock:
+        if 'stats_stream' not in app.extensions:
+            app.extensions['stats_stream'] = StatsBroadcaster(app)
+        return app.extensions['stats_stream']
@@ -0,0 +1,290 @@
+"""Where blob bodies are kept: the local disk or an S3-compatible bucket.
+
+BlobStore stages, hashes and reference-counts uploads. A backend only
+stores finished bodies under keys of the form <aa>/<bb>/<sha256>. Two-level
+hex sharding caps any one directory at 256 entries however many files there
+are. The content hash as the name means two uploads can never collide.
+
+STORAGE_BACKEND picks the backend:
+
+- 'local' (the default) keeps blobs under UPLOAD_FOLDER/.blobs. Writes are
+  atomic: the body is finished in a temp file on the same filesystem and
+  then renamed into place.
+- 's3' talks to any S3-compatible service (AWS, MinIO, R2, ...), configured
+  by S3_ENDPOINT_URL, S3_BUCKET, S3_REGION, S3_ACCESS_KEY_ID,
+  S3_SECRET_ACCESS_KEY and an optional S3_PREFIX. Requests are signed with
+  SigV4 over the shared requests stack, so no AWS SDK is needed.
+  Downloads are redirected to short-lived presigned URLs. fake_s3.py is a
+  local stand-in for development and bench_storage.py.
+"""
+
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CHUNK_SIZE = 1024 * 1024
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+S3_TIMEOUT = 60
+S3_XML_NS = '{http://s3.amazonaws.com/doc/2006-03-01/}'
+PRESIGNED_URL_TTL = int(os.getenv('S3_PRESIGNED_URL_TTL', 300))
+
+
+class StorageError(RuntimeError):
+    """Raised when a backend cannot complete an operation"""
+
+
+def blob_key(sha256):
+    return f'{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+class StorageBackend(ABC):
+    """Storage interface for blob bodies, addressed by blob_key()"""
+
+    @abstractmethod
+    def exists(self, key):
+        """True if a blob is stored under key"""
+
+    @abstractmethod
+    def put(self, path, key, sha256):
+        """Store the local file at path under key, consuming the file"""
+
+    @abstractmethod
+    def download(self, key, path):
+        """Copy a blob to a local file; returns False if it does not exist"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove the blob under key; deleting a missing key is not an error"""
+
+    @abstractmethod
+    def keys(self, older_than=None):
+        """Iterate over every stored key, or only those last written before older_than (a UTC datetime)"""
+
+    def local_path(self, key):
+        """Filesystem path of a blob, or None for remote backends"""
+        return None
+
+    def download_url(self, key, filename, as_attachment=False):
+        """URL clients can fetch the blob from directly, or None to serve it through the app"""
+        return None
+
+
+class LocalBackend(StorageBackend):
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def put(self, path, key, sha256):
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            # Different filesystem: finish a temp file beside the target, then rename it over.
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as out, open(path, 'rb') as source:
+                    shutil.copyfileobj(source, out, CHUNK_SIZE)
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(temp_path, target)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            os.remove(path)
+
+    def download(self, key, path):
+        source = self.local_path(key)
+        if not os.path.exists(source):
+            return False
+        shutil.copyfile(source, path)
+        return True
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def keys(self, older_than=None):
+        if not os.path.exists(self.root):
+            return
+        cutoff = older_than.replace(tzinfo=timezone.utc).timestamp() if older_than is not None else None
+        for root, dirs, files in os.walk(self.root):
+            relative = os.path.relpath(root, self.root).replace(os.sep, '/')
+            for name in files:
+                if name.endswith('.part'):
+                    continue
+                if cutoff is not None and os.path.getmtime(os.path.join(root, name)) >= cutoff:
+                    continue
+                yield name if relative == '.' else f'{relative}/{name}'
+
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def _query_string(query):
+    # SigV4's canonical encoding, also used on the wire so the two always agree.
+    return '&'.join(f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}" for name, value in sorted(query.items()))
+
+
+class S3Backend(StorageBackend):
+    """S3-compatible bucket addressed path-style: {endpoint}/{bucket}/{prefix}{key}"""
+
+    def __init__(self, endpoint_url, bucket, access_key, secret_key, region='us-east-1', prefix='',
+                 pool_size=8, timeout=S3_TIMEOUT):
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.host = urlsplit(self.endpoint_url).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Uploads stream a file body that cannot be replayed, so only idempotent reads and deletes retry.
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504],
+                      allowed_methods=frozenset({'GET', 'HEAD', 'DELETE'}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _path(self, key=None):
+        path = f'/{self.bucket}'
+        if key is not None:
+            path += f'/{self.prefix}{key}'
+        return quote(path, safe='/~')
+
+    def _signature(self, method, path, query, headers, payload_hash, amz_date):
+        """SigV4 signature over a canonical request; returns (scope, signed header names, signature)"""
+        canonical_query = _query_string(query)
+        names = sorted(headers)
+        canonical_headers = ''.join(f'{name}:{headers[name].strip()}\n' for name in names)
+        signed_headers = ';'.join(names)
+        canonical_request = '\n'.join([method, path, canonical_query, canonical_headers, signed_headers, payload_hash])
+
+        date = amz_date[:8]
+        scope = f'{date}/{self.region}/s3/aws4_request'
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+        signing_key = _hmac(_hmac(_hmac(_hmac(f'AWS4{self.secret_key}'.encode(), date), self.region), 's3'),
+                            'aws4_request')
+        return scope, signed_headers, hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def _request(self, method, key=None, query=None, payload_hash=EMPTY_SHA256, headers=None, **kwargs):
+        query = query or {}
+        amz_date = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        signed = {'host': self.host, 'x-amz-content-sha256': payload_hash, 'x-amz-date': amz_date}
+        signed.update({name.lower(): value for name, value in (headers or {}).items()})
+        path = self._path(key)
+        scope, signed_headers, signature = self._signature(method, path, query, signed, payload_hash, amz_date)
+        signed['authorization'] = (f'AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, '
+                                   f'SignedHeaders={signed_headers}, Signature={signature}')
+        del signed['host']  # requests sends the same value from the URL
+        url = self.endpoint_url + path + (f'?{_query_string(query)}' if query else '')
+        return self.session.request(method, url, headers=signed, timeout=self.timeout, **kwargs)
+
+    @staticmethod
+    def _check(response, action):
+        if response.status_code >= 300:
+            raise StorageError(f'S3 {action} failed with HTTP {response.status_code}: {response.text[:200]}')
+
+    def exists(self, key):
+        response = self._request('HEAD', key)
+        if response.status_code == 404:
+            return False
+        self._check(response, 'HEAD')
+        return True
+
+    def put(self, path, key, sha256):
+        # The key is the body's SHA-256, which is exactly the payload hash SigV4 asks for.
+        with open(path, 'rb') as body:
+            response = self._request('PUT', key, payload_hash=sha256, data=body, headers={
+                'content-length': str(os.path.getsize(path))
+            })
+        self._check(response, 'PUT')
+        os.remove(path)
+
+    def download(self, key, path):
+        with self._request('GET', key, stream=True) as response:
+            if response.status_code == 404:
+                return False
+            self._check(response, 'GET')
+            with open(path, 'wb') as out:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    out.write(chunk)
+        return True
+
+    def delete(self, key):
+        response = self._request('DELETE', key)
+        if response.status_code != 404:
+            self._check(response, 'DELETE')
+
+    def keys(self, older_than=None):
+        query = {'list-type': '2', 'prefix': self.prefix}
+        while True:
+            response = self._request('GET', query=query)
+            self._check(response, 'LIST')
+            root = ElementTree.fromstring(response.content)
+            for element in root.iter(f'{S3_XML_NS}Contents'):
+                if older_than is not None:
+                    # e.g. 2024-05-01T12:00:00.000Z; an object without one is treated as new.
+                    last_modified = element.findtext(f'{S3_XML_NS}LastModified')
+                    if not last_modified or datetime.strptime(last_modified[:19], '%Y-%m-%dT%H:%M:%S') >= older_than:
+                        continue
+                yield element.findtext(f'{S3_XML_NS}Key')[len(self.prefix):]
+            token = root.findtext(f'{S3_XML_NS}NextContinuationToken')
+            if root.findtext(f'{S3_XML_NS}IsTruncated') != 'true' or not token:
+                return
+            query = dict(query, **{'continuation-token': token})
+
+    def download_url(self, key, filename, as_attachment=False, expires=PRESIGNED_URL_TTL):
+        amz_date = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        disposition = 'attachment' if as_attachment else 'inline'
+        query = {
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f'{self.access_key}/{amz_date[:8]}/{self.region}/s3/aws4_request',
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(expires),
+            'X-Amz-SignedHeaders': 'host',
+            'response-content-disposition': f"{disposition}; filename*=UTF-8''{quote(filename)}",
+        }
+        path = self._path(key)
+        _, _, signature = self._signature('GET', path, query, {'host': self.host}, 'UNSIGNED-PAYLOAD', amz_date)
+        query['X-Amz-Signature'] = signature
+        return f'{self.endpoint_url}{path}?{_query_string(query)}'
+
+
+def backend_from_env(name, local_root):
+    """Build the named backend ('local' or 's3') from environment settings"""
+    if name == 'local':
+        return LocalBackend(local_root)
+    if name == 's3':
+        missing = [var for var in ('S3_ENDPOINT_URL', 'S3_BUCKET') if not os.getenv(var)]
+        if missing:
+            raise StorageError(f"STORAGE_BACKEND=s3 needs {', '.join(missing)}")
+        return S3Backend(
+            os.getenv('S3_ENDPOINT_URL'),
+            os.getenv('S3_BUCKET'),
+            os.getenv('S3_ACCESS_KEY_ID') or os.getenv('AWS_ACCESS_KEY_ID', ''),
+            os.getenv('S3_SECRET_ACCESS_KEY') or os.getenv('AWS_SECRET_ACCESS_KEY', ''),
+            region=os.getenv('S3_REGION', 'us-east-1'),
+            prefix=os.getenv('S3_PREFIX', '')
+        )
+    raise StorageError(f"Unknown storage backend '{name}' (expected local or s3)")
@@ -0,0 +1,26 @@
+from flask import Blueprint, Response, request, jsonify, current_app
+from stats_stream import broadcaster, StreamFull
+
+stream_bp = Blueprint('stream', __name__)
+
+@stream_bp.route('/stream/stats', methods=['GET'])
+def stream_stats():
+    """Server-Sent Events stream of dashboard stats, pushed whenever they change"""
+    try:
+        stats_broadcaster = broadcaster(current_app._get_current_object())
+        try:
+            stats_broadcaster.subscribe()
+        except StreamFull as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = '5'
+            return response, 503
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        response = Response(stats_broadcaster.events(last_event_id), mimetype='text/event-stream')
+        # Runs when the server closes the response, even if the client left before the first chunk.
+        response.call_on_close(stats_broadcaster.unsubscribe)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,137 @@
+"""Shared fixtures: the app against a scratch SQLite database and upload folder.
+
+The app reads its configuration at import time, so the environment is set
+here, before any test imports it. Every test starts from empty tables and
+an empty response cache.
+
+Every app module imports the core models (models/user.py, candidate.py,
+auth.py and employee.py). In a checkout without them, only the
+STANDALONE_TESTS, which never load the app, are collected.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from importlib import import_module
+from importlib.util import find_spec
+import pytest
+
+APP_MODELS = ('models.user', 'models.candidate', 'models.auth', 'models.employee')
+MISSING_MODELS = [name for name in APP_MODELS if find_spec(name) is None]
+STANDALONE_TESTS = {'test_engine_profiles.py', 'test_storage_backends.py', 'test_text_extraction.py'}
+
+SCRATCH = tempfile.mkdtemp(prefix='app-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(SCRATCH, 'test.db')
+os.environ.pop('DATABASE_REPLICA_URL', None)
+os.environ['UPLOAD_FOLDER'] = os.path.join(SCRATCH, 'uploads')
+os.environ['APP_STARTUP'] = 'eager'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['DOCUMENT_EXTRACT_WORKERS'] = '0'
+
+# Models bind to the app's db, so the app is imported before any test module imports them.
+if not MISSING_MODELS:
+    import index  # noqa: E402
+
+
+def pytest_report_header(config):
+    if MISSING_MODELS:
+        return f"missing {', '.join(MISSING_MODELS)}: running only {', '.join(sorted(STANDALONE_TESTS))}"
+
+
+def pytest_ignore_collect(collection_path, config):
+    if MISSING_MODELS and collection_path.name.startswith('test_') and collection_path.name not in STANDALONE_TESTS:
+        return True
+    return None
+
+
+@pytest.fixture(scope='session')
+def app():
+    # create_all only sees models that have been imported.
+    for module, _, _ in index.BLUEPRINTS.values():
+        import_module(module)
+    import_module('models.employee')
+    return index.app
+
+
+@pytest.fixture(autouse=True)
+def db(request):
+    if MISSING_MODELS:
+        # Only standalone tests were collected, and they need no database.
+        yield None
+        return
+    app = request.getfixturevalue('app')
+    from index import db as database
+    import response_cache
+
+    response_cache.configure(response_cache.MemoryBackend())
+    with app.app_context():
+        # Only the primary: a test may configure a replica bind the shared app does not have.
+        database.drop_all(bind_key=None)
+        database.create_all(bind_key=None)
+        yield database
+        database.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(db):
+    """Context manager counting the SQL statements run on the primary engine while it is open"""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counting():
+        counter = {'queries': 0}
+
+        def count(*args):
+            counter['queries'] += 1
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            yield counter
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+    return counting
+
+
+@pytest.fixture
+def serve():
+    """serve(wsgi_app) runs the app on a local port for this test and returns its base URL"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    servers = []
+
+    def start(wsgi_app):
+        server = make_server('127.0.0.1', 0, wsgi_app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return f'http://127.0.0.1:{server.server_port}'
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        thread.join()
+
+
+@pytest.fixture
+def fake_s3(serve):
+    from fake_s3 import create_fake_s3
+
+    fake = create_fake_s3('test', 'test-secret')
+    fake.endpoint_url = serve(fake)
+    return fake
+
+
+@pytest.fixture
+def s3(fake_s3):
+    """S3Backend against a fresh fake_s3 bucket"""
+    from storage_backends import S3Backend
+
+    return S3Backend(fake_s3.endpoint_url, 'uploads', 'test', 'test-secret', prefix='blobs/')
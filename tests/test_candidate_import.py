@@ -0,0 +1,15 @@
+import candidate_import
+from models.candidate import Candidate
+
+
+def test_bulk_import_is_refused_while_duplicates_block_the_email_index(db, client, monkeypatch):
+    monkeypatch.setattr(candidate_import, 'ensure_email_index', lambda: ['twice@example.com'])
+    monkeypatch.setattr(candidate_import, '_sqlite_ready', False)
+
+    response = client.post('/api/candidates/bulk', json=[
+        {'first_name': 'New', 'last_name': 'Row', 'email': 'new@example.com'},
+    ])
+
+    assert response.status_code == 409
+    assert response.json['duplicate_emails'] == ['twice@example.com']
+    assert Candidate.query.count() == 0
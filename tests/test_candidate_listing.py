@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from models.candidate import Candidate
+from candidate import ensure_listing_index
+
+
+def add_candidates(db, count, updated_at=None):
+    now = datetime.utcnow()
+    db.session.execute(Candidate.__table__.insert(), [{
+        'first_name': 'Page', 'last_name': str(i), 'email': f'page{i}-{updated_at is None}@example.com',
+        'pipeline_status': 'Applied', 'admin_approval': 'Pending',
+        'created_at': now - timedelta(days=1), 'updated_at': updated_at
+    } for i in range(count)])
+    db.session.commit()
+
+
+def walk(client, **params):
+    seen = []
+    cursor = None
+    while True:
+        query = dict(params, limit=2, **({'after': cursor} if cursor else {}))
+        response = client.get('/api/candidates', query_string=query)
+        assert response.status_code == 200, response.json
+        seen.extend(candidate['id'] for candidate in response.json['candidates'])
+        cursor = response.json['next_cursor']
+        if cursor is None:
+            return seen
+
+
+def test_keyset_pages_visit_every_candidate_once(client, db):
+    add_candidates(db, 7, updated_at=datetime.utcnow())
+
+    seen = walk(client)
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+def test_legacy_rows_without_updated_at_are_backfilled(client, db):
+    add_candidates(db, 3, updated_at=datetime.utcnow())
+    add_candidates(db, 3)
+
+    ensure_listing_index()
+
+    assert Candidate.query.filter(Candidate.updated_at.is_(None)).count() == 0
+    assert sorted(walk(client)) == [candidate.id for candidate in Candidate.query.order_by(Candidate.id)]
+
+
+def test_sparse_fields_page(client, db):
+    add_candidates(db, 3, updated_at=datetime.utcnow())
+
+    response = client.get('/api/candidates', query_string={'fields': 'email', 'limit': 2})
+
+    assert response.status_code == 200
+    assert set(response.json['candidates'][0]) == {'id', 'email'}
+    assert response.json['next_cursor']
@@ -0,0 +1,8 @@
+import pytest
+from candidate_transitions import TransitionError, transition_candidates
+
+
+@pytest.mark.parametrize('ids', [[True], [1, False], ['1'], 1])
+def test_ids_must_be_integers(db, ids):
+    with pytest.raises(TransitionError, match='ids must be a list of integers'):
+        transition_candidates('Interviewing', ids=ids)
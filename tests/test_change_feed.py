@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+import change_feed
+from change_feed import head_cursor
+from models.change_log import ChangeLogEntry
+from models.employee import Employee
+
+
+def add_entries(db, *ages_ms):
+    now = datetime.utcnow()
+    db.session.execute(ChangeLogEntry.__table__.insert(), [
+        {'entity': 'candidate', 'entity_id': number, 'op': 'update', 'changed_at': now - timedelta(milliseconds=age)}
+        for number, age in enumerate(ages_ms, 1)
+    ])
+    db.session.commit()
+
+
+def test_head_cursor_stops_short_of_unsettled_entries(db, monkeypatch):
+    monkeypatch.setattr(change_feed, 'dialect_name', lambda: 'postgresql')
+    monkeypatch.setattr(change_feed, 'CHANGE_FEED_SETTLE_MS', 1000)
+    add_entries(db, 5000, 3000, 10)
+
+    assert head_cursor() == 2
+
+
+def test_head_cursor_is_the_latest_entry_where_ids_commit_in_order(db):
+    add_entries(db, 5000, 10)
+
+    assert head_cursor() == 2
+
+
+def test_employee_writes_reach_the_feed(client, db):
+    cursor = client.get('/api/changes').json['next_cursor']
+    employee = Employee(first_name='Grace', last_name='Hopper', email='grace@example.com')
+    db.session.add(employee)
+    db.session.commit()
+
+    changes = client.get('/api/changes', query_string={'since': cursor, 'entity': 'employee'}).json['changes']
+
+    assert [(change['entity'], change['id'], change['op']) for change in changes] == [('employee', employee.id, 'insert')]
+    assert changes[0]['data']['email'] == 'grace@example.com'
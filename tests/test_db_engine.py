@@ -0,0 +1,48 @@
+import os
+import pytest
+from flask import g
+from sqlalchemy import select
+import index
+from db_engine import REPLICA_BIND
+from models.candidate import Candidate
+
+
+@pytest.fixture
+def replica_app(monkeypatch, tmp_path):
+    """An app whose replica is a second SQLite database holding one candidate the primary lacks"""
+    monkeypatch.setenv('DATABASE_REPLICA_URL', 'sqlite:///' + os.path.join(tmp_path, 'replica.db'))
+    app = index.create_app(['candidates'])
+    with app.app_context():
+        replica = index.db.engines[REPLICA_BIND]
+        index.db.metadata.create_all(replica)
+        with replica.begin() as conn:
+            conn.execute(Candidate.__table__.insert(), {
+                'first_name': 'Only', 'last_name': 'Replica', 'email': 'replica@example.com',
+                'pipeline_status': 'Applied', 'admin_approval': 'Pending'
+            })
+    return app
+
+
+def test_use_replica_views_read_from_the_replica(replica_app):
+    client = replica_app.test_client()
+
+    listed = client.get('/api/candidates').json['candidates']
+    created = client.post('/api/candidates', json={'first_name': 'On', 'last_name': 'Primary',
+                                                    'email': 'primary@example.com'})
+
+    assert [candidate['email'] for candidate in listed] == ['replica@example.com']
+    assert created.status_code == 201
+    assert created.json['id'] == 1
+
+
+def test_reads_after_a_write_stay_on_the_primary(replica_app):
+    with replica_app.test_request_context('/api/candidates'):
+        g.use_replica = True
+        session = index.db.session
+        emails = lambda: session.execute(select(Candidate.email)).scalars().all()
+
+        assert emails() == ['replica@example.com']
+        session.add(Candidate(first_name='New', last_name='Hire', email='new@example.com'))
+        session.flush()
+        assert emails() == ['new@example.com']
+        session.rollback()
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy.pool import NullPool
+from db_engine import engine_options
+
+POSTGRES_URL = 'postgresql://app@db.example.com/app'
+
+
+def test_server_profile_pools_and_pre_pings(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '12')
+
+    options = engine_options(POSTGRES_URL, 'server', statement_timeout_ms=5000, connect_timeout=3)
+
+    assert options['pool_pre_ping'] is True
+    assert options['pool_recycle'] == 280
+    assert options['pool_size'] == 12
+    assert options['connect_args'] == {'connect_timeout': 3, 'options': '-c statement_timeout=5000'}
+
+
+def test_serverless_profiles_use_null_pool(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '12')
+
+    serverless = engine_options(POSTGRES_URL, 'serverless', statement_timeout_ms=5000)
+    pgbouncer = engine_options(POSTGRES_URL, 'pgbouncer', statement_timeout_ms=5000)
+
+    assert serverless['poolclass'] is NullPool and 'pool_size' not in serverless
+    assert serverless['connect_args'] == {'options': '-c statement_timeout=5000'}
+    # Transaction-mode poolers get SET LOCAL per transaction, not a startup option.
+    assert pgbouncer['poolclass'] is NullPool and 'connect_args' not in pgbouncer
+
+
+def test_sqlite_and_unknown_profiles():
+    assert engine_options('sqlite:///local.db', 'server') == {}
+    with pytest.raises(ValueError, match='DB_ENGINE_PROFILE'):
+        engine_options(POSTGRES_URL, 'lambda')
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import time
+from datetime import timedelta
+import pytest
+from storage_backends import LocalBackend, blob_key
+from blob_store import BlobStore
+from file_catalog import collect_orphan_blobs
+
+
+def staged(tmp_path, body):
+    sha256 = hashlib.sha256(body).hexdigest()
+    path = tmp_path / f'{sha256}.part'
+    path.write_bytes(body)
+    return str(path), blob_key(sha256), sha256
+
+
+@pytest.mark.parametrize('backend_name', ['local', 's3'])
+def test_orphan_collection_spares_blobs_within_the_grace_period(backend_name, s3, fake_s3, tmp_path, db):
+    root = tmp_path / 'uploads'
+    backend = s3 if backend_name == 's3' else LocalBackend(str(root / '.blobs'))
+    blob_store = BlobStore(str(root), backend)
+    keys = []
+    for body in (b'abandoned', b'in flight'):
+        path, key, sha256 = staged(tmp_path, body)
+        backend.put(path, key, sha256)
+        keys.append(key)
+    abandoned, in_flight = keys
+    # The in-flight body has no committed file_blobs row yet, just like one store() is still writing.
+    if backend_name == 's3':
+        fake_s3.modified[('uploads', f'blobs/{abandoned}')] -= timedelta(hours=2)
+    else:
+        stale = time.time() - 7200
+        os.utime(backend.local_path(abandoned), (stale, stale))
+
+    assert collect_orphan_blobs(blob_store, grace=timedelta(hours=1)) == 1
+
+    assert not backend.exists(abandoned)
+    assert backend.exists(in_flight)
@@ -0,0 +1,14 @@
+import io
+import pytest
+
+
+@pytest.mark.parametrize('category', ['..', '.hidden', 'Offer Letters/2024'])
+def test_uploads_under_any_category_can_be_downloaded_and_deleted(client, category):
+    uploaded = client.post('/api/files/upload', data={
+        'file': (io.BytesIO(b'signed offer'), 'offer.pdf'), 'entity_type': 'candidate', 'category': category
+    })
+    path = uploaded.json['path']
+
+    assert not any(part.startswith('.') for part in path.split('/'))
+    assert client.get(f'/api/files/{path}').data == b'signed offer'
+    assert client.delete(f'/api/files/{path}').status_code == 200
@@ -0,0 +1,77 @@
+import pytest
+from flask import Flask, jsonify
+import indeed_push
+from fake_indeed import create_fake_indeed
+from indeed_push import HttpPushClient, push_statuses
+from models.candidate import Candidate
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """Backoff sleeps, recorded instead of slept"""
+    recorded = []
+    monkeypatch.setattr(indeed_push.time, 'sleep', recorded.append)
+    return recorded
+
+
+def flaky_server(*responses):
+    """Answers each push with the next (status, headers) from responses, then 200 forever"""
+    app = Flask(__name__)
+    app.calls = 0
+    queued = list(responses)
+
+    @app.post('/v1/ats/candidates/<registration_id>/status')
+    def push(registration_id):
+        app.calls += 1
+        if queued:
+            status, headers = queued.pop(0)
+            return jsonify({'error': 'try later'}), status, headers
+        return jsonify({'success': True})
+
+    return app
+
+
+def add_candidate(db, registration_id, pipeline_status='Interviewing'):
+    candidate = Candidate(first_name='Push', last_name=str(registration_id), email=f'{registration_id}@example.com',
+                          indeed_registration_id=registration_id, ats_candidate_id='C1', ats_application_id='A1',
+                          pipeline_status=pipeline_status, admin_approval='Approved')
+    db.session.add(candidate)
+    db.session.commit()
+    return candidate.id
+
+
+def test_push_statuses_against_fake_indeed(db, serve):
+    fake = create_fake_indeed([])
+    client = HttpPushClient(serve(fake), 'local', 'local', rate=100)
+    pushed_id = add_candidate(db, 'REG1', 'Offered')
+    unsynced_id = add_candidate(db, None)
+
+    results = push_statuses(client, [pushed_id, unsynced_id, 999999])
+
+    assert [result['status'] for result in results] == ['pushed', 'error', 'error']
+    assert fake.pushed_statuses == {'REG1': 'Offered'}
+    assert db.session.get(Candidate, pushed_id).indeed_status == 'Offered'
+
+
+def test_retry_after_is_capped_at_max_backoff(db, serve, waits):
+    server = flaky_server((429, {'Retry-After': '3600'}), (503, {'Retry-After': '2'}))
+    client = HttpPushClient(serve(server), rate=100, max_backoff=5)
+
+    results = push_statuses(client, [add_candidate(db, 'REG1')])
+
+    assert results[0]['status'] == 'pushed'
+    assert server.calls == 3
+    assert waits == [5, 2]
+
+
+def test_backoff_is_capped_and_retries_run_out(db, serve, waits):
+    server = flaky_server(*[(503, {})] * 10)
+    client = HttpPushClient(serve(server), rate=100, max_retries=6, backoff=1, max_backoff=4)
+
+    results = push_statuses(client, [add_candidate(db, 'REG1')])
+
+    assert results[0]['status'] == 'error'
+    assert '503' in results[0]['error']
+    assert server.calls == 7
+    assert len(waits) == 6
+    assert all(wait <= 4 for wait in waits)
@@ -0,0 +1,110 @@
+from fake_indeed import create_fake_indeed, make_records
+from indeed_sync import HttpFeedClient, StaticFeedClient, run_sync
+from models.candidate import Candidate
+
+
+def add_candidate(db, email, registration_id=None):
+    candidate = Candidate(first_name='Known', last_name='Candidate', email=email,
+                          indeed_registration_id=registration_id, pipeline_status='Interviewing',
+                          admin_approval='Approved')
+    db.session.add(candidate)
+    db.session.commit()
+    return candidate
+
+
+def feed_record(registration_id, email, status='Active'):
+    return {'indeed_registration_id': registration_id, 'ats_candidate_id': f'C-{registration_id}',
+            'ats_application_id': f'A-{registration_id}', 'first_name': 'Feed', 'last_name': registration_id,
+            'email': email, 'indeed_status': status}
+
+
+def test_incremental_sync_against_fake_indeed(db, serve):
+    records = make_records(5)
+    client = HttpFeedClient(serve(create_fake_indeed(records)), 'local', 'local')
+
+    first = run_sync(client, page_size=2)
+    unchanged = run_sync(client, page_size=2)
+    records[1] = dict(records[1], indeed_status='Hired', updated_at='2030-01-01T00:00:00')
+    changed = run_sync(client, page_size=2)
+
+    assert (first['pages'], first['created'], first['updated']) == (3, 5, 0)
+    assert unchanged['records'] == 0
+    assert (changed['records'], changed['created'], changed['updated']) == (1, 0, 1)
+    assert changed['cursor'] == '2030-01-01T00:00:00'
+    assert Candidate.query.count() == 5
+    assert Candidate.query.filter_by(indeed_registration_id='REG00000001').one().indeed_status == 'Hired'
+
+
+def test_full_resync_skips_unchanged_records(db):
+    client = StaticFeedClient([feed_record('REG1', 'one@example.com')])
+
+    run_sync(client)
+    again = run_sync(client, full=True)
+
+    assert (again['created'], again['updated'], again['skipped']) == (0, 0, 1)
+
+
+def test_existing_candidate_is_linked_by_email(db):
+    candidate = add_candidate(db, 'legacy@example.com')
+
+    report = run_sync(StaticFeedClient([feed_record('REG1', 'legacy@example.com')]))
+
+    assert (report['created'], report['updated'], report['conflicts']) == (0, 1, 0)
+    db.session.refresh(candidate)
+    assert candidate.indeed_registration_id == 'REG1'
+    assert candidate.pipeline_status == 'Interviewing'
+
+
+def test_email_held_by_another_registration_is_a_conflict(db):
+    candidate = add_candidate(db, 'taken@example.com', registration_id='REG1')
+
+    report = run_sync(StaticFeedClient([feed_record('REG2', 'taken@example.com')]))
+
+    assert (report['created'], report['updated'], report['conflicts']) == (0, 0, 1)
+    db.session.refresh(candidate)
+    assert candidate.indeed_registration_id == 'REG1'
+
+
+def test_registrations_sharing_an_email_within_a_page(db):
+    report = run_sync(StaticFeedClient([
+        feed_record('REG1', 'shared@example.com'),
+        feed_record('REG2', 'shared@example.com'),
+    ]))
+
+    assert (report['created'], report['conflicts']) == (1, 1)
+    assert Candidate.query.filter_by(email='shared@example.com').one().indeed_registration_id == 'REG1'
+
+
+def test_sync_endpoint_uses_the_configured_client(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'INDEED_FEED_CLIENT', StaticFeedClient([feed_record('REG1', 'api@example.com')]))
+
+    response = client.post('/api/indeed/sync-candidates')
+
+    assert response.status_code == 200
+    assert response.json['run']['created'] == 1
+    assert client.get('/api/candidates/pipeline-stats').json['applied'] == 1
+
+
+def test_new_records_without_an_email_are_invalid(db):
+    add_candidate(db, 'known@example.com', registration_id='REG1')
+
+    report = run_sync(StaticFeedClient([
+        feed_record('REG1', None, status='Hired'),
+        feed_record('REG2', None),
+        feed_record('REG3', ''),
+        feed_record('REG4', 'new@example.com'),
+    ]))
+
+    assert (report['created'], report['updated'], report['invalid'], report['conflicts']) == (1, 1, 2, 0)
+    assert Candidate.query.filter_by(indeed_registration_id='REG1').one().indeed_status == 'Hired'
+
+
+def test_sync_status_shows_a_run_that_changed_nothing(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'INDEED_FEED_CLIENT', StaticFeedClient([]))
+
+    client.post('/api/indeed/sync-candidates')
+    first = client.get('/api/indeed/sync-status').json['last_run']
+    client.post('/api/indeed/sync-candidates')
+    second = client.get('/api/indeed/sync-status').json['last_run']
+
+    assert second['finished_at'] != first['finished_at']
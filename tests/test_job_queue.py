@@ -0,0 +1,69 @@
+import json
+from sqlalchemy import update
+from models.job import Job
+from job_queue import claim, enqueue, job_handler, run_job
+
+
+@job_handler('tests.echo')
+def echo_job(payload, progress):
+    progress({'step': 1})
+    return {'echo': payload['value']}
+
+
+@job_handler('tests.taken_over')
+def taken_over_job(payload, progress):
+    # Simulates a stalled worker whose job another worker has since claimed.
+    from index import db
+
+    db.session.execute(update(Job).where(Job.id == payload['job_id']).values(locked_by='worker-b', status='running'))
+    db.session.commit()
+    return {'stale': True}
+
+
+@job_handler('tests.fails')
+def failing_job(payload, progress):
+    raise RuntimeError('boom')
+
+
+def queue(db, kind, payload=None):
+    job, _ = enqueue(kind, payload)
+    db.session.commit()
+    return job.id
+
+
+def test_successful_job_records_its_result(db):
+    job_id = queue(db, 'tests.echo', {'value': 42})
+
+    job = claim('worker-a')
+    assert job.id == job_id
+    assert run_job(job, 'worker-a') == 'succeeded'
+
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert json.loads(job.result) == {'echo': 42}
+    assert job.locked_by is None
+
+
+def test_failed_job_is_requeued_with_backoff(db):
+    job_id = queue(db, 'tests.fails')
+
+    assert run_job(claim('worker-a'), 'worker-a') == 'queued'
+
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert job.error == 'RuntimeError: boom'
+    assert job.run_after > job.started_at
+
+
+def test_stale_worker_does_not_overwrite_the_new_owner(db):
+    job_id = queue(db, 'tests.taken_over')
+    job = claim('worker-a')
+    job.payload = json.dumps({'job_id': job_id})
+
+    assert run_job(job, 'worker-a') is None
+
+    job = db.session.get(Job, job_id)
+    db.session.refresh(job)
+    assert job.status == 'running'
+    assert job.locked_by == 'worker-b'
+    assert job.result is None
@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_failed_statement_does_not_leave_a_start_time_behind(db):
+    with db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM no_such_table'))
+        conn.execute(text('SELECT 1'))
+        assert conn.info.get('query_started', []) == []
+
+
+def test_server_timing_counts_queries(client):
+    response = client.get('/api/candidates?limit=5')
+
+    assert response.status_code == 200
+    timings = response.headers.getlist('Server-Timing')
+    assert any(timing.startswith('db;') and 'queries' in timing for timing in timings)
@@ -0,0 +1,72 @@
+import threading
+import time
+import requests
+from blob_store import CHUNK_SIZE
+
+
+def start_upload(client, size):
+    response = client.post('/api/files/uploads', json={'filename': 'resume.pdf', 'size': size})
+    assert response.status_code == 201, response.json
+    return response.json['upload_id']
+
+
+def patch(client, upload_id, offset, body):
+    return client.patch(f'/api/files/uploads/{upload_id}', data=body, headers={'Upload-Offset': str(offset)})
+
+
+def received(client, upload_id):
+    return client.get(f'/api/files/uploads/{upload_id}').json['offset']
+
+
+def test_overlapping_patches_at_the_same_offset_append_once(app, client, serve):
+    url = serve(app) + f'/api/files/uploads/{start_upload(client, 2 * CHUNK_SIZE)}'
+    first_sent = threading.Event()
+    release = threading.Event()
+    results = {}
+
+    def stalled_body():
+        yield b'a' * CHUNK_SIZE
+        first_sent.set()
+        release.wait(10)
+        yield b'b' * 10
+
+    def send(name, body):
+        results[name] = requests.patch(url, data=body, headers={'Upload-Offset': '0'}, timeout=30)
+
+    original = threading.Thread(target=send, args=('original', stalled_body()))
+    original.start()
+    assert first_sent.wait(10)
+    retry = threading.Thread(target=send, args=('retry', b'a' * CHUNK_SIZE))
+    retry.start()
+    time.sleep(0.2)  # the retry is now waiting on the original's lock
+    release.set()
+    original.join(10)
+    retry.join(10)
+
+    assert results['original'].status_code == 200
+    assert results['retry'].status_code == 409
+    assert results['retry'].json()['offset'] == CHUNK_SIZE + 10
+    assert requests.get(url, timeout=10).json()['offset'] == CHUNK_SIZE + 10
+
+
+def test_overlong_request_leaves_nothing_behind(client):
+    upload_id = start_upload(client, CHUNK_SIZE + CHUNK_SIZE // 2)
+
+    response = patch(client, upload_id, 0, b'x' * (2 * CHUNK_SIZE))
+
+    assert response.status_code == 413
+    assert response.json['offset'] == 0
+    assert received(client, upload_id) == 0
+
+
+def test_upload_finishes_once(client):
+    upload_id = start_upload(client, 6)
+
+    assert patch(client, upload_id, 0, b'abc').json['offset'] == 3
+    finished = patch(client, upload_id, 3, b'def')
+    again = patch(client, upload_id, 6, b'')
+
+    assert finished.status_code == 200
+    assert finished.json['size'] == 6
+    assert 'error' in again.json
+    assert len(client.get('/api/files').json['files']) == 1
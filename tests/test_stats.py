@@ -0,0 +1,54 @@
+from datetime import datetime
+from models.candidate import Candidate
+from models.candidate_stats import CandidateStatusCount
+from job_queue import claim, run_job
+from stats import RECOUNT_JOB, adjust_candidate_counts
+
+
+def add_candidates(db, count, pipeline_status='Applied'):
+    now = datetime.utcnow()
+    db.session.execute(Candidate.__table__.insert(), [{
+        'first_name': 'Stats', 'last_name': str(i), 'email': f'stats{i}-{pipeline_status}@example.com',
+        'pipeline_status': pipeline_status, 'admin_approval': 'Pending', 'created_at': now, 'updated_at': now
+    } for i in range(count)])
+    db.session.commit()
+
+
+def test_empty_counters_read_as_zero_without_writing(client, db, count_queries):
+    with count_queries() as counter:
+        response = client.get('/api/candidates/pipeline-stats')
+
+    assert response.status_code == 200
+    assert response.json['total'] == 0
+    assert CandidateStatusCount.query.count() == 0
+    # One counter read, nothing rebuilt.
+    assert counter['queries'] == 1
+
+
+def test_fresh_counts_candidates_without_touching_the_counters(client, db):
+    add_candidates(db, 3)
+    adjust_candidate_counts({('Applied', 'Pending'): 1})
+    db.session.commit()
+
+    fresh = client.get('/api/candidates/pipeline-stats?fresh=1').json
+    cached = client.get('/api/candidates/pipeline-stats').json
+
+    assert fresh['applied'] == 3
+    assert cached['applied'] == 1
+    assert CandidateStatusCount.query.one().count == 1
+
+
+def test_recount_runs_as_a_queued_job(client, db):
+    add_candidates(db, 2)
+    add_candidates(db, 1, pipeline_status='Interviewing')
+
+    response = client.post('/api/admin/stats/recount')
+    again = client.post('/api/admin/stats/recount')
+
+    assert response.status_code == 202
+    assert again.json['created'] is False
+    assert response.json['job']['kind'] == RECOUNT_JOB
+    assert run_job(claim('worker-a'), 'worker-a') == 'succeeded'
+
+    summary = client.get('/api/candidates/pipeline-stats').json
+    assert (summary['applied'], summary['interviewing'], summary['total']) == (2, 1, 3)
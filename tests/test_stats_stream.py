@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+from models.candidate import Candidate
+from models.employee import Employee
+from stats_stream import StatsBroadcaster
+
+SUBSCRIBER_COUNTS = (1, 25)
+
+
+def subscribe(broadcaster, received, wanted):
+    broadcaster.subscribe()
+    try:
+        for chunk in broadcaster.events(heartbeat=0.1, max_seconds=10):
+            if chunk.startswith('id: '):
+                received.append(chunk)
+                if len(received) >= wanted:
+                    return
+    finally:
+        broadcaster.unsubscribe()
+
+
+def snapshot(event):
+    data = next(line for line in event.splitlines() if line.startswith('data: '))
+    return json.loads(data[len('data: '):])
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def run_polls(app, db, count_queries, subscribers, write):
+    """Start subscribers, make one write, poll three times; returns (queries, broadcaster, events per subscriber)"""
+    # The background thread takes the first snapshot; the test drives every poll after that.
+    broadcaster = StatsBroadcaster(app, poll_interval=3600)
+    received = [[] for _ in range(subscribers)]
+    threads = [threading.Thread(target=subscribe, args=(broadcaster, events, 2), daemon=True) for events in received]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: all(events for events in received))
+
+    write()
+    with count_queries() as counter:
+        for _ in range(3):
+            broadcaster._refresh()
+    for thread in threads:
+        thread.join(10)
+    return counter['queries'], broadcaster, received
+
+
+def test_db_load_does_not_grow_with_subscribers(app, db, count_queries):
+    queries = {}
+    for subscribers in SUBSCRIBER_COUNTS:
+        # Same starting data for every run, so only the subscriber count differs.
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+
+        def add_candidate():
+            db.session.add(Candidate(first_name='Ada', last_name='Stream', email=f'ada{subscribers}@example.com'))
+            db.session.commit()
+
+        queries[subscribers], broadcaster, received = run_polls(app, db, count_queries, subscribers, add_candidate)
+
+        # One snapshot at subscribe and one after the write, however many clients are listening.
+        assert broadcaster.refreshes == 2
+        assert all(len(events) == 2 for events in received)
+        assert len({events[1] for events in received}) == 1
+
+    assert queries[SUBSCRIBER_COUNTS[0]] == queries[SUBSCRIBER_COUNTS[-1]]
+
+
+def test_employee_writes_refresh_the_stream(app, db, count_queries):
+    def add_employee():
+        db.session.add(Employee(first_name='Grace'))
+        db.session.commit()
+
+    _, broadcaster, received = run_polls(app, db, count_queries, 2, add_employee)
+
+    assert broadcaster.refreshes == 2
+    assert snapshot(received[0][1])['database']['total_employees'] == 1
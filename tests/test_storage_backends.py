@@ -0,0 +1,63 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+import pytest
+import requests
+from storage_backends import S3Backend, StorageError, blob_key
+
+
+def staged(tmp_path, body):
+    sha256 = hashlib.sha256(body).hexdigest()
+    path = tmp_path / f'{sha256}.part'
+    path.write_bytes(body)
+    return str(path), blob_key(sha256), sha256
+
+
+def test_s3_round_trip(s3, fake_s3, tmp_path):
+    path, key, sha256 = staged(tmp_path, b'resume body')
+
+    assert not s3.exists(key)
+    s3.put(path, key, sha256)
+
+    assert not os.path.exists(path)
+    assert fake_s3.objects[('uploads', f'blobs/{key}')] == b'resume body'
+    assert s3.exists(key)
+    assert list(s3.keys()) == [key]
+    target = tmp_path / 'download'
+    assert s3.download(key, str(target))
+    assert target.read_bytes() == b'resume body'
+
+    s3.delete(key)
+    s3.delete(key)
+    assert not s3.exists(key)
+    assert not s3.download(key, str(target))
+    assert list(s3.keys()) == []
+
+
+def test_s3_presigned_url_serves_the_blob(s3, tmp_path):
+    path, key, sha256 = staged(tmp_path, b'offer letter')
+    s3.put(path, key, sha256)
+
+    response = requests.get(s3.download_url(key, 'offer letter.pdf', as_attachment=True), timeout=10)
+
+    assert response.status_code == 200
+    assert response.content == b'offer letter'
+    assert response.headers['Content-Disposition'] == "attachment; filename*=UTF-8''offer%20letter.pdf"
+
+
+def test_s3_rejects_a_bad_signature(fake_s3, tmp_path):
+    backend = S3Backend(fake_s3.endpoint_url, 'uploads', 'test', 'wrong-secret')
+    path, key, sha256 = staged(tmp_path, b'body')
+
+    with pytest.raises(StorageError, match='403'):
+        backend.put(path, key, sha256)
+
+
+def test_keys_older_than_skips_recent_writes(s3, fake_s3, tmp_path):
+    old_path, old_key, old_sha = staged(tmp_path, b'old')
+    new_path, new_key, new_sha = staged(tmp_path, b'new')
+    s3.put(old_path, old_key, old_sha)
+    s3.put(new_path, new_key, new_sha)
+    fake_s3.modified[('uploads', f'blobs/{old_key}')] -= timedelta(hours=2)
+
+    assert list(s3.keys(older_than=datetime.utcnow() - timedelta(hours=1))) == [old_key]
@@ -0,0 +1,18 @@
+import text_extraction
+from text_extraction import extract_txt
+
+
+def test_utf8_cut_mid_character_at_the_read_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_extraction, 'DOCUMENT_MAX_CHARS', 3)
+    path = tmp_path / 'notes.txt'
+    # 21 bytes; the 12-byte read ends halfway through the sixth é.
+    path.write_text('a' + 'é' * 10, encoding='utf-8')
+
+    assert extract_txt(str(path)) == 'aéé'
+
+
+def test_text_that_is_not_utf8_falls_back_to_latin1(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(b'caf\xe9 au lait')
+
+    assert extract_txt(str(path)) == 'café au lait'
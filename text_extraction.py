@@ -0,0 +1,97 @@
+"""Plain-text extraction from uploaded documents.
+
+This module only imports the standard library, so process-pool workers
+start quickly. txt and docx are built in. PDF and legacy .doc need an
+extractor plugged in through DOCUMENT_EXTRACTORS, a comma-separated list of
+ext=module:function entries, e.g. 'pdf=my_pdf:extract'. Each function takes
+a file path and returns its text. pdf falls back to pypdf when that is
+installed. Plugins are resolved by import path rather than registered at
+runtime, so spawned workers pick them up too.
+"""
+
+import codecs
+import os
+import zipfile
+from importlib import import_module
+from xml.etree import ElementTree
+
+# Postgres tsvectors are capped at 1 MB, so keep indexed text well under that.
+DOCUMENT_MAX_CHARS = int(os.getenv('DOCUMENT_MAX_CHARS', 200000))
+EXTRACTABLE_EXTENSIONS = {'txt', 'docx', 'pdf', 'doc'}
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def extract_txt(path):
+    limit = DOCUMENT_MAX_CHARS * 4
+    with open(path, 'rb') as f:
+        data = f.read(limit)
+    try:
+        # An incremental decoder holds back a multibyte character cut off at the read limit instead of failing on it.
+        text = codecs.getincrementaldecoder('utf-8')().decode(data, final=len(data) < limit)
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+    return text[:DOCUMENT_MAX_CHARS]
+
+
+def extract_docx(path):
+    """Paragraph text from word/document.xml, one paragraph per line"""
+    paragraphs = []
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as document:
+        parts = []
+        for event, element in ElementTree.iterparse(document, events=('end',)):
+            if element.tag == f'{WORD_NS}t':
+                parts.append(element.text or '')
+            elif element.tag == f'{WORD_NS}tab':
+                parts.append('\t')
+            elif element.tag == f'{WORD_NS}p':
+                paragraphs.append(''.join(parts))
+                parts = []
+                element.clear()
+    return '\n'.join(paragraphs)
+
+
+def extract_pdf(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:  # optional; without it PDFs need a DOCUMENT_EXTRACTORS plugin
+        return None
+    return '\n'.join(page.extract_text() or '' for page in PdfReader(path).pages)
+
+
+BUILTIN_EXTRACTORS = {'txt': extract_txt, 'docx': extract_docx, 'pdf': extract_pdf}
+
+
+def _plugins():
+    plugins = {}
+    for entry in os.getenv('DOCUMENT_EXTRACTORS', '').split(','):
+        if '=' in entry:
+            ext, target = entry.split('=', 1)
+            plugins[ext.strip().lower()] = target.strip()
+    return plugins
+
+
+def extractor_for(ext):
+    """(name, function) for an extension, or (None, None) if nothing handles it"""
+    target = _plugins().get(ext)
+    if target:
+        module, function = target.split(':', 1)
+        return target, getattr(import_module(module), function)
+    if ext in BUILTIN_EXTRACTORS:
+        return f'builtin:{ext}', BUILTIN_EXTRACTORS[ext]
+    return None, None
+
+
+def extract_text(path, ext):
+    """Returns (status, text, extractor, error); status is 'ok', 'unsupported' or 'failed'"""
+    name, extractor = extractor_for(ext)
+    if extractor is None:
+        return 'unsupported', '', None, f'No extractor for .{ext} files'
+    try:
+        text = extractor(path)
+    except Exception as e:
+        return 'failed', '', name, f'{type(e).__name__}: {e}'
+    if text is None:
+        return 'unsupported', '', name, f'Extractor for .{ext} files is not available'
+    # NUL bytes are not allowed in Postgres text columns.
+    return 'ok', text.replace('\x00', '')[:DOCUMENT_MAX_CHARS], name, None
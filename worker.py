@@ -0,0 +1,45 @@
+"""Background job worker.
+
+Run one or more of these next to the web service (run.py). Each process
+claims jobs from the jobs table and runs them until it gets SIGTERM/SIGINT,
+finishing the current job before exiting.
+
+    python worker.py                 # run until stopped
+    python worker.py --burst         # drain the queue, then exit
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+
+from index import create_app
+from job_queue import run_worker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('WORKER_POLL_INTERVAL', 2)))
+    parser.add_argument('--burst', action='store_true', help='exit once the queue is empty')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    stopping = []
+
+    def stop(signum, frame):
+        logging.info('Worker %s stopping after the current job', worker_id)
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    app = create_app()
+    with app.app_context():
+        processed = run_worker(worker_id, args.poll_interval, should_stop=lambda: bool(stopping), burst=args.burst)
+    logging.info('Worker %s processed %d jobs', worker_id, processed)
+
+
+if __name__ == "__main__":
+    main()